@@ -14,6 +14,48 @@ def create_app():
     # 설정 클래스의 init_app 메서드를 호출하여 필요한 폴더 생성
     Config.init_app(app)
 
+    # [신규] 운영 지표(/metrics) 기록 시작 (워커 프로세스별 파일을 요청 시 합산)
+    from app.services.metrics import init_metrics
+    init_metrics(app)
+
+    # [신규] 상태 조회 전용 워커는 처리용 자원(모델, 분리/분석 워커, 스케줄러)을 만들지 않음
+    processing = app.config['WORKER_ROLE'] == 'all'
+
+    if processing:
+        # [신규] TFLite 모델을 프로세스당 한 번만 로드하고 백그라운드에서 워밍업
+        from app.services.inference import init_interpreter_pool
+        init_interpreter_pool(app)
+
+        # [신규] Demucs 모델을 올려 둔 분리 워커 프로세스 시작
+        from app.services.separation import init_separation_service
+        init_separation_service(app)
+
+    # [신규] MuseScore 렌더링 서비스 시작 (동시 실행 수 제한 + 배치 변환)
+    from app.services.rendering import init_render_service
+    init_render_service(app)
+
+    if processing:
+        # [신규] 긴 트랙의 온셋 검출/분류를 여러 코어에 나눌 분석 워커 풀 시작
+        from app.services.parallel import init_parallel_pool
+        init_parallel_pool(app)
+
+    # [신규] 이어 올리기(청크) 업로드 저장소 준비
+    from app.services.uploads import init_upload_store
+    init_upload_store(app)
+
+    # [신규] 같은 업로드를 다시 처리하지 않도록 결과물 캐시 준비
+    from app.services.result_cache import init_result_cache
+    init_result_cache(app)
+
+    # [신규] 여러 워커 프로세스가 공유하는 작업 상태 저장소 (SQLite)
+    from app.tasks import init_job_store
+    init_job_store(app)
+
+    if processing:
+        # [신규] 분리 / 분석 스테이지별 작업 풀 시작
+        from app.tasks import init_scheduler
+        init_scheduler(app)
+
     # 라우트(API 엔드포인트) 등록
     from . import routes
     app.register_blueprint(routes.bp)
@@ -1,15 +1,51 @@
 # app/routes.py
+import json
 import os
 import uuid
-from flask import request, jsonify, current_app, send_from_directory, Blueprint
+from flask import request, jsonify, current_app, send_from_directory, Blueprint, Response, stream_with_context
 from . import tasks
+from .services.score import EventTrack
+from .services.profiling import PROFILE_JSON_NAME, PROFILE_FOLDED_NAME
+from .services.rendering import RenderError, RenderTimeout
+from .services.uploads import (
+    save_upload, sniff_file_format,
+    UploadNotFound, UploadOffsetMismatch, UnsupportedAudioFormat,
+)
 
 bp = Blueprint('api', __name__)
 
+# 상태 변경을 기다리는 시간(초): long-poll 기본/최대, SSE keep-alive 주기
+LONG_POLL_TIMEOUT_SEC = 25
+LONG_POLL_MAX_TIMEOUT_SEC = 60
+SSE_KEEPALIVE_SEC = 15
+
+# /api/events 한 번에 돌려주는 최대 이벤트 수
+EVENTS_PAGE_LIMIT = 5000
+EVENTS_MAX_PAGE_LIMIT = 20000
+
+# profile 플래그로 받는 참 값 (폼/쿼리 문자열)
+TRUTHY_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def _processing_unavailable():
+    """상태 조회 전용 워커(WORKER_ROLE='status')면 503 응답을, 아니면 None을 반환합니다."""
+    if current_app.config['WORKER_ROLE'] == 'all':
+        return None
+    return jsonify({"error": "이 서버는 결과 조회 전용입니다. 업로드는 처리 서버로 보내 주세요."}), 503
+
+
+def _profile_requested(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUTHY_VALUES
+
 
 @bp.route('/api/process', methods=['POST'])
 def process_audio_route():
     """오디오 파일을 업로드하고 처리 작업을 시작합니다."""
+    unavailable = _processing_unavailable()
+    if unavailable:
+        return unavailable
     if 'audio_file' not in request.files:
         return jsonify({"error": "오디오 파일이 없습니다."}), 400
 
@@ -19,25 +55,165 @@ def process_audio_route():
 
     if file:
         job_id = str(uuid.uuid4())
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{job_id}.mp3")
-        file.save(filepath)
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        filepath = os.path.join(upload_folder, f"{job_id}.upload")
+        # [수정] 저장하면서 내용 해시를 계산 (같은 파일 재업로드 시 캐시된 결과 사용)
+        audio_hash = save_upload(file.stream, filepath)
+
+        # [수정] 항상 .mp3로 저장하지 않고, 앞부분 매직 바이트로 판별한 형식을 확장자로 사용
+        audio_format = sniff_file_format(filepath)
+        if audio_format is None:
+            os.remove(filepath)
+            return jsonify({"error": "지원하지 않는 오디오 형식입니다."}), 415
+        audio_path = os.path.join(upload_folder, f"{job_id}.{audio_format}")
+        os.replace(filepath, audio_path)
 
         # [수정] progress=0 제거
         tasks.update_job_status(job_id, 'pending', '작업을 대기 중입니다.')
-        tasks.start_background_task(job_id, filepath)
+        profile = _profile_requested(request.form.get('profile', request.args.get('profile')))
+        tasks.start_background_task(job_id, audio_path, audio_hash=audio_hash, profile=profile)
 
         return jsonify({
             "jobId": job_id,
             "message": "파일 업로드 성공. 처리 작업을 시작합니다."
         }), 202
 
+
+# --- [신규] 이어 올리기(청크) 업로드 ---
+# 1) POST  /api/uploads                     {"filename", "size"}  -> {"uploadId", "offset": 0}
+# 2) PATCH /api/uploads/<id>?offset=N        본문: 원시 바이트       -> {"offset"}
+#    연결이 끊기면 GET /api/uploads/<id>로 offset을 확인하고 그 위치부터 다시 보냄
+# 3) POST  /api/uploads/<id>/finalize        {"size", "sha256"} (선택) -> {"jobId"} (바로 처리 시작)
+def _upload_store():
+    return current_app.extensions['upload_store']
+
+
+@bp.route('/api/uploads', methods=['POST'])
+def create_upload_route():
+    body = request.get_json(silent=True) or {}
+    size = body.get('size')
+    if size is not None and (not isinstance(size, int) or size < 0):
+        return jsonify({"error": "size가 올바르지 않습니다."}), 400
+    upload_id = _upload_store().create(filename=body.get('filename'), size=size)
+    return jsonify({"uploadId": upload_id, "offset": 0}), 201
+
+
+@bp.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload_route(upload_id):
+    try:
+        return jsonify({"uploadId": upload_id, "offset": _upload_store().offset(upload_id)})
+    except UploadNotFound:
+        return jsonify({"error": "해당 업로드를 찾을 수 없습니다."}), 404
+
+
+@bp.route('/api/uploads/<upload_id>', methods=['PATCH', 'PUT'])
+def append_upload_route(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({"error": "offset이 필요합니다."}), 400
+    try:
+        # request.stream을 그대로 넘겨 본문을 메모리/임시 파일에 모으지 않고 바로 이어 씀
+        new_offset = _upload_store().append(upload_id, offset, request.stream)
+    except UploadNotFound:
+        return jsonify({"error": "해당 업로드를 찾을 수 없습니다."}), 404
+    except UploadOffsetMismatch as e:
+        return jsonify({"error": str(e), "offset": e.offset}), 409
+    return jsonify({"uploadId": upload_id, "offset": new_offset})
+
+
+@bp.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload_route(upload_id):
+    unavailable = _processing_unavailable()
+    if unavailable:
+        return unavailable
+    body = request.get_json(silent=True) or {}
+    job_id = str(uuid.uuid4())
+    try:
+        audio_path, audio_hash, _ = _upload_store().finalize(
+            upload_id, current_app.config['UPLOAD_FOLDER'], job_id,
+            expected_size=body.get('size'), expected_sha256=body.get('sha256'),
+        )
+    except UploadNotFound:
+        return jsonify({"error": "해당 업로드를 찾을 수 없습니다."}), 404
+    except UploadOffsetMismatch as e:
+        return jsonify({"error": "업로드가 아직 끝나지 않았습니다.", "offset": e.offset}), 409
+    except UnsupportedAudioFormat as e:
+        return jsonify({"error": str(e)}), 415
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 422
+
+    tasks.update_job_status(job_id, 'pending', '작업을 대기 중입니다.')
+    profile = _profile_requested(body.get('profile', request.args.get('profile')))
+    tasks.start_background_task(job_id, audio_path, audio_hash=audio_hash, profile=profile)
+    return jsonify({
+        "jobId": job_id,
+        "message": "파일 업로드 성공. 처리 작업을 시작합니다."
+    }), 202
+
+# [신규] 모델 워밍업이 끝난 뒤에만 200을 반환하는 준비 상태(readiness) 확인
+@bp.route('/api/health/ready', methods=['GET'])
+def readiness_route():
+    pool = current_app.extensions.get('interpreter_pool')
+    if pool is None or pool.is_ready:  # 상태 조회 전용 워커는 기다릴 모델이 없음
+        return jsonify({"status": "ready"}), 200
+    if pool.error:
+        return jsonify({"status": "error", "error": pool.error}), 503
+    return jsonify({"status": "warming_up"}), 503
+
+# [신규] Prometheus 형식 운영 지표 (모든 워커 프로세스의 값을 합산)
+@bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    from .services.metrics import metrics
+    job_gauges = [
+        ('drum_jobs', {'status': status}, count) for status, count in tasks.count_jobs_by_status().items()
+    ]
+    return Response(metrics.render(extra_gauges=job_gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # --- (이하 /api/result/, /download/ 등은 기존과 동일) ---
+# [수정] ?since=<version>을 주면 상태가 바뀔 때까지(최대 timeout초) 기다렸다가 응답하는 long-poll
 @bp.route('/api/result/<job_id>', methods=['GET'])
 def get_result_route(job_id):
-    job = tasks.get_job_status(job_id)
+    since = request.args.get('since', type=int)
+    if since is None:
+        job, version = tasks.get_job_status_versioned(job_id)
+    else:
+        timeout = min(request.args.get('timeout', LONG_POLL_TIMEOUT_SEC, type=float), LONG_POLL_MAX_TIMEOUT_SEC)
+        job, version = tasks.wait_for_job_change(job_id, since, timeout)
     if not job:
         return jsonify({"error": "해당 작업 ID를 찾을 수 없습니다."}), 404
-    return jsonify(job)
+    return jsonify({**job, "version": version})
+
+
+# [신규] 상태가 바뀔 때마다 Server-Sent Events로 보내는 스트림 (completed/error 이후 종료)
+@bp.route('/api/result/<job_id>/events', methods=['GET'])
+def stream_result_route(job_id):
+    since = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+    if tasks.get_job_status(job_id) is None:
+        return jsonify({"error": "해당 작업 ID를 찾을 수 없습니다."}), 404
+
+    def generate():
+        version = since
+        while True:
+            job, new_version = tasks.wait_for_job_change(job_id, version, SSE_KEEPALIVE_SEC)
+            if job is None:
+                yield "event: error\ndata: {}\n\n"
+                return
+            if new_version <= version:
+                yield ": keep-alive\n\n"  # 프록시가 연결을 끊지 않도록
+                continue
+            version = new_version
+            data = json.dumps({**job, "version": version}, ensure_ascii=False)
+            yield f"id: {version}\nevent: status\ndata: {data}\n\n"
+            if job.get('status') in ('completed', 'error'):
+                return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 
 @bp.route('/download/midi/<job_id>', methods=['GET'])
@@ -49,12 +225,84 @@ def download_midi_route(job_id):
     return jsonify({"error": "MIDI 파일을 찾을 수 없습니다."}), 404
 
 
+# [신규] 분류된 타격 이벤트를 작은 JSON으로 반환 (결과 미리보기용)
+# ?start=&end=(초)로 구간을, ?limit=으로 개수를 제한하고, 잘렸으면 next부터 다시 요청
+@bp.route('/api/events/<job_id>', methods=['GET'])
+def get_events_route(job_id):
+    job = tasks.get_job_status(job_id)
+    if not job:
+        return jsonify({"error": "해당 작업 ID를 찾을 수 없습니다."}), 404
+    if job.get('status') != 'completed':
+        return jsonify({"error": "작업이 아직 완료되지 않았습니다.", "status": job.get('status')}), 409
+
+    events_path = os.path.join(current_app.config['RESULT_FOLDER'], job_id, f"{job_id}.events.npz")
+    if not os.path.exists(events_path):
+        return jsonify({"error": "이벤트 파일을 찾을 수 없습니다."}), 404
+
+    start = max(request.args.get('start', 0.0, type=float), 0.0)
+    end = request.args.get('end', type=float)
+    limit = min(max(request.args.get('limit', EVENTS_PAGE_LIMIT, type=int), 1), EVENTS_MAX_PAGE_LIMIT)
+    if end is not None and end <= start:
+        return jsonify({"error": "end는 start보다 커야 합니다."}), 400
+
+    track = EventTrack.load(events_path)
+    lo, hi = track.window(start, end, limit)
+    # limit에 걸려 잘린 경우에만 다음 페이지 시작 시각을 알려 줌
+    truncated = hi - lo == limit and hi < len(track) and (end is None or track.times[hi] < end)
+    return jsonify({
+        "bpm": track.bpm,
+        "labels": track.label_names,
+        "total": len(track),
+        "start": start,
+        "end": end,
+        # 열 단위 배열: i번째 이벤트 = (times[i], labels[labelIds[i]], probs[i])
+        "times": [round(t, 4) for t in track.times[lo:hi].tolist()],
+        "labelIds": track.labels[lo:hi].tolist(),
+        "probs": [round(p, 3) for p in track.probs[lo:hi].tolist()],
+        "next": round(float(track.times[hi]), 4) if truncated else None,
+    })
+
+
+# [수정] PDF는 처음 요청될 때 렌더링 (같은 작업의 동시 요청은 한 번만 렌더링하고 결과는 재사용)
 @bp.route('/download/pdf/<job_id>', methods=['GET'])
 def download_pdf_route(job_id):
     result_dir = os.path.join(current_app.config['RESULT_FOLDER'], job_id)
     filename = f"{job_id}.pdf"
     if os.path.exists(os.path.join(result_dir, filename)):
         return send_from_directory(result_dir, filename, as_attachment=False)
-    
-    # [수정] 오류 메시지를 "MIDI"에서 "PDF"로 변경
-    return jsonify({"error": "PDF 악보 파일을 찾을 수 없습니다."}), 404
\ No newline at end of file
+
+    job = tasks.get_job_status(job_id)
+    if not job:
+        return jsonify({"error": "PDF 악보 파일을 찾을 수 없습니다."}), 404
+    if job.get('status') != 'completed':
+        return jsonify({"error": "작업이 아직 완료되지 않았습니다.", "status": job.get('status')}), 409
+
+    from app.services.audio_processor import ensure_score_pdf
+    try:
+        pdf_path = ensure_score_pdf(job_id)
+    except RenderTimeout as e:
+        current_app.logger.error(f"[{job_id}] PDF 렌더링 시간 초과: {e}")
+        return jsonify({"error": "PDF 변환 중 타임아웃 발생"}), 504
+    except RenderError as e:
+        current_app.logger.error(f"[{job_id}] PDF 렌더링 실패: {e}")
+        return jsonify({"error": str(e)}), 503
+
+    if pdf_path is None:
+        # [수정] 오류 메시지를 "MIDI"에서 "PDF"로 변경
+        return jsonify({"error": "PDF 악보 파일을 찾을 수 없습니다."}), 404
+    return send_from_directory(result_dir, filename, as_attachment=False)
+
+
+# [신규] 프로파일링한 작업의 결과물 (업로드 시 profile=1 또는 PROFILE_SAMPLE_RATE로 뽑힌 작업)
+# 기본은 profile.json, ?format=folded면 flamegraph.pl/speedscope용 접힌 스택 파일을 내려받음
+@bp.route('/api/profile/<job_id>', methods=['GET'])
+def download_profile_route(job_id):
+    result_dir = os.path.join(current_app.config['RESULT_FOLDER'], job_id)
+    if request.args.get('format') == 'folded':
+        filename, as_attachment = PROFILE_FOLDED_NAME, True
+    else:
+        filename, as_attachment = PROFILE_JSON_NAME, False
+    if not os.path.exists(os.path.join(result_dir, filename)):
+        return jsonify({"error": "프로파일 결과를 찾을 수 없습니다."}), 404
+    return send_from_directory(result_dir, filename, as_attachment=as_attachment,
+                               download_name=f"{job_id}.{filename}")
@@ -0,0 +1,186 @@
+# backend/app/services/audio_io.py
+
+import os
+import struct
+import subprocess
+
+import numpy as np
+
+from app.services.profiling import subprocess_timer
+
+# --- 상수 정의 ---
+SR = 44100
+CHANNELS = 2  # Demucs(htdemucs) 입력과 동일한 스테레오
+
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _read_wav_layout(path):
+    """WAV 헤더를 읽어 (포맷, 채널 수, 샘플레이트, 비트 수, data 오프셋, 프레임 수)를 반환합니다."""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff not in (b'RIFF', b'RF64') or wave != b'WAVE':
+            raise ValueError(f"WAV 파일이 아닙니다: {path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"WAV data 청크를 찾을 수 없습니다: {path}")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+            if chunk_id == b'fmt ':
+                body = f.read(chunk_size)
+                audio_format, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', body[:16])
+                if audio_format == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    audio_format = struct.unpack('<H', body[24:26])[0]
+                fmt = (audio_format, channels, sample_rate, bits, block_align)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"WAV fmt 청크가 data 청크보다 뒤에 있습니다: {path}")
+                data_offset = f.tell()
+                # 스트리밍으로 쓰인 파일(크기 0xFFFFFFFF)이나 RF64도 실제 파일 크기를 기준으로 계산
+                data_size = min(chunk_size, file_size - data_offset)
+                audio_format, channels, sample_rate, bits, block_align = fmt
+                return audio_format, channels, sample_rate, bits, data_offset, data_size // block_align
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+class AudioHandle:
+    """
+    작업 하나에서 여러 단계(BPM 분석, 드럼 분리, 온셋 검출)가 같이 읽는 오디오 버퍼입니다.
+    디코딩/리샘플링은 한 번만 하고, 결과는 float32 WAV 파일을 읽기 전용 memmap으로 공유합니다.
+    """
+
+    def __init__(self, path, samples, sr, mono_in_memory_max_sec=600):
+        self.path = path
+        self.samples = samples  # (프레임 수, 채널 수) float32, 읽기 전용
+        self.sr = sr
+        self.mono_in_memory_max_sec = mono_in_memory_max_sec
+        self._mono = None
+
+    @property
+    def num_frames(self):
+        return self.samples.shape[0]
+
+    @property
+    def duration(self):
+        return self.num_frames / self.sr
+
+    @classmethod
+    def decode(cls, input_path, output_path, sr=SR, channels=CHANNELS, ffmpeg_path='ffmpeg', **kwargs):
+        """ffmpeg 한 번으로 업로드 파일을 sr/채널에 맞춰 float32 WAV로 디코딩하고 핸들을 엽니다."""
+        command = [
+            ffmpeg_path, '-nostdin', '-v', 'error', '-y', '-i', input_path,
+            '-vn', '-map_metadata', '-1', '-ac', str(channels), '-ar', str(sr),
+            '-c:a', 'pcm_f32le', '-f', 'wav', output_path,
+        ]
+        with subprocess_timer('ffmpeg'):
+            result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg 디코딩 실패: {result.stderr.strip()[:200]}")
+        return cls.open(output_path, sr=sr, ffmpeg_path=ffmpeg_path, **kwargs)
+
+    @classmethod
+    def open(cls, path, sr=SR, ffmpeg_path='ffmpeg', **kwargs):
+        """
+        float32 / sr 의 WAV 파일은 복사 없이 memmap으로 엽니다.
+        그 외 형식은 옆에 '.f32.wav' 파일로 한 번 디코딩한 뒤 엽니다.
+        """
+        layout = None
+        if path.lower().endswith('.wav'):
+            try:
+                layout = _read_wav_layout(path)
+            except ValueError:
+                layout = None
+
+        if layout is None or layout[0] != WAVE_FORMAT_IEEE_FLOAT or layout[3] != 32 or layout[2] != sr:
+            decoded_path = os.path.splitext(path)[0] + '.f32.wav'
+            channels = layout[1] if layout else CHANNELS
+            return cls.decode(path, decoded_path, sr=sr, channels=channels, ffmpeg_path=ffmpeg_path, **kwargs)
+
+        _, channels, _, _, data_offset, num_frames = layout
+        samples = np.memmap(path, dtype='<f4', mode='r', offset=data_offset, shape=(num_frames, channels))
+        return cls(path, samples, sr, **kwargs)
+
+    def mono(self):
+        """
+        채널 평균으로 만든 모노 신호(librosa.load(mono=True)와 동일)를 반환합니다.
+        긴 트랙은 메모리 대신 '.mono.f32' memmap 파일에 블록 단위로 계산해 둡니다.
+        """
+        if self._mono is not None:
+            return self._mono
+
+        if self.samples.shape[1] == 1:
+            self._mono = self.samples[:, 0]
+        elif self.duration <= self.mono_in_memory_max_sec:
+            mono = self.samples.mean(axis=1, dtype=np.float32)
+            mono.flags.writeable = False
+            self._mono = mono
+        else:
+            mono_path = os.path.splitext(self.path)[0] + '.mono.f32'
+            mono = np.memmap(mono_path, dtype='<f4', mode='w+', shape=(self.num_frames,))
+            block = self.sr * 60
+            for start in range(0, self.num_frames, block):
+                mono[start:start + block] = self.samples[start:start + block].mean(axis=1, dtype=np.float32)
+            mono.flush()
+            del mono
+            self._mono = np.memmap(mono_path, dtype='<f4', mode='r', shape=(self.num_frames,))
+        return self._mono
+
+    def read_mono(self, start, stop):
+        """[start, stop) 구간의 모노 신호를 읽습니다. (mono()와 같은 계산, 전체를 만들지 않음)"""
+        block = self.samples[start:stop]
+        if block.shape[1] == 1:
+            return block[:, 0]
+        return block.mean(axis=1, dtype=np.float32)
+
+    def release(self, delete=False):
+        """버퍼 참조를 해제하고 파생된 모노 파일을 지웁니다. delete=True면 WAV 파일도 삭제합니다."""
+        paths = [os.path.splitext(self.path)[0] + '.mono.f32']
+        if delete:
+            paths.append(self.path)
+        self.samples = None
+        self._mono = None
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class FloatWavWriter:
+    """
+    float32 WAV 파일을 앞에서부터 이어 쓰는 writer입니다.
+    쓰는 도중에는 크기 필드가 0xFFFFFFFF(스트리밍)로 남아 있어, 이미 쓴 부분까지를
+    AudioHandle.open()으로 바로 읽을 수 있습니다. close()에서 실제 크기로 고칩니다.
+    """
+
+    def __init__(self, path, sr=SR, channels=CHANNELS):
+        self.path = path
+        self.channels = channels
+        self.frames = 0
+        self._file = open(path, 'wb')
+        block_align = 4 * channels
+        self._file.write(struct.pack('<4sI4s', b'RIFF', 0xFFFFFFFF, b'WAVE'))
+        self._file.write(struct.pack('<4sIHHIIHH', b'fmt ', 16, WAVE_FORMAT_IEEE_FLOAT,
+                                     channels, sr, sr * block_align, block_align, 32))
+        self._file.write(struct.pack('<4sI', b'data', 0xFFFFFFFF))
+        self._data_offset = self._file.tell()
+
+    def write(self, samples):
+        """(프레임 수, 채널 수) 배열을 이어 쓰고 디스크에 반영합니다."""
+        data = np.ascontiguousarray(samples, dtype='<f4')
+        self._file.write(data.tobytes())
+        self._file.flush()
+        self.frames += data.shape[0]
+
+    def close(self):
+        data_size = self.frames * 4 * self.channels
+        if data_size + self._data_offset - 8 < 0xFFFFFFFF:
+            self._file.seek(4)
+            self._file.write(struct.pack('<I', data_size + self._data_offset - 8))
+            self._file.seek(self._data_offset - 4)
+            self._file.write(struct.pack('<I', data_size))
+        self._file.close()
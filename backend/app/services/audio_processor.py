@@ -2,19 +2,26 @@
 
 import os
 import numpy as np
-import librosa
-import pretty_midi
 import csv
 import time
 import subprocess
 import sys
 import re
-import io
+from collections import deque
 import traceback
-from tqdm import tqdm
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
-import tensorflow as tf
-import music21 as m21
+# [수정] librosa(온셋/특징/BPM)는 import에 수 초가 걸리므로 모듈 최상위가 아니라 쓰는 스테이지 안에서 가져옴
+# (TensorFlow는 inference.py가 첫 모델 로드 때, pretty_midi는 score.py가 MIDI를 쓸 때 가져옴)
+from app.services.inference import get_interpreter_pool, run_inference_batch, resolve_num_threads
+from app.services.audio_io import AudioHandle
+from app.services.separation import DRUM_STEM_NAME
+from app.services.progress import create_progress_reporter
+from app.services.metrics import metrics
+from app.services.profiling import ProfileSession, record_subprocess, subprocess_timer
+from app.services.score import write_drum_midi, write_drum_musicxml, save_events, EventTrack
 
 # --- 상수 정의 ---
 SR = 44100
@@ -28,60 +35,66 @@ LABELS = ["kick", "snare", "hi-hat"]
 # [수정] B안 (3클래스) 적용 (하이햇을 42번 Cymbals 노트로 매핑)
 NOTE_MAP = {"kick": 36, "snare": 38, "hi-hat": 42} 
 
-# --- TQDM 출력을 Job Status의 'message'로 리디렉션 ---
-class TqdmToJobUpdater(io.StringIO):
-    def __init__(self, job_id, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.job_id = job_id
-        self._last_message = "" # 중복 전송을 막기 위한 내부 캐시
-
-    def write(self, s):
-        message = s.strip()
-        if not message or message == '\r':
-            return
-
-        # 정규표현식으로 설명(desc)과 퍼센트(%) 추출
-        match = re.search(r'^(.*?:)?\s*(\d+%)', message)
-        simple_message = self._last_message
-
-        if match:
-            desc = match.group(1) or "처리 중..."
-            percent = match.group(2)
-            simple_message = f"{desc.strip()} {percent}"
-        
-        if simple_message != self._last_message:
-            self._last_message = simple_message
-            from app.tasks import update_job_status
-            update_job_status(
-                self.job_id,
-                'processing',
-                simple_message
-            )
+# [신규] 작업 폴더에 저장되는 디코딩된 원본 (44.1kHz, 스테레오, float32 WAV)
+SOURCE_AUDIO_NAME = "source.wav"
 
-# --- TFLite 모델 로드 함수 ---
-def load_tflite_model(model_path):
-    if not os.path.exists(model_path):
-        current_app.logger.error(f"치명적 오류: TFLite 모델 파일 '{model_path}'를 찾을 수 없습니다.")
-        raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {model_path}")
-    current_app.logger.info(f"TFLite 모델 로딩 중: {model_path}")
-    interpreter = tf.lite.Interpreter(model_path=model_path)
-    interpreter.allocate_tensors()
-    current_app.logger.info("TFLite 모델 로딩 및 텐서 할당 완료.")
-    return interpreter
-
-# --- 스펙트로그램 변환 함수 ---
-def audio_segment_to_melspec(y, sr):
-    mel_spec = librosa.feature.melspectrogram(y=y, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS)
-    mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-    if mel_spec_db.shape[1] < TARGET_SHAPE[1]:
-        pad_width = TARGET_SHAPE[1] - mel_spec_db.shape[1]
-        mel_spec_db = np.pad(mel_spec_db, pad_width=((0, 0), (0, pad_width)), mode='constant')
-    else:
-        mel_spec_db = mel_spec_db[:, :TARGET_SHAPE[1]]
-    return mel_spec_db
+# [신규] Demucs CLI의 tqdm 진행 막대에서 "완료/전체" 값을 읽기 위한 패턴 (워커 미사용 시에만 사용)
+TQDM_COUNT_RE = re.compile(r'(\d+(?:\.\d+)?)/(\d+(?:\.\d+)?)')
 
 # --- Demucs 실행 헬퍼 함수 ---
-def run_demucs_separation(input_path, output_dir, job_id):
+def run_demucs_separation(input_path, output_dir, job_id, on_committed=None, progress=None):
+    """
+    [수정] 모델이 상주하는 분리 워커에 작업을 맡기고 드럼 스템 경로를 반환합니다.
+    워커를 쓰지 않도록 설정된 경우(SEPARATION_BACKEND='subprocess')에는 기존처럼 Demucs CLI를 실행합니다.
+
+    on_committed(stem_path, frames)를 주면, 워커가 청크를 하나 끝낼 때마다 이 함수를 부른 스레드에서
+    호출하므로 분리가 끝나기 전에 확정된 앞부분으로 후속 처리를 시작할 수 있습니다.
+    """
+    from app.tasks import update_job_status
+
+    if progress is None:
+        progress = create_progress_reporter(job_id)
+    progress.stage('separation')
+
+    service = current_app.extensions.get('separation_service')
+    if service is None:
+        return run_demucs_subprocess(input_path, output_dir, job_id, progress)
+
+    output_path = os.path.join(output_dir, DRUM_STEM_NAME)
+    # [수정] 워커가 보내는 진행률(0~1)을 그대로 보고 (기록 빈도는 보고기가 제한)
+    task = service.submit(job_id, input_path, output_path, on_progress=progress.update)
+    deadline = time.time() + current_app.config['SEPARATION_TIMEOUT_SEC']
+    committed = 0
+    while not task.wait(timeout=1.0):
+        if on_committed and task.committed_frames > committed:
+            committed = task.committed_frames
+            on_committed(output_path, committed)
+        if time.time() > deadline:
+            current_app.logger.error(f"[{job_id}] 드럼 분리 시간 초과. 분리 작업을 취소합니다.")
+            service.cancel(task)
+            progress.close()
+            update_job_status(job_id, 'error', "드럼 분리 시간 초과")
+            return None
+
+    if task.error:
+        current_app.logger.error(f"[{job_id}] 드럼 분리 실패: {task.error}")
+        progress.close()
+        update_job_status(job_id, 'error', f"Demucs 오류: {task.error[:100]}")
+        return None
+
+    if not os.path.exists(output_path):
+        current_app.logger.error(f"[{job_id}] 오류: 분리는 성공했으나 '{DRUM_STEM_NAME}' 파일을 찾을 수 없습니다.")
+        progress.close()
+        update_job_status(job_id, 'error', "Demucs 완료했으나 드럼 파일 없음")
+        return None
+
+    record_subprocess('demucs-worker', task.elapsed or 0.0, task.cpu)
+    current_app.logger.info(f"[{job_id}] 드럼 분리 성공 ({task.elapsed:.1f}초): {output_path}")
+    return output_path
+
+
+def run_demucs_subprocess(input_path, output_dir, job_id, progress):
+    """작업마다 `python -m demucs.separate`를 실행하는 기존 방식 (워커 미사용 시 대체 경로)."""
     from app.tasks import update_job_status
 
     model_name = "htdemucs"
@@ -89,38 +102,34 @@ def run_demucs_separation(input_path, output_dir, job_id):
 
     command = [
         sys.executable, "-m", "demucs.separate", "-n", model_name,
-        "--two-stems=drums", "-o", demucs_out_dir, input_path
+        "--two-stems=drums", "--float32", "-o", demucs_out_dir, input_path
     ]
     current_app.logger.info(f"[{job_id}] Demucs 명령어 실행: {' '.join(command)}")
 
-    process = subprocess.Popen(
-        command, stderr=subprocess.PIPE, stdout=subprocess.PIPE,
-        text=True, encoding='utf-8', bufsize=1
-    )
-
-    last_demucs_message = ""
-    try:
-        for line in process.stderr:
-            line_strip = line.strip()
-            current_app.logger.info(f"[Demucs/stderr - {job_id}]: {line_strip}")
-
-            if line_strip.startswith("Separating:"):
-                match = re.search(r'(\d+%)', line_strip)
-                simple_message = "드럼 분리 중..."
-                
-                if match:
-                    simple_message = f"드럼 분리 중... {match.group(1)}"
-                
-                if simple_message != last_demucs_message:
-                    last_demucs_message = simple_message
-                    update_job_status(job_id, 'processing', message=simple_message)
-                
-    finally:
-        stdout_data, stderr_data = process.communicate()
+    # [수정] 줄마다 로그를 남기지 않고, 오류 보고용으로 마지막 몇 줄만 보관
+    stderr_tail = deque(maxlen=20)
+    with subprocess_timer('demucs-cli'):
+        process = subprocess.Popen(
+            command, stderr=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1
+        )
+        try:
+            for line in process.stderr:
+                line_strip = line.strip()
+                stderr_tail.append(line_strip)
+
+                # CLI는 진행률을 tqdm 막대로만 출력하므로 "완료/전체" 값을 숫자로 읽어 보고
+                match = TQDM_COUNT_RE.search(line_strip)
+                if match and float(match.group(2)) > 0:
+                    progress.update(float(match.group(1)) / float(match.group(2)))
+        finally:
+            process.communicate()
+    stderr_data = "\n".join(stderr_tail)
 
     if process.returncode != 0:
         current_app.logger.error(f"[{job_id}] Demucs 실행 실패.")
         current_app.logger.error(f"[{job_id}] STDERR: {stderr_data}")
+        progress.close()
         update_job_status(job_id, 'error', f"Demucs 오류: {stderr_data[:100]}")
         return None
 
@@ -131,47 +140,118 @@ def run_demucs_separation(input_path, output_dir, job_id):
     )
 
     if os.path.exists(separated_drum_file):
-        current_app.logger.info(f"[{job_id}] 드럼 분리 성공: {separated_drum_file}")
-        return separated_drum_file
+        # 분리 워커와 같은 위치(작업 폴더/drums.wav)로 옮겨 이후 단계/캐시가 같은 경로를 사용
+        output_path = os.path.join(output_dir, DRUM_STEM_NAME)
+        os.replace(separated_drum_file, output_path)
+        current_app.logger.info(f"[{job_id}] 드럼 분리 성공: {output_path}")
+        return output_path
     else:
         current_app.logger.error(f"[{job_id}] 오류: Demucs는 성공했으나 'drums.wav' 파일을 찾을 수 없습니다.")
+        progress.close()
         update_job_status(job_id, 'error', "Demucs 완료했으나 드럼 파일 없음")
         return None
 
 # --- MIDI 생성 메인 함수 ---
-def generate_midi_from_audio(audio_path, result_dir, bpm=120):
-    from app.tasks import update_job_status
-    
-    interpreter = load_tflite_model(current_app.config['MODEL_PATH'])
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
+def classify_drum_events(drum_audio, result_dir, onset_detector=None, progress=None):
+    """
+    드럼 스템(AudioHandle 또는 WAV 경로)에서 온셋을 검출/분류하여 CSV로 저장하고,
+    이벤트 목록 [(시간, 라벨, 확률), ...]을 반환합니다. 실패하면 None.
+    onset_detector에 분리 도중 미리 계산해 둔 OnsetDetector를 주면 남은 구간만 계산합니다.
+    """
+    from app.services.features import MelFeatureEngine
+    from app.services.onsets import OnsetDetector
+
+    # [수정] 작업마다 모델을 새로 로드하지 않고, 앱 시작 시 워밍업된 인터프리터 풀을 사용
+    pool = get_interpreter_pool()
 
     job_id = os.path.basename(result_dir)
-    midi_out = os.path.join(result_dir, f"{job_id}.mid")
+    if progress is None:
+        progress = create_progress_reporter(job_id)
     csv_out = os.path.join(result_dir, f"{job_id}.csv")
+    opened_here = None  # 여기서 연 핸들 (성공/실패와 관계없이 끝나면 해제)
     try:
-        y, sr = librosa.load(audio_path, sr=SR, mono=True)
-        onsets = librosa.onset.onset_detect(y=y, sr=sr, backtrack=True, units='time')
+        # [수정] Demucs가 쓴 float32 WAV를 다시 디코딩하지 않고 memmap으로 바로 읽음
+        if isinstance(drum_audio, str):
+            drum_audio = opened_here = AudioHandle.open(
+                drum_audio, sr=SR, ffmpeg_path=current_app.config['FFMPEG_PATH'],
+                mono_in_memory_max_sec=current_app.config['AUDIO_MONO_IN_MEMORY_MAX_SEC'],
+            )
+        sr = drum_audio.sr
+        # [신규] 설정된 경우 온셋 검출/분류를 분석 워커 프로세스들에 나눠 실행
+        parallel = current_app.extensions.get('parallel_pool')
+
+        # [수정] librosa.onset.onset_detect(y=y, backtrack=True)와 같은 결과를 블록 단위 STFT로 계산
+        progress.stage('onsets')
+        onsets_started = time.perf_counter()
+        if onset_detector is None:
+            onset_detector = OnsetDetector(sr)
+        if parallel is not None:
+            # 분리 도중 계산하지 못한 나머지 블록을 워커들이 나눠 계산 (블록 경계는 직렬과 동일)
+            blocks, num_samples = onset_detector.plan(drum_audio.num_frames, total=drum_audio.num_frames)
+            if len(blocks) > 1:
+                mel_blocks = parallel.map('mel_power', [
+                    dict(stem_path=drum_audio.path, frame_start=start, frame_end=stop, num_samples=num_samples)
+                    for start, stop in blocks
+                ], on_result=lambda i, result: progress.update((i + 1) / len(blocks)))
+                for (_, stop), mel_power in zip(blocks, mel_blocks):
+                    onset_detector.add_block(stop, mel_power)
+        onsets = onset_detector.detect(drum_audio.read_mono, drum_audio.num_frames)
+        metrics.observe('drum_stage_duration_seconds', time.perf_counter() - onsets_started, stage='onsets')
+
+        # [신규] 온셋 윈도우를 (N, 128, 128, 1) 배치로 모아 몇 번의 invoke로 분류
+        pool.wait_ready()
+        batch_size = pool.batch_size
+        probas = []
+
+        # [수정] tqdm 문자열 대신 분류한 온셋 수를 진행률(0~1)로 보고
+        progress.stage('classification')
+        classification_started = time.perf_counter()
+        total = max(len(onsets), 1)
+        if parallel is not None and len(onsets) > batch_size:
+            # 배치 경계에 맞춰 온셋을 워커 수의 약 2배 구간으로 나눔 (구간마다 필요한 샘플 범위만 읽음)
+            batches = -(-len(onsets) // batch_size)
+            per_chunk = batch_size * -(-batches // (2 * parallel.size))
+            # 워커 프로세스끼리 코어를 나눠 쓰도록 스레드 수도 워커 수 기준으로 정함
+            worker_threads = resolve_num_threads(current_app.config['TFLITE_NUM_THREADS'], parallel.size)
+            classified = [0]
+
+            def on_chunk(i, result):
+                classified[0] += len(result)
+                progress.update(classified[0] / total)
+                # 워커 안의 배치는 직접 잴 수 없으므로 구간 크기로 배치 크기만 기록
+                for size in _batch_sizes(len(result), batch_size):
+                    metrics.observe('drum_inference_batch_size', size)
+
+            probas = parallel.map('classify', [
+                dict(stem_path=drum_audio.path, onset_times=onsets[start:start + per_chunk],
+                     model_path=current_app.config['MODEL_PATH'], batch_size=batch_size,
+                     num_threads=worker_threads, delegate=current_app.config['TFLITE_DELEGATE'],
+                     backend=current_app.config['INFERENCE_BACKEND'])
+                for start in range(0, len(onsets), per_chunk)
+            ], on_result=on_chunk)
+        else:
+            # [신규] 온셋 윈도우 특징을 배치 단위로 한꺼번에 계산 (윈도우/멜 필터뱅크는 트랙당 1회 준비)
+            feature_engine = MelFeatureEngine(drum_audio.mono(), sr)
+            batch = np.zeros((batch_size, *TARGET_SHAPE, 1), dtype=np.float32)
+            for start in range(0, len(onsets), batch_size):
+                batch_onsets = onsets[start:start + batch_size]
+                feature_engine.fill(batch_onsets, batch)
+                # 마지막 배치의 남는 자리는 0으로 채우고 결과에서 제외
+                batch[len(batch_onsets):] = 0.0
+
+                # 인터프리터는 배치 단위로만 빌려 써서 동시 작업끼리 번갈아 사용
+                with pool.acquire() as interpreter:
+                    invoke_started = time.perf_counter()
+                    probas.append(run_inference_batch(interpreter, batch)[:len(batch_onsets)])
+                metrics.observe('drum_inference_batch_duration_seconds', time.perf_counter() - invoke_started)
+                metrics.observe('drum_inference_batch_size', len(batch_onsets))
+                progress.update((start + len(batch_onsets)) / total)
+
+        metrics.observe('drum_stage_duration_seconds', time.perf_counter() - classification_started,
+                        stage='classification')
 
         events = []
-        PRE, POST = 0.04, 0.11
-        L = int((PRE + POST) * sr)
-        
-        progress_stream = TqdmToJobUpdater(job_id)
-
-        for t in tqdm(onsets, desc="MIDI 노트 변환 중", file=progress_stream, ncols=80, unit=" 노트"):
-            s = max(0, int((t - PRE) * sr));
-            e = min(len(y), int((t + POST) * sr))
-            seg = y[s:e]
-            if len(seg) < L: seg = np.pad(seg, (0, L - len(seg)))
-
-            spec = audio_segment_to_melspec(seg, sr) 
-            spec_input = spec[np.newaxis, ..., np.newaxis].astype(np.float32)
-
-            interpreter.set_tensor(input_details[0]['index'], spec_input)
-            interpreter.invoke()
-            proba = interpreter.get_tensor(output_details[0]['index'])[0]
-
+        for t, proba in zip(onsets, np.concatenate(probas) if probas else []):
             lab_id = int(proba.argmax())
             lab = LABELS[lab_id]
             events.append((float(t), lab, float(proba[lab_id])))
@@ -181,162 +261,427 @@ def generate_midi_from_audio(audio_path, result_dir, bpm=120):
             w.writerow(["time_sec", "label", "prob"])
             for t, lab, p in events: w.writerow([f"{t:.4f}", lab, f"{p:.3f}"])
 
-        pm = pretty_midi.PrettyMIDI(initial_tempo=bpm)
-        drum_instrument = pretty_midi.Instrument(program=0, is_drum=True)
-        for t, lab, p in events:
-            if lab in NOTE_MAP:
-                pitch = NOTE_MAP[lab]
-                note = pretty_midi.Note(velocity=100, pitch=pitch, start=t, end=t + 0.1)
-                drum_instrument.notes.append(note)
-        pm.instruments.append(drum_instrument)
-        pm.write(midi_out)
-
-        return True
+        return events
     except Exception as e:
         error_trace = traceback.format_exc()
         current_app.logger.error(f"MIDI 생성 오류 (job: {job_id}): {e}\n{error_trace}")
-        return False
+        return None
+    finally:
+        if opened_here is not None:
+            opened_here.release()
+
+# [신규] MIDI 파일은 악보 준비/렌더링과 동시에 같은 이벤트로 기록
+_midi_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix='midi-writer')
+
+
+def _batch_sizes(count, batch_size):
+    """count개의 온셋을 batch_size로 나눈 배치별 크기."""
+    full, rest = divmod(count, batch_size)
+    return [batch_size] * full + ([rest] if rest else [])
+
+
+def start_midi_write(events, result_dir, bpm):
+    """이벤트로 <job_id>.mid 쓰기를 백그라운드에서 시작하고 Future를 반환합니다."""
+    job_id = os.path.basename(result_dir)
+    return _midi_writer.submit(write_drum_midi, os.path.join(result_dir, f"{job_id}.mid"), events, bpm, NOTE_MAP)
+
+# --- 드럼 이벤트를 퍼커션 악보 PDF로 변환 함수 ---
+# [수정] PDF는 작업 완료 시가 아니라 /download/pdf/<job_id>로 처음 요청될 때 렌더링합니다.
+JOB_META_NAME = "job.json"  # 작업 폴더에 남기는 부가 정보 (결과물 캐시 키)
 
-# --- MIDI를 퍼커션 악보 PDF로 변환 함수 ---
-# (중복 정의 문제 해결: 파일 내에 이 함수가 *한 번만* 있도록 함)
+_pdf_flights = {}  # job_id -> 같은 프로세스에서 렌더링 중임을 알리는 Event
+_pdf_flights_lock = threading.Lock()
 
-# [수정] backend/app/services/audio_processor.py
 
-def generate_pdf_from_midi(midi_path, pdf_output_path, job_id):
+def render_score_pdf(events, bpm, pdf_output_path, job_id):
     """
-    music21로 MusicXML을 생성한 뒤, MuseScore를 subprocess로 직접 호출하여
-    PDF 드럼 악보를 생성합니다.
+    분류된 이벤트와 BPM으로 MusicXML을 바로 만든 뒤 (app/services/score.py),
+    MuseScore 렌더링 서비스(app/services/rendering.py)에 맡겨 PDF 드럼 악보를 생성합니다.
+    실패하면 RenderError/RenderTimeout을 던집니다.
     """
-    from app.tasks import update_job_status
-    update_job_status(job_id, 'processing', 'MIDI 파일을 악보(XML)로 변환 중...')
-
-    # MuseScore 3 경로를 사용합니다.
-    musescore_path = r'C:/Program Files/MuseScore 3/bin/MuseScore3.exe' # <-- 본인 경로 확인
+    from app.services.rendering import RenderError
 
-    if not os.path.exists(musescore_path):
-        current_app.logger.error(f"[{job_id}] MuseScore 경로를 찾을 수 없습니다: {musescore_path}")
-        update_job_status(job_id, 'error', 'MuseScore 실행 파일을 찾을 수 없습니다.')
-        return False
+    # [수정] MuseScore 경로는 설정(MUSESCORE_PATH)에서 읽고, 실행은 렌더링 서비스가 담당
+    render_service = current_app.extensions['render_service']
+    if not render_service.available:
+        raise RenderError("MuseScore 실행 파일을 찾을 수 없습니다.")
 
     xml_temp_path = pdf_output_path.replace(".pdf", ".xml")
-
     try:
-        # 2. MIDI -> MusicXML 변환
-        score = m21.converter.parse(midi_path)
+        # 이벤트 -> MusicXML (MIDI를 다시 읽어 music21로 양자화하지 않음)
+        started = time.perf_counter()
+        write_drum_musicxml(xml_temp_path, events, bpm, NOTE_MAP)
+        current_app.logger.info(
+            f"[{job_id}] MusicXML 파일 생성 성공: {xml_temp_path} ({(time.perf_counter() - started) * 1000:.1f}ms)"
+        )
+
+        # MusicXML -> PDF 변환 (렌더링 서비스 대기열)
+        task = render_service.submit(job_id, xml_temp_path, pdf_output_path)
+        try:
+            task.result()
+        finally:
+            record_subprocess('musescore', task.latency or 0.0, task.cpu,
+                              queueWaitSec=task.queue_wait, batchSize=task.batch_size)
+        current_app.logger.info(
+            f"[{job_id}] PDF 악보 생성 성공: {pdf_output_path} "
+            f"(지연 {task.latency:.2f}초, 대기 {task.queue_wait:.2f}초, 배치 {task.batch_size}건)"
+        )
+        return pdf_output_path
+    finally:
+        if os.path.exists(xml_temp_path):
+            os.remove(xml_temp_path)
 
-        # [수정] 악기 정보를 삭제하지 않고, 기보법(Clef)만 설정합니다.
-        for part in score.recurse().getElementsByClass(m21.stream.Part):
-            # --- [수정] 이 3줄을 삭제하거나 주석 처리 ---
-            # for el in part.getElementsByClass(m21.instrument.Instrument):
-            #     part.remove(el)
-            # part.insert(0, m21.instrument.Percussion())
-            # --- [수정] 여기까지 ---
 
-            # [유지] 퍼커션 기보법(Clef)은 그대로 삽입합니다.
-            part.insert(0, m21.clef.PercussionClef())
+def ensure_score_pdf(job_id):
+    """
+    완료된 작업의 PDF가 없으면 렌더링하고 경로를 반환합니다. (이벤트 파일이 없으면 None)
+    같은 작업의 동시 요청은 한 번만 렌더링합니다: 같은 프로세스 안에서는 Event로,
+    다른 워커 프로세스와는 작업 폴더의 잠금 파일로 기다립니다. 렌더링한 PDF는 결과물 캐시에도 추가합니다.
+    """
+    from app.services.result_cache import try_lock_file
 
-        # [유지] 노트 헤드 변경 (하이햇 'x')
-        for note in score.recurse().getElementsByClass(m21.note.Note):
-            if note.pitch.midi == 42: # B안 (하이햇)
-                note.notehead = 'x'
+    result_dir = os.path.join(current_app.config['RESULT_FOLDER'], job_id)
+    pdf_path = os.path.join(result_dir, f"{job_id}.pdf")
+    events_path = os.path.join(result_dir, f"{job_id}.events.npz")
+    if os.path.exists(pdf_path):
+        return pdf_path
+    if not os.path.exists(events_path):
+        return None
 
-        score.write('musicxml', fp=xml_temp_path)
-        current_app.logger.info(f"[{job_id}] MusicXML 파일 생성 성공: {xml_temp_path}")
+    timeout = current_app.config['RENDER_TIMEOUT_SEC'] + 10
+    with _pdf_flights_lock:
+        flight = _pdf_flights.get(job_id)
+        leader = flight is None
+        if leader:
+            flight = _pdf_flights[job_id] = threading.Event()
+    if not leader:
+        flight.wait(timeout)
+        return _existing_pdf(pdf_path)
+
+    lock_path = pdf_path + '.lock'
+    try:
+        deadline = time.monotonic() + timeout
+        while not try_lock_file(lock_path, stale_sec=timeout):
+            # 다른 워커 프로세스가 렌더링 중
+            if os.path.exists(pdf_path) or time.monotonic() > deadline:
+                return _existing_pdf(pdf_path)
+            time.sleep(0.2)
+        try:
+            if os.path.exists(pdf_path):
+                return pdf_path
+            track = EventTrack.load(events_path)
+            with metrics.timer('drum_stage_duration_seconds', stage='pdf'):
+                _render_job_pdf(track, pdf_path, job_id, result_dir)
+        finally:
+            os.remove(lock_path)
+
+        cache_key = _read_job_meta(result_dir).get('cacheKey')
+        cache = current_app.extensions.get('result_cache')
+        if cache is not None and cache_key:
+            try:
+                cache.attach(cache_key, result_dir, job_id, 'score.pdf')
+            except OSError as e:
+                current_app.logger.warning(f"[{job_id}] PDF 캐시 저장 실패: {e}")
+        return pdf_path
+    finally:
+        with _pdf_flights_lock:
+            _pdf_flights.pop(job_id, None)
+        flight.set()
 
-    except Exception as e:
-        error_trace = traceback.format_exc()
-        current_app.logger.error(f"[{job_id}] MusicXML 생성 실패: {e}\n{error_trace}")
-        update_job_status(job_id, 'error', '악보(XML) 변환 실패')
-        return False
 
+def _render_job_pdf(track, pdf_path, job_id, result_dir):
+    # 업로드 때 프로파일링한 작업이면 PDF 렌더링도 같은 프로파일에 이어 붙임
+    if not _read_job_meta(result_dir).get('profile'):
+        return render_score_pdf(track.events(), track.bpm, pdf_path, job_id)
+    profile = ProfileSession(job_id, current_app.config['PROFILE_INTERVAL_MS'])
     try:
-        # 3. MusicXML -> PDF 변환 (Subprocess 호출)
-        update_job_status(job_id, 'processing', '악보(PDF) 생성 중...')
-        command = [musescore_path, '-o', pdf_output_path, xml_temp_path]
+        with profile.section('pdf'):
+            return render_score_pdf(track.events(), track.bpm, pdf_path, job_id)
+    finally:
+        profile.save(result_dir)
+
+
+def _existing_pdf(pdf_path):
+    if os.path.exists(pdf_path):
+        return pdf_path
+    from app.services.rendering import RenderTimeout
+    raise RenderTimeout("다른 요청의 PDF 렌더링을 기다리다 시간 초과")
+
 
-        result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+def _write_job_meta(result_dir, **fields):
+    with open(os.path.join(result_dir, JOB_META_NAME), 'w') as f:
+        json.dump(fields, f)
 
-        if result.returncode != 0:
-            current_app.logger.error(f"[{job_id}] MuseScore PDF 변환 실패. Stderr: {result.stderr}")
-            update_job_status(job_id, 'error', f'PDF 변환 실패: {result.stderr[:100]}')
-            return False
-        elif not os.path.exists(pdf_output_path):
-            current_app.logger.error(f"[{job_id}] MuseScore는 성공했으나 PDF 파일이 생성되지 않음.")
-            update_job_status(job_id, 'error', 'PDF 파일 생성 알 수 없는 오류')
-            return False
 
-        current_app.logger.info(f"[{job_id}] PDF 악보 생성 성공: {pdf_output_path}")
-        return True
+def _read_job_meta(result_dir):
+    try:
+        with open(os.path.join(result_dir, JOB_META_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# --- 업로드 파일 디코딩 (작업당 1회) ---
+def decode_source_audio(audio_path, result_dir, job_id, progress=None):
+    """업로드 파일을 한 번만 디코딩/리샘플링하여 모든 단계가 공유할 AudioHandle을 만듭니다."""
+    from app.tasks import update_job_status
 
+    if progress is None:
+        progress = create_progress_reporter(job_id)
+    progress.stage('decode')
+    try:
+        with metrics.timer('drum_stage_duration_seconds', stage='decode'):
+            source_audio = AudioHandle.decode(
+                audio_path, os.path.join(result_dir, SOURCE_AUDIO_NAME),
+                sr=SR, ffmpeg_path=current_app.config['FFMPEG_PATH'],
+                mono_in_memory_max_sec=current_app.config['AUDIO_MONO_IN_MEMORY_MAX_SEC'],
+            )
     except Exception as e:
-        error_trace = traceback.format_exc()
-        current_app.logger.error(f"[{job_id}] PDF 변환(subprocess) 중 치명적 오류: {e}\n{error_trace}")
-        update_job_status(job_id, 'error', 'PDF 변환 중 타임아웃 또는 오류 발생')
-        return False
+        current_app.logger.error(f"[{job_id}] 오디오 디코딩 실패: {e}")
+        progress.close()
+        update_job_status(job_id, 'error', '오디오 파일을 읽을 수 없습니다.')
+        return None
 
-    finally:
-        # 4. 임시 XML 파일 삭제
-        if os.path.exists(xml_temp_path):
-            os.remove(xml_temp_path)
-            
-# --- 전체 오디오 처리 파이프라인 ---
-def run_processing_pipeline(job_id, audio_path):
+    current_app.logger.info(f"[{job_id}] 오디오 디코딩 완료 ({source_audio.duration:.1f}초)")
+    return source_audio
+
+# --- 파이프라인 스테이지 (분리 -> 분석) ---
+# [신규] 스테이지마다 별도의 작업 풀(app/tasks.py)에서 실행되어, 한 작업의 분석이
+# 다른 작업의 드럼 분리와 동시에 진행될 수 있습니다. PDF 렌더링은 파이프라인에 포함되지 않습니다.
+# 각 스테이지 함수는 다음 스테이지 이름을 반환하고, 작업이 끝났거나 실패했으면 None을 반환합니다.
+RETRY_LATER = 'retry'  # 같은 스테이지를 잠시 뒤에 다시 실행 (캐시 잠금 대기)
+
+
+class PipelineJob:
+    """스테이지 사이에 넘겨지는 작업 하나의 상태."""
+
+    def __init__(self, job_id, audio_path, audio_hash=None, profile=False):
+        self.job_id = job_id
+        self.audio_path = audio_path
+        self.audio_hash = audio_hash
+        self.result_dir = None
+        self.cache_key = None
+        self.holds_cache_lock = False
+        self.source_audio = None
+        self.drum_path = None
+        self.onset_detector = None
+        self.bpm = 120
+        self.events = None
+        self.midi_future = None
+        self.progress = create_progress_reporter(job_id)
+        self.profile = ProfileSession(job_id, current_app.config['PROFILE_INTERVAL_MS']) if profile else None
+
+    def cleanup(self):
+        """중간 버퍼와 캐시 잠금을 정리합니다. (실패/완료 어느 쪽이든 마지막에 호출)"""
+        self.progress.close()
+        if self.source_audio is not None:
+            self.source_audio.release(delete=True)
+            self.source_audio = None
+        if self.holds_cache_lock:
+            current_app.extensions['result_cache'].unlock(self.cache_key)
+            self.holds_cache_lock = False
+
+
+def _complete_from_cache(job):
     from app.tasks import update_job_status
 
-    result_dir = os.path.join(current_app.config['RESULT_FOLDER'], job_id)
-    os.makedirs(result_dir, exist_ok=True)
+    current_app.logger.info(f"[{job.job_id}] 캐시 적중 ({job.cache_key[:12]}). 처리 단계를 건너뜁니다.")
+    job.progress.close()
+    update_job_status(job.job_id, 'completed', '작업이 완료되었습니다.', results=job_results(job.job_id))
+    job.cleanup()
+
+
+def stage_separation(job):
+    """캐시 확인 -> 디코딩 -> 드럼 분리."""
+    from app.tasks import update_job_status
+    from app.services.onsets import OnsetDetector
+
+    job_id = job.job_id
+    job.result_dir = os.path.join(current_app.config['RESULT_FOLDER'], job_id)
+    os.makedirs(job.result_dir, exist_ok=True)
+
+    # 같은 오디오 + 같은 모델/파이프라인 버전이면 저장된 결과물로 즉시 완료
+    cache = current_app.extensions.get('result_cache')
+    if cache is not None and job.audio_hash is not None:
+        job.cache_key = cache.make_key(job.audio_hash)
+    # 나중에 PDF를 렌더링할 때 쓰는 정보: 같은 캐시 항목에 추가할 키, 렌더링도 프로파일링할지
+    _write_job_meta(job.result_dir, cacheKey=job.cache_key, profile=job.profile is not None)
+    if job.cache_key is not None:
+        if cache.restore(job.cache_key, job.result_dir, job_id):
+            metrics.inc('drum_result_cache_lookups_total', result='hit')
+            _complete_from_cache(job)
+            return None
+        if not cache.try_lock(job.cache_key):
+            # 같은 파일을 다른 작업이 처리 중: 분리 슬롯을 점유하지 않고 잠시 뒤 다시 확인
+            update_job_status(job_id, 'processing', '같은 파일을 처리 중인 작업을 기다리는 중...')
+            return RETRY_LATER
+        job.holds_cache_lock = True
+        # 잠금을 얻기 직전에 다른 작업이 결과를 저장했을 수 있음
+        if cache.restore(job.cache_key, job.result_dir, job_id):
+            metrics.inc('drum_result_cache_lookups_total', result='hit')
+            _complete_from_cache(job)
+            return None
+        metrics.inc('drum_result_cache_lookups_total', result='miss')
+
+    # --- 0. 디코딩 (업로드 파일은 여기서 한 번만 디코딩, 이후 단계는 공유 버퍼 사용) ---
+    job.source_audio = decode_source_audio(job.audio_path, job.result_dir, job_id, progress=job.progress)
+    if job.source_audio is None:
+        job.cleanup()
+        return None
 
     # --- 1. 드럼 분리 ---
-    update_job_status(job_id, 'processing', '드럼 트랙 분리 시작...')
     current_app.logger.info(f"[{job_id}] Demucs 음원 분리 시작...")
-    
-    separated_drum_path = run_demucs_separation(audio_path, result_dir, job_id)
-    
-    if not separated_drum_path:
+
+    # 분리 워커가 청크를 확정할 때마다 그 구간의 온셋 검출용 STFT를 미리 계산
+    job.onset_detector = OnsetDetector(SR)
+
+    def on_committed(stem_path, frames):
+        # 파일이 청크마다 길어지므로 매번 새로 열고, 다 읽으면 바로 해제
+        stem = None
+        try:
+            stem = AudioHandle.open(stem_path, sr=SR)
+            job.onset_detector.feed(stem.read_mono, min(frames, stem.num_frames))
+        except Exception as e:
+            current_app.logger.warning(f"[{job_id}] 분리 중 온셋 선계산 실패 (완료 후 계산): {e}")
+        finally:
+            if stem is not None:
+                stem.release()
+
+    # 원본 대신 이미 44.1kHz float32로 디코딩된 WAV를 Demucs에 전달
+    with metrics.timer('drum_stage_duration_seconds', stage='separation'):
+        job.drum_path = run_demucs_separation(
+            job.source_audio.path, job.result_dir, job_id, on_committed=on_committed, progress=job.progress
+        )
+    if not job.drum_path:
         current_app.logger.error(f"[{job_id}] 작업 실패: Demucs 실행 오류.")
-        return # [중요] 여기서 함수 종료
+        job.cleanup()
+        return None
+    return 'analysis'
+
+
+def stage_analysis(job):
+    """BPM 분석 -> 온셋 검출/분류 -> MIDI/이벤트 파일 -> 완료 처리."""
+    import librosa
+    from app.tasks import update_job_status
 
-    # --- 2. BPM 분석 ---
-    update_job_status(job_id, 'processing', '음원 템포(BPM) 분석 중...')
-    current_app.logger.info(f"[{job_id}] BPM 분석 시작...")
+    job_id = job.job_id
     try:
-        y, sr = librosa.load(audio_path, sr=SR)
-        # [수정] librosa.beat.beat_track 사용 
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        bpm = int(tempo)
-        current_app.logger.info(f"[{job_id}] 분석된 BPM: {bpm}")
-    except Exception as e:
-        bpm = 120
-        current_app.logger.warning(f"[{job_id}] BPM 분석 실패: {e}. 기본값 {bpm}으로 설정.")
-    
-    update_job_status(job_id, 'processing', 'BPM 분석 완료. MIDI 변환 시작...')
+        # --- 2. BPM 분석 ---
+        job.progress.stage('bpm')
+        current_app.logger.info(f"[{job_id}] BPM 분석 시작...")
+        try:
+            # 파일을 다시 디코딩하지 않고 공유 버퍼의 모노 신호 사용
+            with metrics.timer('drum_stage_duration_seconds', stage='bpm'):
+                tempo, _ = librosa.beat.beat_track(y=job.source_audio.mono(), sr=job.source_audio.sr)
+            job.bpm = int(tempo)
+            current_app.logger.info(f"[{job_id}] 분석된 BPM: {job.bpm}")
+        except Exception as e:
+            job.bpm = 120
+            current_app.logger.warning(f"[{job_id}] BPM 분석 실패: {e}. 기본값 {job.bpm}으로 설정.")
+    finally:
+        # 디코딩한 원본 버퍼는 BPM 분석이 끝나면 더 이상 필요 없음
+        job.source_audio.release(delete=True)
+        job.source_audio = None
 
     # --- 3. MIDI 생성 ---
     current_app.logger.info(f"[{job_id}] MIDI 생성 시작...")
-    
-    midi_success = generate_midi_from_audio(separated_drum_path, result_dir, bpm)
+    job.events = classify_drum_events(
+        job.drum_path, job.result_dir, onset_detector=job.onset_detector, progress=job.progress
+    )
+    job.onset_detector = None
 
-    # [수정] MIDI 생성 실패 시, 여기서 즉시 'error'로 상태 변경하고 종료
-    if not midi_success:
+    # MIDI 생성 실패 시, 여기서 즉시 'error'로 상태 변경하고 종료
+    if job.events is None:
+        job.progress.close()
         update_job_status(job_id, 'error', 'MIDI 생성 중 오류가 발생했습니다.')
         current_app.logger.error(f"[{job_id}] 작업 실패: MIDI 생성 실패.")
-        return # [중요] 여기서 함수 종료
+        job.cleanup()
+        return None
+
+    # [신규] MIDI 파일은 이벤트 파일(.npz) 저장과 동시에 기록
+    job.midi_future = start_midi_write(job.events, job.result_dir, job.bpm)
+    try:
+        with metrics.timer('drum_stage_duration_seconds', stage='outputs'):
+            save_events(os.path.join(job.result_dir, f"{job_id}.events.npz"), job.events, job.bpm, LABELS)
+            job.midi_future.result()
+    except Exception as e:
+        current_app.logger.error(f"[{job_id}] MIDI/이벤트 파일 쓰기 실패: {e}")
+        job.progress.close()
+        update_job_status(job_id, 'error', 'MIDI 생성 중 오류가 발생했습니다.')
+        job.cleanup()
+        return None
+
+    _complete_job(job)
+    return None
 
-    # --- 4. PDF 생성 (MIDI가 성공했을 때만 실행) ---
-    midi_file_path = os.path.join(result_dir, f"{job_id}.mid")
-    pdf_file_path = os.path.join(result_dir, f"{job_id}.pdf")
-    
-    pdf_success = generate_pdf_from_midi(midi_file_path, pdf_file_path, job_id)
 
-    if not pdf_success:
-        current_app.logger.error(f"[{job_id}] PDF 변환 실패. MIDI만 제공됩니다.")
-        # PDF 실패는 전체 실패가 아님, MIDI는 성공했으므로 계속 진행
+def _complete_job(job):
+    """완료 처리 -> 결과물 캐시 저장. (PDF는 처음 요청될 때 렌더링)"""
+    from app.tasks import update_job_status
 
-    # --- 5. 최종 결과 업데이트 (MIDI 성공 시 무조건 'completed'
-    results = {
+    job_id = job.job_id
+    try:
+        # --- 4. 최종 결과 업데이트 (MIDI와 이벤트가 있으면 'completed')
+        job.progress.close()
+        update_job_status(job_id, 'completed', '작업이 완료되었습니다.', results=job_results(job_id))
+        current_app.logger.info(f"[{job_id}] 모든 작업 완료.")
+
+        if job.holds_cache_lock:
+            try:
+                current_app.extensions['result_cache'].store(job.cache_key, job.result_dir, job_id)
+            except OSError as e:
+                current_app.logger.warning(f"[{job_id}] 결과물 캐시 저장 실패: {e}")
+    finally:
+        job.cleanup()
+
+
+def _profiled(name, stage_fn):
+    """작업에 프로파일 세션이 있으면 스테이지를 샘플링하고, 작업이 끝나면 작업 폴더에 결과물을 씁니다."""
+    def run(job):
+        if job.profile is None:
+            return stage_fn(job)
+        finished = True
+        try:
+            with job.profile.section(name):
+                next_stage = stage_fn(job)
+            finished = next_stage is None
+            return next_stage
+        finally:
+            if finished and job.result_dir:
+                try:
+                    job.profile.save(job.result_dir)
+                except OSError as e:
+                    current_app.logger.warning(f"[{job.job_id}] 프로파일 저장 실패: {e}")
+    return run
+
+
+PIPELINE_STAGES = {
+    'separation': _profiled('separation', stage_separation),
+    'analysis': _profiled('analysis', stage_analysis),
+}
+FIRST_STAGE = 'separation'
+
+
+def job_results(job_id):
+    """완료된 작업의 결과물 URL."""
+    return {
         "midiUrl": f"/download/midi/{job_id}",
-        # [수정] PDF가 실패했어도 URL은 보냄 (프론트/백엔드에서 404 처리)
-        "pdfUrl": f"/download/pdf/{job_id}", 
+        # [수정] PDF는 이 URL로 처음 요청될 때 렌더링됨
+        "pdfUrl": f"/download/pdf/{job_id}",
+        # [신규] 분류된 타격 이벤트 (미리보기용, ?start=&end=로 구간 조회)
+        "eventsUrl": f"/api/events/{job_id}",
     }
-    update_job_status(job_id, 'completed', '작업이 완료되었습니다.', results=results)
-    current_app.logger.info(f"[{job_id}] 모든 작업 완료.")
\ No newline at end of file
+
+# --- 전체 오디오 처리 파이프라인 ---
+def run_processing_pipeline(job_id, audio_path, audio_hash=None):
+    """스케줄러 없이 현재 스레드에서 모든 스테이지를 차례로 실행합니다. (스크립트/테스트용)"""
+    job = PipelineJob(job_id, audio_path, audio_hash=audio_hash)
+    stage = FIRST_STAGE
+    try:
+        while stage is not None:
+            next_stage = PIPELINE_STAGES[stage](job)
+            if next_stage == RETRY_LATER:
+                time.sleep(0.5)
+            else:
+                stage = next_stage
+    finally:
+        job.cleanup()
@@ -0,0 +1,97 @@
+# backend/app/services/features.py
+
+import numpy as np
+import librosa
+
+# --- 상수 정의 (audio_processor.py / modeling/src/data_utils.py 와 동일해야 함) ---
+SR = 44100
+N_MELS = 128
+N_FFT = 2048
+HOP_LENGTH = 512
+TARGET_SHAPE = (128, 128)
+
+# 온셋 기준 분류 윈도우 (온셋 40ms 전 ~ 110ms 후)
+WINDOW_PRE, WINDOW_POST = 0.04, 0.11
+
+# power_to_db 기본값 (librosa와 동일)
+AMIN = 1e-10
+TOP_DB = 80.0
+
+
+def segment_bounds(onset_times, total, sr=SR):
+    """온셋 시각 배열로부터 각 세그먼트의 [시작, 끝) 샘플 위치를 계산합니다. (total: 트랙 전체 샘플 수)"""
+    onset_times = np.asarray(onset_times, dtype=np.float64)
+    starts = np.array([max(0, int((t - WINDOW_PRE) * sr)) for t in onset_times], dtype=np.int64)
+    ends = np.array([min(total, int((t + WINDOW_POST) * sr)) for t in onset_times], dtype=np.int64)
+    return starts, ends
+
+
+class MelFeatureEngine:
+    """
+    드럼 트랙 전체에 대해 한 번만 준비(윈도우 함수, 멜 필터뱅크, 프레임 인덱스)를 해 두고,
+    여러 온셋의 분류 입력을 배치로 한꺼번에 계산하는 특징 추출기입니다.
+
+    온셋 윈도우마다 librosa.feature.melspectrogram + power_to_db(ref=np.max)를 계산하고
+    128 프레임으로 자르거나 0으로 채운 것과 같은 입력을 만듭니다.
+    (세그먼트 경계의 center 패딩과 윈도우별 ref=np.max 정규화까지 동일하게 재현)
+    """
+
+    def __init__(self, y, sr=SR, offset=0, total=None):
+        # y가 트랙 일부라면 offset은 y[0]의 트랙 내 샘플 위치, total은 트랙 전체 길이
+        # (세그먼트 경계는 항상 트랙 전체 기준으로 계산하므로 구간별 결과가 전체 계산과 같음)
+        self.y = y
+        self.sr = sr
+        self.offset = offset
+        self.total = len(y) + offset if total is None else total
+        self.segment_length = int((WINDOW_PRE + WINDOW_POST) * sr)
+        self.n_frames = min(1 + self.segment_length // HOP_LENGTH, TARGET_SHAPE[1])
+
+        # 트랙 전체에서 한 번만 계산: 윈도우 함수와 멜 필터뱅크
+        self.window = librosa.filters.get_window('hann', N_FFT, fftbins=True)
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=N_FFT, n_mels=N_MELS)
+
+        # 세그먼트 시작점 기준 각 프레임 샘플의 상대 위치 (center=True 이므로 N_FFT//2 만큼 앞에서 시작)
+        self.relative_positions = (
+            np.arange(self.n_frames)[:, np.newaxis] * HOP_LENGTH
+            - N_FFT // 2
+            + np.arange(N_FFT)[np.newaxis, :]
+        )
+
+    def segment_bounds(self, onset_times):
+        return segment_bounds(onset_times, self.total, self.sr)
+
+    def fill(self, onset_times, out):
+        """
+        onset_times에 해당하는 (N, 128, 128) 멜 스펙트로그램(dB)을 out[:N, ..., 0]에 씁니다.
+        out은 (배치 크기, 128, 128, 1) float32 배열입니다.
+        """
+        n = len(onset_times)
+        if n == 0:
+            return out
+
+        starts, ends = self.segment_bounds(onset_times)
+
+        # (N, 프레임 수, N_FFT) 프레임 행렬을 트랙에서 직접 모음 (세그먼트 복사/패딩 없음)
+        # 세그먼트 밖 샘플은 center/길이 패딩의 0과 같도록 마스킹
+        positions = starts[:, np.newaxis, np.newaxis] - self.offset + self.relative_positions[np.newaxis]
+        inside = (self.relative_positions[np.newaxis] >= 0) & (
+            self.relative_positions[np.newaxis] < (ends - starts)[:, np.newaxis, np.newaxis]
+        )
+        frames = self.y[np.clip(positions, 0, len(self.y) - 1)]
+        frames[~inside] = 0.0
+
+        # librosa.stft와 같은 순서: (윈도우 * 프레임) -> rfft -> complex64 -> |S|^2
+        stft = np.fft.rfft(self.window * frames, axis=-1).astype(np.complex64)
+        power = np.abs(stft) ** 2
+        mel = np.einsum('nft,mf->nmt', power.transpose(0, 2, 1), self.mel_basis, optimize=True)
+
+        # 윈도우별 ref=np.max 정규화 (librosa.power_to_db와 동일)
+        ref = np.max(mel, axis=(1, 2), keepdims=True)
+        mel_db = 10.0 * np.log10(np.maximum(AMIN, mel))
+        mel_db -= 10.0 * np.log10(np.maximum(AMIN, ref))
+        mel_db = np.maximum(mel_db, mel_db.max(axis=(1, 2), keepdims=True) - TOP_DB)
+
+        # 기존과 동일하게 128 프레임까지는 0으로 채움
+        out[:n, :, :self.n_frames, 0] = mel_db
+        out[:n, :, self.n_frames:, 0] = 0.0
+        return out
@@ -0,0 +1,249 @@
+# backend/app/services/inference.py
+
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from flask import current_app, has_app_context
+
+# 모델 입력 형태 (배치 차원 제외)
+INPUT_SHAPE = (128, 128, 1)
+
+# [신규] TFLITE_DELEGATE 값 -> 인터프리터 op resolver
+# 'xnnpack': 기본 delegate(XNNPACK CPU 커널)를 적용, 'none': 내장 커널만 사용 (비교/문제 해결용)
+DELEGATES = ('xnnpack', 'none')
+
+# [신규] INFERENCE_BACKEND 값: 같은 모델을 어느 런타임으로 실행할지
+#   tensorflow     : 전체 TensorFlow 패키지의 tf.lite.Interpreter (기존 동작)
+#   tflite_runtime : 인터프리터만 들어 있는 tflite-runtime 패키지 (같은 .tflite 모델, 이미지/메모리가 훨씬 작음)
+#   onnxruntime    : modeling/scripts/export_onnx.py가 만든 .onnx 모델을 ONNX Runtime으로 실행
+# (값이 곧 import하는 최상위 모듈 이름)
+INFERENCE_BACKENDS = ('tensorflow', 'tflite_runtime', 'onnxruntime')
+
+
+def _logger():
+    # 분석 워커 프로세스처럼 앱 컨텍스트가 없는 곳에서도 로드 함수를 쓸 수 있도록
+    return current_app.logger if has_app_context() else logging.getLogger(__name__)
+
+
+def resolve_num_threads(num_threads, interpreters=1):
+    """TFLITE_NUM_THREADS가 0이면 코어를 인터프리터 수로 나눠 서로 경쟁하지 않도록 합니다."""
+    if num_threads and num_threads > 0:
+        return num_threads
+    return max(1, (os.cpu_count() or 1) // max(1, interpreters))
+
+
+def preload_backend(backend):
+    """백엔드 모듈을 미리 import합니다. (분석 워커가 첫 작업 전에 import 시간을 치르도록)"""
+    __import__(backend)
+
+
+def _tflite_classes(backend):
+    # TensorFlow는 import에만 수 초가 걸리므로 처음 모델을 로드할 때 가져옴 (상태 조회 워커는 로드하지 않음)
+    if backend == 'tflite_runtime':
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+        return Interpreter, OpResolverType
+    import tensorflow as tf
+    return tf.lite.Interpreter, tf.lite.experimental.OpResolverType
+
+
+class OnnxInterpreter:
+    """
+    ONNX Runtime 세션을 tf.lite.Interpreter와 같은 방식(set_tensor -> invoke -> get_tensor)으로 쓰게 해 주는 래퍼.
+    prepare_batch_input / run_inference_batch와 호출하는 쪽 코드를 백엔드마다 나누지 않기 위함입니다.
+    """
+
+    def __init__(self, model_path=None, model_content=None, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            model_content if model_content is not None else model_path,
+            sess_options=options, providers=['CPUExecutionProvider'],
+        )
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._output_name = self.session.get_outputs()[0].name
+        # 배치 차원은 동적 ('N' 등 문자열)이므로 resize_tensor_input으로 정한 값을 보고용으로만 보관
+        self._input_shape = [d if isinstance(d, int) else 1 for d in model_input.shape]
+        self._input = None
+        self._output = None
+
+    def get_input_details(self):
+        return [{'index': 0, 'name': self._input_name, 'shape': np.array(self._input_shape), 'dtype': np.float32}]
+
+    def get_output_details(self):
+        return [{'index': 0, 'name': self._output_name}]
+
+    def resize_tensor_input(self, index, shape):
+        self._input_shape = list(shape)
+
+    def allocate_tensors(self):
+        pass  # ONNX Runtime은 실행할 때 입력 크기에 맞춰 할당
+
+    def set_tensor(self, index, value):
+        self._input = value
+
+    def invoke(self):
+        self._output = self.session.run([self._output_name], {self._input_name: self._input})[0]
+
+    def get_tensor(self, index):
+        return self._output
+
+
+# --- TFLite 모델 로드 함수 ---
+def load_tflite_model(model_path, model_content=None, num_threads=None, delegate='xnnpack', backend='tensorflow'):
+    """
+    추론 인터프리터를 생성합니다. model_content가 있으면 디스크를 다시 읽지 않습니다.
+    num_threads는 연산 스레드 수 (None이면 런타임 기본값), delegate는 DELEGATES 중 하나 (onnxruntime은 무시),
+    backend는 INFERENCE_BACKENDS 중 하나. 어느 백엔드든 tf.lite.Interpreter와 같은 메서드로 사용합니다.
+    """
+    if model_content is None and not os.path.exists(model_path):
+        _logger().error(f"치명적 오류: 모델 파일 '{model_path}'를 찾을 수 없습니다.")
+        raise FileNotFoundError(f"모델 파일을 찾을 수 없습니다: {model_path}")
+    if delegate not in DELEGATES:
+        raise ValueError(f"TFLITE_DELEGATE는 {DELEGATES} 중 하나여야 합니다: {delegate}")
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND는 {INFERENCE_BACKENDS} 중 하나여야 합니다: {backend}")
+    _logger().info(f"모델 로딩 중: {model_path} ({backend}, 스레드 {num_threads or '기본'}, delegate {delegate})")
+
+    if backend == 'onnxruntime':
+        interpreter = OnnxInterpreter(model_path, model_content=model_content, num_threads=num_threads)
+    else:
+        interpreter_class, op_resolver_type = _tflite_classes(backend)
+        options = {'num_threads': num_threads}
+        if delegate == 'none':
+            options['experimental_op_resolver_type'] = op_resolver_type.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        if model_content is not None:
+            interpreter = interpreter_class(model_content=model_content, **options)
+        else:
+            interpreter = interpreter_class(model_path=model_path, **options)
+    interpreter.allocate_tensors()
+    _logger().info("모델 로딩 및 텐서 할당 완료.")
+    return interpreter
+
+
+# --- 배치 추론 헬퍼 함수 ---
+def prepare_batch_input(interpreter, batch_size):
+    """입력 텐서의 배치 차원을 batch_size로 재할당하고, 실제 사용할 배치 크기를 반환합니다."""
+    input_details = interpreter.get_input_details()[0]
+    if int(input_details['shape'][0]) == batch_size:
+        return batch_size
+
+    try:
+        interpreter.resize_tensor_input(input_details['index'], [batch_size, *INPUT_SHAPE])
+        interpreter.allocate_tensors()
+        return batch_size
+    except Exception as e:
+        # 배치 차원이 고정된(구버전) 모델은 배치 1로 동작합니다.
+        _logger().warning(f"배치 크기 {batch_size}로 텐서 재할당 실패: {e}. 배치 1로 추론합니다.")
+        interpreter.resize_tensor_input(input_details['index'], [1, *INPUT_SHAPE])
+        interpreter.allocate_tensors()
+        return 1
+
+
+def run_inference_batch(interpreter, batch):
+    """(N, 128, 128, 1) 배치를 한 번의 invoke로 분류하여 (N, 클래스 수) 확률을 반환합니다."""
+    interpreter.set_tensor(interpreter.get_input_details()[0]['index'], batch)
+    interpreter.invoke()
+    return interpreter.get_tensor(interpreter.get_output_details()[0]['index'])
+
+
+# --- 프로세스 단위 인터프리터 풀 ---
+class InterpreterPool:
+    """
+    모델 파일을 한 번만 읽어 size개의 인터프리터를 미리 만들고 워밍업한 뒤,
+    작업 스레드에 하나씩 빌려주는 풀입니다. (인터프리터 하나는 동시에 한 스레드만 사용)
+    """
+
+    def __init__(self, model_path, size, batch_size, num_threads=0, delegate='xnnpack', backend='tensorflow'):
+        self.model_path = model_path
+        self.size = max(1, size)
+        self.requested_batch_size = batch_size
+        self.num_threads = resolve_num_threads(num_threads, self.size)
+        self.delegate = delegate
+        self.backend = backend
+        self.batch_size = None
+        self.error = None
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._ready = threading.Event()
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set() and self.error is None
+
+    def warm_up(self):
+        """모델을 로드하고 더미 텐서로 한 번씩 추론하여 풀을 채웁니다."""
+        try:
+            with open(self.model_path, 'rb') as f:
+                model_content = f.read()
+
+            for _ in range(self.size):
+                interpreter = load_tflite_model(
+                    self.model_path, model_content=model_content, num_threads=self.num_threads,
+                    delegate=self.delegate, backend=self.backend,
+                )
+                self.batch_size = prepare_batch_input(interpreter, self.requested_batch_size)
+                run_inference_batch(interpreter, np.zeros((self.batch_size, *INPUT_SHAPE), dtype=np.float32))
+                self._idle.put(interpreter)
+
+            current_app.logger.info(
+                f"인터프리터 풀 준비 완료 (인터프리터 {self.size}개, 배치 크기 {self.batch_size}, "
+                f"스레드 {self.num_threads}개씩, delegate {self.delegate}, 백엔드 {self.backend})"
+            )
+        except Exception as e:
+            self.error = str(e)
+            current_app.logger.error(f"인터프리터 풀 워밍업 실패: {e}")
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout=None):
+        """워밍업이 끝날 때까지 기다립니다. 워밍업이 실패했으면 예외를 발생시킵니다."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("인터프리터 풀 워밍업이 끝나지 않았습니다.")
+        if self.error:
+            raise RuntimeError(f"인터프리터 풀을 사용할 수 없습니다: {self.error}")
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """유휴 인터프리터를 하나 빌려주고, with 블록이 끝나면 풀에 반환합니다."""
+        self.wait_ready(timeout)
+        try:
+            interpreter = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("사용 가능한 인터프리터가 없습니다.")
+        try:
+            yield interpreter
+        finally:
+            self._idle.put(interpreter)
+
+
+def init_interpreter_pool(app):
+    """앱 시작 시 인터프리터 풀을 만들고, 백그라운드 스레드에서 워밍업을 시작합니다."""
+    pool = InterpreterPool(
+        app.config['MODEL_PATH'],
+        size=app.config['INTERPRETER_POOL_SIZE'],
+        batch_size=app.config['INFERENCE_BATCH_SIZE'],
+        num_threads=app.config['TFLITE_NUM_THREADS'],
+        delegate=app.config['TFLITE_DELEGATE'],
+        backend=app.config['INFERENCE_BACKEND'],
+    )
+    app.extensions['interpreter_pool'] = pool
+
+    def warm_up_with_context():
+        with app.app_context():
+            pool.warm_up()
+
+    threading.Thread(target=warm_up_with_context, name="model-warmup", daemon=True).start()
+    return pool
+
+
+def get_interpreter_pool():
+    """현재 앱의 인터프리터 풀을 반환합니다."""
+    return current_app.extensions['interpreter_pool']
@@ -0,0 +1,279 @@
+# backend/app/services/job_store.py
+"""
+작업 상태 저장소.
+
+    MemoryJobStore : 프로세스 메모리의 dict (기존 방식, 워커 프로세스 하나일 때만 사용)
+    SQLiteJobStore : WAL 모드 SQLite 파일. 여러 gunicorn 워커가 같은 파일을 공유하므로
+                     어느 워커로 들어온 /api/result/<job_id> 요청이든 같은 상태를 봅니다.
+
+진행 상황처럼 자주 바뀌는 값은 buffered=True로 넘기면 메모리에 모아 두었다가
+flush_interval마다 한 트랜잭션으로 기록합니다. (같은 프로세스의 get()은 모아 둔 값까지 반영)
+
+작업의 version은 변경 시각(마이크로초)으로, 어느 프로세스에서 읽어도 같은 변경이면 같은 값입니다.
+wait_for_change(job_id, since)는 version이 since보다 커질 때까지 기다립니다. (SSE/long-poll 용)
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id     TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    version    INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+"""
+
+
+class _VersionClock:
+    """프로세스 안에서 단조 증가하는 변경 시각(마이크로초)."""
+
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._last = max(time.time_ns() // 1000, self._last + 1)
+            return self._last
+
+
+class MemoryJobStore:
+    """프로세스 메모리에 작업 상태를 보관하는 저장소."""
+
+    def __init__(self, ttl_sec=0, evict_interval=600):
+        self.ttl_sec = ttl_sec
+        self.evict_interval = evict_interval
+        self._last_evict = time.time()
+        self._jobs = {}
+        self._meta = {}  # job_id -> [version, created_at, updated_at]
+        self._clock = _VersionClock()
+        self._changed = threading.Condition()
+
+    def get(self, job_id):
+        return self.get_versioned(job_id)[0]
+
+    def get_versioned(self, job_id):
+        """(작업 상태, version)을 반환합니다. 작업이 없으면 (None, 0)."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None, 0
+            return dict(job), self._meta[job_id][0]
+
+    def wait_for_change(self, job_id, since, timeout):
+        """version이 since보다 커지거나 timeout(초)이 지날 때까지 기다린 뒤 (작업 상태, version)을 반환합니다."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job, version = self.get_versioned(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or version > since or remaining <= 0:
+                    return job, version
+                self._changed.wait(remaining)
+
+    def update(self, job_id, fields, buffered=False):
+        now = time.time()
+        with self._changed:
+            job = self._jobs.setdefault(job_id, {'status': 'pending', 'message': '대기 중'})
+            job.update(fields)
+            meta = self._meta.setdefault(job_id, [0, now, now])
+            meta[0] = self._clock.next()
+            meta[2] = now
+            self._changed.notify_all()
+        if now - self._last_evict >= self.evict_interval:
+            self._last_evict = now
+            self.evict()
+
+    def count_by_status(self):
+        """상태 -> 작업 수."""
+        with self._changed:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return counts
+
+    def evict(self):
+        """ttl_sec보다 오래 갱신되지 않은 작업을 지웁니다."""
+        if self.ttl_sec <= 0:
+            return 0
+        cutoff = time.time() - self.ttl_sec
+        with self._changed:
+            expired = [job_id for job_id, meta in self._meta.items() if meta[2] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+                del self._meta[job_id]
+        return len(expired)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    """WAL 모드 SQLite 파일에 작업 상태를 보관하는 저장소. 여러 프로세스가 함께 써도 안전합니다."""
+
+    def __init__(self, path, ttl_sec=7 * 24 * 3600, flush_interval=0.5, evict_interval=600, poll_interval=0.25):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.flush_interval = flush_interval
+        self.evict_interval = evict_interval
+        self.poll_interval = poll_interval  # 다른 프로세스의 변경을 확인하는 주기
+        self._local = threading.local()
+        self._pending = {}  # job_id -> (아직 기록하지 않은 필드, version)
+        self._clock = _VersionClock()
+        self._lock = threading.Lock()        # _pending 보호
+        self._changed = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # 같은 작업의 기록 순서 보장
+        self._stop = threading.Event()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+        self._flusher = threading.Thread(target=self._run_flusher, name="job-store-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _conn(self):
+        # sqlite3 연결은 스레드마다 따로 사용
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, job_id):
+        return self.get_versioned(job_id)[0]
+
+    def get_versioned(self, job_id):
+        """(작업 상태, version)을 반환합니다. 작업이 없으면 (None, 0)."""
+        row = self._conn().execute('SELECT data, version FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        with self._lock:
+            pending = self._pending.get(job_id)
+            if row is None and pending is None:
+                return None, 0
+            job, version = (json.loads(row[0]), row[1]) if row else ({'status': 'pending', 'message': '대기 중'}, 0)
+            if pending:
+                job.update(pending[0])
+                version = max(version, pending[1])
+        return job, version
+
+    def wait_for_change(self, job_id, since, timeout):
+        """version이 since보다 커지거나 timeout(초)이 지날 때까지 기다린 뒤 (작업 상태, version)을 반환합니다."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job, version = self.get_versioned(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or version > since or remaining <= 0:
+                return job, version
+            # 같은 프로세스의 변경은 바로 깨어나고, 다른 프로세스의 변경은 poll_interval마다 확인
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def update(self, job_id, fields, buffered=False):
+        """fields를 작업 상태에 합칩니다. buffered=True면 다음 flush 때 기록합니다."""
+        with self._write_lock:
+            with self._lock:
+                pending_fields, _ = self._pending.get(job_id, ({}, 0))
+                pending_fields.update(fields)
+                self._pending[job_id] = (pending_fields, self._clock.next())
+                self._changed.notify_all()
+                if buffered:
+                    return
+                items = {job_id: self._pending.pop(job_id)}
+            self._write(items)
+
+    def flush(self):
+        """모아 둔 변경을 한 트랜잭션으로 기록합니다."""
+        with self._write_lock:
+            with self._lock:
+                items, self._pending = self._pending, {}
+            if not items:
+                return
+            try:
+                self._write(items)
+            except sqlite3.Error:
+                # 기록하지 못한 변경은 다음 flush 때 다시 시도
+                with self._lock:
+                    for job_id, (fields, version) in items.items():
+                        newer_fields, newer_version = self._pending.get(job_id, ({}, version))
+                        self._pending[job_id] = ({**fields, **newer_fields}, newer_version)
+                raise
+
+    def _write(self, items):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for job_id, (fields, version) in items.items():
+                row = conn.execute('SELECT data, created_at FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+                if row:
+                    job, created_at = json.loads(row[0]), row[1]
+                else:
+                    job, created_at = {'status': 'pending', 'message': '대기 중'}, now
+                job.update(fields)
+                conn.execute(
+                    'INSERT OR REPLACE INTO jobs (job_id, status, data, version, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (job_id, job['status'], json.dumps(job, ensure_ascii=False), version, created_at, now),
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def count_by_status(self):
+        """상태 -> 작업 수. (모든 프로세스 기준, 아직 flush하지 않은 processing 전환은 다음 flush 뒤에 반영)"""
+        rows = self._conn().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+    def evict(self):
+        """ttl_sec보다 오래 갱신되지 않은 작업을 지웁니다."""
+        if self.ttl_sec <= 0:
+            return 0
+        cursor = self._conn().execute('DELETE FROM jobs WHERE updated_at < ?', (time.time() - self.ttl_sec,))
+        return cursor.rowcount
+
+    def _run_flusher(self):
+        last_evict = 0.0
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.time() - last_evict >= self.evict_interval:
+                    self.evict()
+                    last_evict = time.time()
+            except sqlite3.Error:
+                # 다른 프로세스가 오래 잠근 경우 등: 다음 주기에 다시 시도
+                continue
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+def init_job_store(app):
+    """JOB_STORE_BACKEND 설정에 맞는 작업 상태 저장소를 만듭니다."""
+    if app.config['JOB_STORE_BACKEND'] == 'sqlite':
+        store = SQLiteJobStore(
+            app.config['JOB_STORE_PATH'],
+            ttl_sec=app.config['JOB_TTL_SEC'],
+            flush_interval=app.config['JOB_PROGRESS_FLUSH_SEC'],
+        )
+    else:
+        store = MemoryJobStore(ttl_sec=app.config['JOB_TTL_SEC'])
+    app.extensions['job_store'] = store
+    return store
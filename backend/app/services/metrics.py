@@ -0,0 +1,234 @@
+# backend/app/services/metrics.py
+"""
+Prometheus 텍스트 형식의 운영 지표 (/metrics).
+
+각 프로세스는 카운터/히스토그램을 메모리에만 쌓고 (잠금 한 번 + dict 갱신), 백그라운드 스레드가
+flush_interval마다 METRICS_DIR/<pid>.json 으로 내려 씁니다. /metrics 요청을 받은 프로세스가
+디렉터리의 모든 파일을 합쳐 응답하므로 gunicorn 워커가 여러 개여도 한 번에 전체를 볼 수 있습니다.
+
+    카운터/히스토그램 : 모든 파일의 값을 더함 (종료된 프로세스의 누적값도 포함)
+    게이지           : 최근(flush_interval의 3배 이내)에 기록된 파일의 값만 더함
+                       (대기열 깊이, 실행 중인 Demucs/MuseScore 프로세스 수 등은 기록 시점에 collector로 계산)
+
+작업 상태별 개수처럼 공유 저장소(SQLite)에서 바로 셀 수 있는 값은 요청 시 계산합니다.
+METRICS_DIR는 배포할 때 비워도 됩니다. (Prometheus는 카운터가 0으로 돌아가는 것을 재시작으로 처리)
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 기본 히스토그램 버킷(초): 밀리초 단위 단계부터 수 분 걸리는 Demucs까지
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# 지표 이름 -> (종류, 설명, 히스토그램 버킷)
+METRICS = {
+    'drum_stage_duration_seconds': (
+        'histogram', '파이프라인 단계별 소요 시간 (decode, separation, bpm, onsets, classification, outputs, pdf)',
+        DURATION_BUCKETS),
+    'drum_queue_wait_seconds': ('histogram', '스테이지 대기열에서 기다린 시간', DURATION_BUCKETS),
+    'drum_inference_batch_size': ('histogram', '추론 배치 하나에 들어간 온셋 수', BATCH_SIZE_BUCKETS),
+    'drum_inference_batch_duration_seconds': ('histogram', '추론 배치 하나의 invoke 시간', DURATION_BUCKETS),
+    'drum_pdf_render_duration_seconds': ('histogram', 'MuseScore PDF 렌더링 지연 시간 (대기 포함)', DURATION_BUCKETS),
+    'drum_jobs_finished_total': ('counter', '끝난 작업 수 (status: completed, error)', None),
+    'drum_result_cache_lookups_total': ('counter', '결과물 캐시 조회 수 (result: hit, miss)', None),
+    'drum_pdf_renders_total': ('counter', 'PDF 렌더링 요청 수 (result: rendered, failed, timeout)', None),
+    'drum_jobs': ('gauge', '상태별 작업 수 (작업 상태 저장소 기준)', None),
+    'drum_queue_depth': ('gauge', '스테이지별 대기 중인 작업 수', None),
+    'drum_subprocesses_running': ('gauge', '실행 중인 자식 프로세스 수 (kind: demucs, musescore, analysis)', None),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """프로세스 하나의 지표. 어느 스레드에서 호출해도 됩니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (이름, 라벨) -> 값
+        self._histograms = {}  # (이름, 라벨) -> [버킷별 개수..., +Inf 개수, 합계]
+        self._collectors = []  # () -> [(게이지 이름, 라벨 dict, 값), ...]
+        self.directory = None
+        self.flush_interval = 5.0
+        self._flusher = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        index = bisect.bisect_left(buckets, value)  # value <= 상한인 첫 버킷 (없으면 +Inf)
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with 블록의 실행 시간(초)을 히스토그램에 기록합니다. (예외가 나도 기록)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_collector(self, collector):
+        """기록할 때마다 호출되어 이 프로세스의 게이지 값을 돌려주는 함수를 등록합니다."""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        gauges = []
+        for collector in self._collectors:
+            try:
+                gauges.extend([name, dict(labels), value] for name, labels, value in collector())
+            except Exception:
+                pass  # 종료 중인 서비스 등: 이번 기록에서만 빠짐
+        with self._lock:
+            counters = [[name, dict(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, dict(labels), list(h)] for (name, labels), h in self._histograms.items()]
+        return {'pid': os.getpid(), 'updatedAt': time.time(),
+                'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def flush(self):
+        """이 프로세스의 지표를 <directory>/<pid>.json에 씁니다. (임시 파일 + 교체로 원자적)"""
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, path)
+
+    def start(self, directory, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run_flusher, name="metrics-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+        return self
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _load_snapshots(self):
+        if self.directory is None:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # 다른 프로세스가 지우는 중인 파일
+        return snapshots
+
+    def render(self, extra_gauges=()):
+        """모든 프로세스의 지표를 합쳐 Prometheus 텍스트 형식으로 반환합니다."""
+        counters, histograms, gauges = {}, {}, {}
+        fresh_after = time.time() - 3 * self.flush_interval
+        for snapshot in self._load_snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, _label_key(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                if name not in METRICS or len(values) != len(METRICS[name][2]) + 2:
+                    continue  # 버킷이 바뀌기 전 버전이 남긴 값
+                key = (name, _label_key(labels))
+                merged = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    merged[i] += value
+            if snapshot['updatedAt'] >= fresh_after:
+                for name, labels, value in snapshot['gauges']:
+                    key = (name, _label_key(labels))
+                    gauges[key] = gauges.get(key, 0) + value
+        for name, labels, value in extra_gauges:
+            gauges[(name, _label_key(labels))] = value
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            source = {'counter': counters, 'gauge': gauges, 'histogram': histograms}[kind]
+            series = sorted((labels, value) for (series_name, labels), value in source.items() if series_name == name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + [float('inf')], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(value[-1]))}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+# 스케줄러/서비스 코드가 앱 컨텍스트 없이도 기록할 수 있도록 모듈 전역으로 둠 (init 전에도 메모리에는 쌓임)
+metrics = MetricsRegistry()
+
+
+def _runtime_gauges(app):
+    """이 프로세스의 대기열 깊이와 자식 프로세스 수."""
+    gauges = []
+    scheduler = app.extensions.get('scheduler')
+    if scheduler is not None:
+        gauges.extend(('drum_queue_depth', {'stage': stage}, depth)
+                      for stage, depth in scheduler.queue_depths().items())
+
+    separation = app.extensions.get('separation_service')
+    render_service = app.extensions.get('render_service')
+    parallel = app.extensions.get('parallel_pool')
+    gauges.append(('drum_subprocesses_running', {'kind': 'demucs'},
+                   separation.running_processes() if separation is not None else 0))
+    gauges.append(('drum_subprocesses_running', {'kind': 'musescore'},
+                   render_service.stats()['running'] if render_service is not None else 0))
+    gauges.append(('drum_subprocesses_running', {'kind': 'analysis'},
+                   parallel.running_processes() if parallel is not None else 0))
+    return gauges
+
+
+def init_metrics(app):
+    """지표 파일 기록을 시작하고, 이 프로세스의 게이지 collector를 등록합니다."""
+    metrics.add_collector(lambda: _runtime_gauges(app))
+    metrics.start(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL_SEC'])
+    app.extensions['metrics'] = metrics
+    return metrics
@@ -0,0 +1,100 @@
+# backend/app/services/onsets.py
+
+import numpy as np
+import librosa
+
+# --- 상수 정의 (librosa.onset.onset_detect 기본값과 동일) ---
+SR = 44100
+N_MELS = 128
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# 한 번에 계산할 STFT 프레임 수 (약 24초). 트랙 전체 STFT를 메모리에 올리지 않기 위함
+BLOCK_FRAMES = 2048
+
+
+def num_onset_frames(num_samples):
+    """center=True STFT의 전체 프레임 수."""
+    return 1 + num_samples // HOP_LENGTH
+
+
+def mel_power_frames(read, frame_start, frame_end, num_samples, sr=SR):
+    """
+    트랙 전체 center=True 멜 스펙트로그램(파워)의 [frame_start, frame_end) 프레임만 계산합니다.
+    read(start, stop)은 모노 샘플을 돌려주는 함수이고, 트랙 범위 밖은 0으로 채웁니다.
+    프레임 j는 샘플 [j*HOP - N_FFT/2, j*HOP + N_FFT/2) 만 사용하므로 구간별 결과를 이어 붙이면
+    트랙 전체를 한 번에 계산한 것과 같습니다.
+    """
+    lo = frame_start * HOP_LENGTH - N_FFT // 2
+    hi = (frame_end - 1) * HOP_LENGTH + N_FFT // 2
+    start, stop = max(lo, 0), min(hi, num_samples)
+
+    seg = np.asarray(read(start, stop), dtype=np.float32)
+    if start - lo or hi - stop:
+        seg = np.pad(seg, (start - lo, hi - stop))
+
+    return librosa.feature.melspectrogram(
+        y=seg, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, center=False
+    )
+
+
+class OnsetDetector:
+    """
+    librosa.onset.onset_detect(y=y, sr=sr, backtrack=True, units='time')와 같은 온셋을,
+    드럼 스템이 앞에서부터 완성되는 대로 조금씩 계산해 두었다가 마지막에 한 번에 결정하는 검출기입니다.
+
+    무거운 부분(STFT + 멜 필터)은 feed()로 완성된 구간마다 미리 계산하고,
+    트랙 전체 최댓값이 필요한 dB 변환/정규화/피크 검출만 detect()에서 수행합니다.
+    """
+
+    def __init__(self, sr=SR):
+        self.sr = sr
+        self.next_frame = 0
+        self._blocks = []
+
+    def plan(self, available, total=None):
+        """
+        feed()가 계산할 프레임 블록 [(시작, 끝), ...]과 그 계산에 쓰는 샘플 수를 반환합니다.
+        앞에서부터 available 샘플까지 확정된 상태에서 계산 가능한 프레임만 포함하고,
+        total(트랙 전체 길이)을 주면 마지막 프레임까지 포함합니다.
+        """
+        if total is not None:
+            end_frame = num_onset_frames(total)
+            num_samples = total
+        else:
+            # 오른쪽 문맥(N_FFT/2 샘플)까지 확정된 프레임만 계산
+            if available < N_FFT // 2:
+                return [], available
+            end_frame = (available - N_FFT // 2) // HOP_LENGTH + 1
+            num_samples = available
+
+        blocks = [
+            (start, min(start + BLOCK_FRAMES, end_frame))
+            for start in range(self.next_frame, end_frame, BLOCK_FRAMES)
+        ]
+        return blocks, num_samples
+
+    def add_block(self, frame_end, mel_power):
+        """다른 곳(분석 워커)에서 계산한 다음 블록을 이어 붙입니다. 블록은 plan() 순서대로 추가해야 합니다."""
+        self._blocks.append(mel_power)
+        self.next_frame = frame_end
+
+    def feed(self, read, available, total=None):
+        """계산 가능한 프레임을 모두 계산합니다. (plan() 참고)"""
+        blocks, num_samples = self.plan(available, total)
+        for start, stop in blocks:
+            self.add_block(stop, mel_power_frames(read, start, stop, num_samples, sr=self.sr))
+
+    def detect(self, read, total):
+        """남은 프레임을 계산하고 온셋 시각(초) 배열을 반환합니다."""
+        self.feed(read, total, total=total)
+        if not self._blocks:
+            return np.array([])
+
+        mel_power = np.concatenate(self._blocks, axis=1)
+        onset_env = librosa.onset.onset_strength(
+            S=librosa.power_to_db(mel_power), sr=self.sr, hop_length=HOP_LENGTH
+        )
+        return librosa.onset.onset_detect(
+            onset_envelope=onset_env, sr=self.sr, hop_length=HOP_LENGTH, backtrack=True, units='time'
+        )
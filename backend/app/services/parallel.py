@@ -0,0 +1,282 @@
+# backend/app/services/parallel.py
+"""
+온셋 검출/분류를 여러 코어에 나눠 실행하는 분석 워커 풀.
+
+run.py가 모듈 최상위에서 create_app()을 호출하므로 spawn 방식 multiprocessing은 자식마다 앱(분리 워커 포함)을
+다시 만들고, fork는 TensorFlow 스레드가 떠 있는 프로세스에서 안전하지 않습니다. 그래서 분리 워커와 같이
+살아 있는 `python -m app.services.parallel` 프로세스를 두고, stdin/stdout으로 길이 접두 pickle 메시지를 주고받습니다.
+
+    부모 -> 워커 : (작업 이름, kwargs) / None (종료)
+    워커 -> 부모 : ('ready', None) / ('ok', 결과, CPU 시간) / ('error', traceback, CPU 시간)
+
+드럼 스템은 각 워커가 memmap으로 직접 읽고, 결과(멜 파워 블록, 분류 확률)만 돌려받습니다.
+구간은 앞뒤 문맥을 겹쳐 읽되 프레임/온셋은 정확히 한 구간에만 속하도록 나누고, 블록/배치 경계도
+직렬 처리와 같게 맞추므로 합친 결과가 직렬 결과와 비트 단위로 같습니다.
+"""
+
+import atexit
+import os
+import pickle
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from app.services.profiling import current_session
+
+
+def _send(stream, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(struct.pack('<Q', len(data)))
+    stream.write(data)
+    stream.flush()
+
+
+def _read_exact(stream, size):
+    chunks = []
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            raise EOFError("분석 워커와의 연결이 끊어졌습니다.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv(stream):
+    size, = struct.unpack('<Q', _read_exact(stream, 8))
+    return pickle.loads(_read_exact(stream, size))
+
+
+class _Worker:
+    """분석 워커 프로세스 하나. 한 번에 한 스레드만 call()합니다."""
+
+    def __init__(self, base_dir):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'app.services.parallel'], cwd=base_dir,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None,
+        )
+        self.ready = False
+        self.last_cpu = None  # 마지막 call()에서 워커가 쓴 CPU 시간(초)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def call(self, name, kwargs):
+        if not self.ready:
+            _recv(self.process.stdout)  # ('ready', None): 무거운 import가 끝날 때까지 대기
+            self.ready = True
+        _send(self.process.stdin, (name, kwargs))
+        status, value, self.last_cpu = _recv(self.process.stdout)
+        if status == 'error':
+            raise RuntimeError(f"분석 워커 작업 실패 ({name}):\n{value}")
+        return value
+
+    def stop(self):
+        try:
+            _send(self.process.stdin, None)
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+class ParallelPool:
+    """
+    size개의 분석 워커 프로세스. map()은 작업 목록을 유휴 워커에 나눠 실행하고 입력 순서대로 결과를 돌려줍니다.
+    여러 작업(스레드)이 동시에 map()을 호출하면 워커를 번갈아 사용합니다.
+    """
+
+    def __init__(self, base_dir, size):
+        self.base_dir = base_dir
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        # 프로세스를 미리 띄워 librosa/TensorFlow import를 첫 작업 전에 끝내 둠
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+        atexit.register(self.shutdown)
+        return self
+
+    def _spawn(self):
+        worker = _Worker(self.base_dir)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _release(self, worker):
+        if not worker.alive:
+            # 비정상 종료한 워커는 새로 띄워서 풀 크기를 유지
+            with self._lock:
+                self._workers.remove(worker)
+            worker = self._spawn()
+        self._idle.put(worker)
+
+    def map(self, name, kwargs_list, on_result=None):
+        """
+        kwargs_list의 각 항목으로 작업 name을 실행하고 결과 리스트를 반환합니다.
+        on_result(i, result)는 호출한 스레드에서 완료되는 순서대로 불립니다.
+        """
+        tasks = queue.Queue()
+        for item in enumerate(kwargs_list):
+            tasks.put(item)
+        done = queue.Queue()
+        profile = current_session()  # 워커 스레드에서는 보이지 않으므로 호출한 스레드의 세션을 잡아 둠
+
+        def run():
+            worker = self._idle.get()
+            try:
+                while True:
+                    try:
+                        i, kwargs = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        started = time.perf_counter()
+                        result = worker.call(name, kwargs)
+                        if profile is not None:
+                            profile.record_subprocess('analysis-worker', time.perf_counter() - started,
+                                                      worker.last_cpu, task=name)
+                        done.put((i, result, None))
+                    except Exception as e:
+                        done.put((i, None, e))
+                        return
+            finally:
+                self._release(worker)
+
+        threads = [
+            threading.Thread(target=run, name=f"parallel-{name}-{k}", daemon=True)
+            for k in range(min(self.size, len(kwargs_list)))
+        ]
+        for thread in threads:
+            thread.start()
+
+        results = [None] * len(kwargs_list)
+        error = None
+        for _ in range(len(kwargs_list)):
+            try:
+                i, result, e = done.get(timeout=1.0) if error else done.get()
+            except queue.Empty:
+                break  # 오류 이후 남은 작업은 실행되지 않음
+            if e is not None:
+                error = error or e
+                continue
+            results[i] = result
+            if on_result and error is None:
+                on_result(i, result)
+        for thread in threads:
+            thread.join()
+        if error is not None:
+            raise error
+        return results
+
+    def running_processes(self):
+        """살아 있는 분석 워커 프로세스 수."""
+        with self._lock:
+            return sum(1 for worker in self._workers if worker.alive)
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+
+def init_parallel_pool(app):
+    """ANALYSIS_PARALLEL_WORKERS가 0보다 크면 분석 워커 풀을 시작합니다. (0이면 직렬 처리)"""
+    if app.config['ANALYSIS_PARALLEL_WORKERS'] <= 0:
+        return None
+
+    pool = ParallelPool(app.config['BASE_DIR'], app.config['ANALYSIS_PARALLEL_WORKERS']).start()
+    app.extensions['parallel_pool'] = pool
+    return pool
+
+
+# --- 워커 프로세스 쪽 ---
+_interpreters = {}
+
+
+def _open_stem(stem_path):
+    from app.services.audio_io import AudioHandle
+
+    return AudioHandle.open(stem_path)
+
+
+def _task_mel_power(stem_path, frame_start, frame_end, num_samples):
+    """onsets.mel_power_frames()의 한 블록."""
+    from app.services.onsets import mel_power_frames
+
+    stem = _open_stem(stem_path)
+    return mel_power_frames(stem.read_mono, frame_start, frame_end, num_samples, sr=stem.sr)
+
+
+def _task_classify(stem_path, onset_times, model_path, batch_size, num_threads=1, delegate='xnnpack',
+                   backend='tensorflow'):
+    """온셋 구간 하나의 분류 확률 (N, 클래스 수). 필요한 샘플 범위만 읽습니다."""
+    import numpy as np
+    from app.services.features import MelFeatureEngine, TARGET_SHAPE, segment_bounds
+    from app.services.inference import load_tflite_model, prepare_batch_input, run_inference_batch
+
+    key = (model_path, batch_size, num_threads, delegate, backend)
+    if key not in _interpreters:
+        interpreter = load_tflite_model(model_path, num_threads=num_threads, delegate=delegate, backend=backend)
+        _interpreters[key] = (interpreter, prepare_batch_input(interpreter, batch_size))
+    interpreter, batch_size = _interpreters[key]
+
+    stem = _open_stem(stem_path)
+    starts, ends = segment_bounds(onset_times, stem.num_frames, stem.sr)
+    lo, hi = int(starts.min()), int(max(ends.max(), starts.max() + 1))
+    engine = MelFeatureEngine(stem.read_mono(lo, hi), stem.sr, offset=lo, total=stem.num_frames)
+
+    batch = np.zeros((batch_size, *TARGET_SHAPE, 1), dtype=np.float32)
+    probas = []
+    for start in range(0, len(onset_times), batch_size):
+        batch_onsets = onset_times[start:start + batch_size]
+        engine.fill(batch_onsets, batch)
+        batch[len(batch_onsets):] = 0.0
+        probas.append(run_inference_batch(interpreter, batch)[:len(batch_onsets)])
+    return np.concatenate(probas)
+
+
+TASKS = {
+    'mel_power': _task_mel_power,
+    'classify': _task_classify,
+}
+
+
+def _worker_main():
+    # 라이브러리가 stdout에 출력해도 프로토콜이 깨지지 않도록 fd 1은 stderr로 돌리고, 원래 stdout은 따로 보관
+    protocol_out = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    protocol_in = sys.stdin.buffer
+
+    import app.services.onsets  # noqa: F401  (librosa)
+    from config import Config
+    from app.services.inference import preload_backend
+    preload_backend(Config.INFERENCE_BACKEND)  # 추론 런타임은 처음 로드할 때 import되므로 여기서 미리
+    _send(protocol_out, ('ready', None))
+
+    while True:
+        try:
+            message = _recv(protocol_in)
+        except EOFError:
+            break
+        if message is None:
+            break
+        name, kwargs = message
+        cpu_started = time.process_time()
+        try:
+            result = TASKS[name](**kwargs)
+            _send(protocol_out, ('ok', result, time.process_time() - cpu_started))
+        except Exception:
+            _send(protocol_out, ('error', traceback.format_exc(), time.process_time() - cpu_started))
+
+
+if __name__ == '__main__':
+    _worker_main()
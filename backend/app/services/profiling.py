@@ -0,0 +1,227 @@
+# backend/app/services/profiling.py
+"""
+작업별 프로파일링 (선택).
+
+업로드할 때 profile=1을 주거나 PROFILE_SAMPLE_RATE 비율로 뽑힌 작업은, 스테이지를 실행하는 동안
+샘플링 프로파일러가 PROFILE_INTERVAL_MS마다 그 스레드의 파이썬 스택을 기록합니다.
+cProfile처럼 함수 호출마다 훅을 걸지 않으므로 부하가 작고, 여러 작업을 동시에 프로파일링해도 서로 섞이지 않습니다.
+
+스택 샘플에는 자식 프로세스를 기다리는 모습만 보이므로, ffmpeg / Demucs / 분석 워커 / MuseScore 호출은
+벽시계 시간과 CPU 시간을 따로 기록합니다.
+
+결과물 (작업 폴더, /api/profile/<job_id>로 다운로드):
+    profile.json   : 스테이지별 벽시계/CPU 시간, 자식 프로세스 호출 목록, 샘플이 많은 함수 상위 TOP_FUNCTIONS개
+    profile.folded : "스테이지;함수;함수;... 샘플 수" (flamegraph.pl, speedscope에서 바로 열림)
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource  # 자식 프로세스 CPU 시간 (POSIX 전용)
+except ImportError:
+    resource = None
+
+PROFILE_JSON_NAME = "profile.json"
+PROFILE_FOLDED_NAME = "profile.folded"
+TOP_FUNCTIONS = 40
+
+_current = threading.local()
+
+
+def children_cpu_time():
+    """지금까지 종료(wait)된 자식 프로세스들의 CPU 시간 합계(초). 측정할 수 없으면 None."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler:
+    """등록된 스레드들의 스택을 주기적으로 읽는 프로세스 전역 샘플링 스레드."""
+
+    def __init__(self):
+        self._targets = {}  # 스레드 ident -> (세션, 스테이지)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def register(self, ident, session, stage):
+        with self._cond:
+            self._targets[ident] = (session, stage)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def unregister(self, ident):
+        with self._cond:
+            self._targets.pop(ident, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._targets:
+                    self._cond.wait()
+                targets = list(self._targets.items())
+                interval = min(session.interval for _, (session, _) in targets)
+            frames = sys._current_frames()
+            for ident, (session, stage) in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    session.add_sample(stage, frame)
+            del frames
+            time.sleep(interval)
+
+
+_sampler = _Sampler()
+
+
+class ProfileSession:
+    """작업 하나의 프로파일. section()으로 감싼 구간만 샘플링합니다."""
+
+    def __init__(self, job_id, interval_ms=10):
+        self.job_id = job_id
+        self.interval = max(interval_ms, 1) / 1000.0
+        self.sections = []
+        self.subprocesses = []
+        self._stacks = Counter()  # (스테이지, (바깥 함수, ..., 안쪽 함수)) -> 샘플 수
+        self._stage_samples = Counter()
+        self._lock = threading.Lock()
+
+    def add_sample(self, stage, frame):
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        with self._lock:
+            self._stacks[(stage, tuple(stack))] += 1
+            self._stage_samples[stage] += 1
+
+    @contextmanager
+    def section(self, stage):
+        """with 블록 동안 현재 스레드를 stage 이름으로 샘플링하고 벽시계/CPU 시간을 기록합니다."""
+        ident = threading.get_ident()
+        previous = getattr(_current, 'session', None)
+        _current.session = self
+        samples_before = self._stage_samples[stage]
+        _sampler.register(ident, self, stage)
+        wall_started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            yield self
+        finally:
+            _sampler.unregister(ident)
+            _current.session = previous
+            with self._lock:
+                self.sections.append({
+                    'stage': stage,
+                    'wallSec': round(time.perf_counter() - wall_started, 4),
+                    'cpuSec': round(time.thread_time() - cpu_started, 4),
+                    'samples': self._stage_samples[stage] - samples_before,
+                })
+
+    def record_subprocess(self, kind, wall, cpu=None, **detail):
+        with self._lock:
+            self.subprocesses.append({
+                'kind': kind,
+                'wallSec': round(wall, 4),
+                'cpuSec': round(cpu, 4) if cpu is not None else None,
+                **detail,
+            })
+
+    def _top_functions(self, stacks):
+        own, inclusive = Counter(), Counter()
+        for (_, stack), count in stacks.items():
+            if not stack:
+                continue
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        total = sum(stacks.values()) or 1
+        return [
+            {'function': label, 'ownSamples': own[label], 'totalSamples': inclusive[label],
+             'totalRatio': round(inclusive[label] / total, 4)}
+            for label, _ in inclusive.most_common(TOP_FUNCTIONS)
+        ]
+
+    def save(self, result_dir):
+        """작업 폴더에 결과물을 씁니다. 이미 있으면 (예: 나중에 렌더링한 PDF 구간) 이어 붙입니다."""
+        json_path = os.path.join(result_dir, PROFILE_JSON_NAME)
+        folded_path = os.path.join(result_dir, PROFILE_FOLDED_NAME)
+
+        with self._lock:
+            stacks = Counter(self._stacks)
+            sections = list(self.sections)
+            subprocesses = list(self.subprocesses)
+        if os.path.exists(folded_path):
+            with open(folded_path, encoding='utf-8') as f:
+                for line in f:
+                    folded, _, count = line.rstrip('\n').rpartition(' ')
+                    stage, *stack = folded.split(';')
+                    stacks[(stage, tuple(stack))] += int(count)
+        if os.path.exists(json_path):
+            with open(json_path, encoding='utf-8') as f:
+                previous = json.load(f)
+            sections = previous.get('sections', []) + sections
+            subprocesses = previous.get('subprocesses', []) + subprocesses
+
+        report = {
+            'jobId': self.job_id,
+            'mode': 'sampling',
+            'intervalMs': round(self.interval * 1000, 3),
+            'totalSamples': sum(stacks.values()),
+            'sections': sections,
+            'subprocesses': subprocesses,
+            'topFunctions': self._top_functions(stacks),
+        }
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            for (stage, stack), count in sorted(stacks.items()):
+                f.write(f"{';'.join((stage,) + stack)} {count}\n")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        return json_path
+
+
+def current_session():
+    """현재 스레드가 프로파일링 중인 세션 (없으면 None)."""
+    return getattr(_current, 'session', None)
+
+
+def record_subprocess(kind, wall, cpu=None, **detail):
+    """현재 스레드가 프로파일링 중이면 자식 프로세스 호출 하나를 기록합니다."""
+    session = current_session()
+    if session is not None:
+        session.record_subprocess(kind, wall, cpu, **detail)
+
+
+@contextmanager
+def subprocess_timer(kind, **detail):
+    """
+    with 블록 안에서 실행하고 기다린 자식 프로세스의 벽시계/CPU 시간을 기록합니다.
+    CPU 시간은 프로세스 전체의 RUSAGE_CHILDREN 차이이므로, 같은 시간에 다른 스레드가 기다린 자식이 있으면 섞입니다.
+    """
+    if current_session() is None:
+        yield
+        return
+    wall_started, cpu_started = time.perf_counter(), children_cpu_time()
+    try:
+        yield
+    finally:
+        cpu_ended = children_cpu_time()
+        cpu = cpu_ended - cpu_started if cpu_started is not None else None
+        record_subprocess(kind, time.perf_counter() - wall_started, cpu, **detail)
+
+
+def should_profile(requested, sample_rate):
+    """업로드 요청의 profile 플래그 또는 PROFILE_SAMPLE_RATE(0~1) 비율로 프로파일링 여부를 정합니다."""
+    return bool(requested) or (sample_rate > 0 and random.random() < sample_rate)
@@ -0,0 +1,143 @@
+# backend/app/services/progress.py
+"""
+작업 진행 상황 보고.
+
+각 단계는 문자열 대신 숫자(단계 이름, 단계 내 진행률 0~1, 남은 시간)를 넘기고,
+ProgressReporter가 이를 최대 max_rate(Hz)로 합쳐 작업 상태 저장소에 기록합니다.
+클라이언트는 사람이 읽는 'message'와 함께 아래 'progress' 필드를 받습니다.
+
+    "progress": {"stage": "separation", "stageIndex": 1, "stageCount": 5,
+                 "fraction": 0.42, "overall": 0.29, "eta": 12.5}
+"""
+
+import threading
+import time
+
+from flask import current_app
+
+# 단계 이름 -> (표시 이름, 전체 진행률에서의 비중). 순서가 파이프라인 순서입니다.
+STAGES = {
+    'decode': ('오디오 디코딩', 0.03),
+    'separation': ('드럼 분리', 0.60),
+    'bpm': ('템포(BPM) 분석', 0.04),
+    'onsets': ('온셋 검출', 0.08),
+    'classification': ('MIDI 노트 변환', 0.15),
+}
+_STAGE_NAMES = list(STAGES)
+_TOTAL_WEIGHT = sum(weight for _, weight in STAGES.values())
+
+
+def overall_fraction(stage, fraction):
+    """단계와 단계 내 진행률로 전체 진행률(0~1)을 계산합니다."""
+    index = _STAGE_NAMES.index(stage)
+    done = sum(STAGES[name][1] for name in _STAGE_NAMES[:index])
+    return (done + STAGES[stage][1] * fraction) / _TOTAL_WEIGHT
+
+
+class ProgressReporter:
+    """
+    작업 하나의 진행 상황 보고기. 여러 스레드에서 호출해도 됩니다.
+
+    stage()로 단계가 바뀔 때는 바로 기록하고, update()는 마지막 기록 후 1/max_rate초가
+    지나지 않았으면 값만 기억해 두었다가 다음 기록에 합칩니다. (완료(1.0)는 항상 기록)
+    기억해 둔 값은 다음 update(), 단계 전환(stage()) 직전, 또는 간격이 지나면 타이머가 기록하므로
+    단계가 멈춰 있어도 마지막 값이 남지 않습니다. 작업이 끝나면(완료/실패 기록 전) close()를 호출합니다.
+    """
+
+    def __init__(self, job_id, max_rate=2.0, publish=None):
+        self.job_id = job_id
+        self.min_interval = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        self._publish = publish or _publish_to_job_store
+        self._lock = threading.Lock()
+        self._stage = None
+        self._stage_started = None
+        self._last_sent = 0.0
+        self._last_fraction = None
+        self._pending = None  # 아직 기록하지 않은 (fraction, eta, message)
+        self._timer = None
+        self._closed = False
+
+    @property
+    def current_stage(self):
+        return self._stage
+
+    def stage(self, name, message=None):
+        """새 단계를 시작합니다. 이전 단계에서 기록하지 못한 값은 먼저 기록합니다."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_pending()
+            self._stage = name
+            self._stage_started = time.monotonic()
+            self._last_fraction = None
+            self._send(0.0, None, message)
+
+    def update(self, fraction, eta=None, message=None):
+        """현재 단계의 진행률(0~1)을 보고합니다. eta(초)를 주지 않으면 경과 시간으로 추정합니다."""
+        fraction = min(max(float(fraction), 0.0), 1.0)
+        with self._lock:
+            if self._closed or self._stage is None or fraction == self._last_fraction:
+                return
+            now = time.monotonic()
+            if eta is None and fraction > 0:
+                eta = (now - self._stage_started) * (1.0 - fraction) / fraction
+            wait = self._last_sent + self.min_interval - now
+            if fraction < 1.0 and wait > 0:
+                # 간격 안의 값은 버리지 않고 기억해 두었다가 간격이 지나면 기록
+                self._pending = (fraction, eta, message)
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            self._pending = None
+            self._send(fraction, eta, message)
+
+    def flush(self):
+        """기억해 둔 값이 있으면 지금 기록합니다."""
+        with self._lock:
+            if not self._closed:
+                self._flush_pending()
+
+    def close(self):
+        """남은 값을 기록하고 이후 보고를 무시합니다. (완료/실패 상태를 덮어쓰지 않도록 그 전에 호출)"""
+        with self._lock:
+            if not self._closed:
+                self._flush_pending()
+                self._closed = True
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending is not None:
+            fraction, eta, message = self._pending
+            self._pending = None
+            self._send(fraction, eta, message)
+
+    def _send(self, fraction, eta, message):
+        label = STAGES[self._stage][0]
+        if message is None:
+            message = f"{label} 중... {int(fraction * 100)}%" if fraction > 0 else f"{label} 중..."
+        progress = {
+            'stage': self._stage,
+            'stageIndex': _STAGE_NAMES.index(self._stage),
+            'stageCount': len(_STAGE_NAMES),
+            'fraction': round(fraction, 4),
+            'overall': round(overall_fraction(self._stage, fraction), 4),
+            'eta': round(eta, 1) if eta is not None else None,
+        }
+        self._last_sent = time.monotonic()
+        self._last_fraction = fraction
+        self._publish(self.job_id, progress, message)
+
+
+def _publish_to_job_store(job_id, progress, message):
+    from app.tasks import update_job_progress
+
+    update_job_progress(job_id, progress, message)
+
+
+def create_progress_reporter(job_id):
+    """설정(PROGRESS_MAX_RATE_HZ)에 맞는 보고기를 만듭니다. (앱 컨텍스트 안에서 호출)"""
+    return ProgressReporter(job_id, max_rate=current_app.config['PROGRESS_MAX_RATE_HZ'])
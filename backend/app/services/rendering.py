@@ -0,0 +1,287 @@
+# backend/app/services/rendering.py
+"""
+MuseScore 악보(PDF) 렌더링 서비스.
+
+작업마다 MuseScore를 새로 띄우면 Qt/폰트 초기화가 렌더링 시간 대부분을 차지하고, 동시에 여러 작업이 오면
+GUI 툴킷 프로세스가 여러 개 뜹니다. MuseScore 3 CLI는 상주(서버) 모드가 없으므로 대신
+동시에 실행되는 MuseScore 수를 RENDER_WORKERS개로 고정하고, 그동안 대기열에 쌓인 요청은
+배치 작업 파일(`-j job.json`) 하나로 묶어 한 번의 실행으로 변환합니다. (기동 비용을 배치 전체가 나눠 냄)
+
+    job.json: [{"in": "a.xml", "out": "a.pdf"}, {"in": "b.xml", "out": "b.pdf"}, ...]
+
+MuseScore는 QT_QPA_PLATFORM=offscreen으로 화면 없이 실행합니다.
+요청마다 timeout이 있고, 대기열에서 기다린 시간도 포함합니다. 렌더링 지연 시간은 stats()로 확인합니다.
+"""
+
+import atexit
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+
+from app.services.metrics import metrics
+from app.services.profiling import children_cpu_time
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+class RenderError(Exception):
+    pass
+
+
+class RenderTask:
+    """렌더링 요청 하나. wait()로 완료를 기다립니다."""
+
+    def __init__(self, job_id, xml_path, pdf_path, timeout):
+        self.job_id = job_id
+        self.xml_path = xml_path
+        self.pdf_path = pdf_path
+        self.submitted_at = time.monotonic()
+        self.deadline = self.submitted_at + timeout
+        self.started_at = None
+        self.finished_at = None
+        self.batch_size = None
+        self.cpu = None  # MuseScore 프로세스 CPU 시간을 배치 크기로 나눈 값(초)
+        self.error = None
+        self._done = threading.Event()
+
+    def finish(self, error=None):
+        self.error = error
+        self.finished_at = time.monotonic()
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """완료되면 True, timeout이 지나면 False를 반환합니다."""
+        return self._done.wait(timeout)
+
+    def result(self):
+        """완료까지 기다렸다가 실패했으면 예외를 던집니다."""
+        self.wait(max(self.deadline - time.monotonic(), 0) + 5)
+        if not self._done.is_set():
+            raise RenderTimeout(f"렌더링 시간 초과 ({self.pdf_path})")
+        if isinstance(self.error, Exception):
+            raise self.error
+        return self.pdf_path
+
+    @property
+    def latency(self):
+        """요청부터 완료까지 걸린 시간(초). 대기열 대기 포함."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+    @property
+    def queue_wait(self):
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+
+class RenderService:
+    """
+    MuseScore 렌더링 대기열. size개의 스레드가 각각 MuseScore 프로세스를 최대 하나씩 실행하며,
+    한 번에 최대 batch_max개의 요청을 묶어 변환합니다.
+    """
+
+    def __init__(self, musescore_path, logger, size=1, batch_max=8, batch_wait=0.2, timeout=60, history=200):
+        self.musescore_path = musescore_path
+        self.logger = logger
+        self.size = max(1, size)
+        self.batch_max = max(1, batch_max)
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.pending = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"render-worker-{i}", daemon=True) for i in range(self.size)
+        ]
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=history)
+        self._counts = {'rendered': 0, 'failed': 0, 'timeouts': 0, 'batches': 0}
+        self._running = 0  # 지금 실행 중인 MuseScore 프로세스 수
+
+    @property
+    def available(self):
+        return self.musescore_path is not None
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.shutdown)
+        return self
+
+    def submit(self, job_id, xml_path, pdf_path, timeout=None):
+        task = RenderTask(job_id, xml_path, pdf_path, timeout or self.timeout)
+        self.pending.put(task)
+        return task
+
+    def render(self, job_id, xml_path, pdf_path, timeout=None):
+        """렌더링이 끝날 때까지 기다립니다. 실패하면 RenderError/RenderTimeout."""
+        return self.submit(job_id, xml_path, pdf_path, timeout).result()
+
+    def stats(self):
+        """처리 건수와 최근 렌더링 지연 시간(초) 통계."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self._counts)
+        if latencies:
+            counts.update({
+                'latency_avg': sum(latencies) / len(latencies),
+                'latency_p50': latencies[len(latencies) // 2],
+                'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            })
+        counts['queue_depth'] = self.pending.qsize()
+        counts['running'] = self._running
+        return counts
+
+    def _record(self, task):
+        with self._stats_lock:
+            if task.error is None:
+                self._counts['rendered'] += 1
+                self._latencies.append(task.latency)
+                result = 'rendered'
+            elif isinstance(task.error, RenderTimeout):
+                self._counts['timeouts'] += 1
+                result = 'timeout'
+            else:
+                self._counts['failed'] += 1
+                result = 'failed'
+        metrics.inc('drum_pdf_renders_total', result=result)
+        if task.error is None:
+            metrics.observe('drum_pdf_render_duration_seconds', task.latency)
+
+    def _next_batch(self):
+        # 첫 요청을 받은 뒤 batch_wait 동안 더 들어오는 요청을 함께 묶음
+        first = self.pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        until = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_max:
+            try:
+                task = self.pending.get(timeout=max(until - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if task is None:
+                self.pending.put(None)  # 종료 신호는 다음 반복에서 처리
+                break
+            batch.append(task)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            now = time.monotonic()
+            live = []
+            for task in batch:
+                if task.deadline <= now:
+                    task.finish(RenderTimeout("렌더링 대기 중 시간 초과"))
+                    self._record(task)
+                else:
+                    task.started_at = now
+                    task.batch_size = len(batch)
+                    live.append(task)
+            if live:
+                self._render_batch(live)
+
+    def _render_batch(self, batch):
+        if not self.available:
+            for task in batch:
+                task.finish(RenderError("MuseScore 실행 파일을 찾을 수 없습니다."))
+                self._record(task)
+            return
+
+        for task in batch:
+            if os.path.exists(task.pdf_path):
+                os.remove(task.pdf_path)
+
+        job_file = None
+        if len(batch) == 1:
+            command = [self.musescore_path, '-o', batch[0].pdf_path, batch[0].xml_path]
+        else:
+            fd, job_file = tempfile.mkstemp(prefix='render-', suffix='.json')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump([{'in': t.xml_path, 'out': t.pdf_path} for t in batch], f)
+            command = [self.musescore_path, '-j', job_file]
+
+        # 배치의 모든 요청이 자기 timeout까지는 기다릴 수 있도록 가장 늦은 마감 시각까지 실행 허용
+        run_timeout = max(t.deadline for t in batch) - time.monotonic()
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+        started, cpu_started = time.monotonic(), children_cpu_time()
+        stderr, timed_out = '', False
+        try:
+            with self._stats_lock:
+                self._counts['batches'] += 1
+                self._running += 1
+            try:
+                result = subprocess.run(
+                    command, capture_output=True, text=True, timeout=max(run_timeout, 1), env=env
+                )
+            finally:
+                with self._stats_lock:
+                    self._running -= 1
+            stderr = result.stderr
+            if result.returncode != 0:
+                self.logger.error(f"MuseScore 종료 코드 {result.returncode}. Stderr: {stderr}")
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        except OSError as e:
+            stderr = str(e)
+        finally:
+            if job_file:
+                os.remove(job_file)
+
+        elapsed = time.monotonic() - started
+        cpu_ended = children_cpu_time()
+        for task in batch:
+            if cpu_started is not None:
+                # 다른 렌더링 스레드의 MuseScore가 같은 시간에 끝나면 그 CPU 시간도 섞일 수 있음 (프로파일 참고용)
+                task.cpu = (cpu_ended - cpu_started) / len(batch)
+            if os.path.exists(task.pdf_path):
+                task.finish()
+            elif timed_out:
+                task.finish(RenderTimeout(f"MuseScore 렌더링 시간 초과 ({elapsed:.0f}초)"))
+            else:
+                task.finish(RenderError(f"PDF 변환 실패: {stderr[:100]}"))
+            self._record(task)
+        self.logger.info(f"MuseScore 렌더링 {len(batch)}건 {elapsed:.2f}초 "
+                         f"(대기 최대 {max(t.queue_wait for t in batch):.2f}초)")
+
+    def shutdown(self):
+        for _ in self._threads:
+            self.pending.put(None)
+
+
+def resolve_musescore_path(configured):
+    """설정값이 경로면 그대로, 명령 이름이면 PATH에서 찾습니다. 없으면 None."""
+    if not configured:
+        return None
+    if os.path.exists(configured):
+        return configured
+    return shutil.which(configured)
+
+
+def init_render_service(app):
+    """MUSESCORE_PATH의 MuseScore로 렌더링 서비스를 시작합니다."""
+    musescore_path = resolve_musescore_path(app.config['MUSESCORE_PATH'])
+    if musescore_path is None:
+        app.logger.warning(f"MuseScore 실행 파일을 찾을 수 없습니다: {app.config['MUSESCORE_PATH']} (PDF 생성 불가)")
+
+    service = RenderService(
+        musescore_path, app.logger,
+        size=app.config['RENDER_WORKERS'],
+        batch_max=app.config['RENDER_BATCH_MAX'],
+        batch_wait=app.config['RENDER_BATCH_WAIT_SEC'],
+        timeout=app.config['RENDER_TIMEOUT_SEC'],
+    ).start()
+    app.extensions['render_service'] = service
+    return service
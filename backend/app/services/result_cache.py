@@ -0,0 +1,315 @@
+# backend/app/services/result_cache.py
+"""
+업로드 오디오의 내용 해시를 키로 하는 결과물 캐시.
+
+같은 곡이 다시 올라오면 Demucs -> BPM -> MIDI -> PDF를 다시 돌리지 않고 저장된 결과물을
+작업 폴더로 링크해 즉시 완료합니다. 키에는 모델 파일과 파이프라인 버전이 함께 들어가므로
+모델이나 처리 방식이 바뀌면 자동으로 새 키가 됩니다.
+
+    <CACHE_FOLDER>/<key>/meta.json   # 크기, 생성 시각
+    <CACHE_FOLDER>/<key>/drums.wav   # 분리된 드럼 스템
+    <CACHE_FOLDER>/<key>/events.csv  # 분류된 타격 이벤트
+    <CACHE_FOLDER>/<key>/events.npz  # 같은 이벤트 + BPM (/api/events, PDF 렌더링용)
+    <CACHE_FOLDER>/<key>/result.mid
+    <CACHE_FOLDER>/<key>/score.pdf   # 처음 요청될 때 렌더링되어 나중에 추가됨 (attach)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+
+from flask import current_app
+
+# 캐시에 저장하는 결과물: 캐시 안의 이름 -> 작업 폴더 안의 이름
+ARTIFACTS = {
+    'drums.wav': lambda job_id: 'drums.wav',
+    'events.csv': lambda job_id: f"{job_id}.csv",
+    'events.npz': lambda job_id: f"{job_id}.events.npz",
+    'result.mid': lambda job_id: f"{job_id}.mid",
+    'score.pdf': lambda job_id: f"{job_id}.pdf",
+}
+META_NAME = 'meta.json'
+
+# 잠금 파일에 기록하는 잡은 쪽 정보 ("호스트:pid")
+_HOST = socket.gethostname()
+
+
+def _link_or_copy(src, dst):
+    """같은 파일시스템이면 하드링크(복사 없음), 아니면 복사합니다."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _lock_owner():
+    return f"{_HOST}:{os.getpid()}"
+
+
+def _holder_is_dead(lock_path):
+    """잠금을 잡은 프로세스가 같은 호스트에서 이미 종료되었으면 True. (다른 호스트/확인 불가면 False)"""
+    try:
+        with open(lock_path) as f:
+            host, _, pid = f.read().strip().rpartition(':')
+        pid = int(pid)
+    except (OSError, ValueError):
+        return False
+    if host != _HOST or os.name != 'posix':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # 다른 사용자의 프로세스: 살아 있음
+    return False
+
+
+def _is_stale(lock_path, stale_sec):
+    """잠근 프로세스가 죽었거나, stale_sec 동안 갱신(mtime)되지 않은 잠금이면 True."""
+    return time.time() - os.path.getmtime(lock_path) > stale_sec or _holder_is_dead(lock_path)
+
+
+def _break_stale_lock(lock_path, stale_sec):
+    """
+    오래된 잠금을 지웁니다. 지우는 쪽도 하나만 되도록 '.break' 파일을 잠그고 다시 확인하므로,
+    두 대기자가 같은 잠금을 오래됐다고 보더라도 먼저 지우고 새로 잠근 쪽의 잠금을 지우지 않습니다.
+    다시 잠금을 시도해도 되면 True.
+    """
+    break_path = lock_path + '.break'
+    try:
+        os.close(os.open(break_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        # 다른 대기자가 지우는 중 (그 프로세스가 도중에 죽어 남은 파일이면 stale_sec 뒤 정리)
+        try:
+            if time.time() - os.path.getmtime(break_path) > stale_sec:
+                os.remove(break_path)
+        except OSError:
+            pass
+        return False
+    try:
+        if _is_stale(lock_path, stale_sec):
+            os.remove(lock_path)
+    except OSError:
+        pass  # 그사이 풀림
+    finally:
+        try:
+            os.remove(break_path)
+        except OSError:
+            pass
+    return True
+
+
+def try_lock_file(lock_path, stale_sec):
+    """
+    잠금 파일을 O_EXCL로 만들어 잠급니다. (프로세스 간에도 유효)
+    이미 있으면 False. 잠근 프로세스가 같은 호스트에서 이미 죽었거나 stale_sec보다 오래 갱신되지 않은 잠금은
+    비정상 종료로 남은 것으로 보고 지운 뒤 다시 시도합니다.
+    """
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, _lock_owner().encode())
+            os.close(fd)
+            return True
+        except FileExistsError:
+            try:
+                if not _is_stale(lock_path, stale_sec):
+                    return False
+            except OSError:
+                continue  # 방금 풀림
+            if not _break_stale_lock(lock_path, stale_sec):
+                return False
+
+
+def _file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """크기 상한이 있는 LRU 결과물 캐시. 여러 워커 프로세스가 같은 폴더를 함께 써도 안전합니다."""
+
+    def __init__(self, root, max_bytes, fingerprint_parts, lock_stale_sec=60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fingerprint_parts = fingerprint_parts
+        self.lock_stale_sec = lock_stale_sec
+        self._fingerprint = None
+        self._evict_lock = threading.Lock()
+        # 이 프로세스가 잡고 있는 잠금: 주기적으로 mtime을 갱신해 다른 프로세스가 오래됐다고 보지 않도록 함
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._heartbeat = None
+        os.makedirs(root, exist_ok=True)
+
+    def _pipeline_fingerprint(self):
+        # 모델 파일 내용은 처음 한 번만 해시
+        if self._fingerprint is None:
+            parts = []
+            for part in self.fingerprint_parts:
+                parts.append(_file_sha256(part) if os.path.isfile(part) else str(part))
+            self._fingerprint = hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+        return self._fingerprint
+
+    def make_key(self, audio_hash):
+        """오디오 해시 + 모델/파이프라인 버전으로 캐시 키를 만듭니다."""
+        return hashlib.sha256(f"{audio_hash}:{self._pipeline_fingerprint()}".encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def restore(self, key, result_dir, job_id):
+        """캐시에 결과물이 있으면 작업 폴더로 링크하고 True를 반환합니다."""
+        entry_dir = self._entry_dir(key)
+        if not os.path.exists(os.path.join(entry_dir, META_NAME)):
+            return False
+
+        try:
+            os.makedirs(result_dir, exist_ok=True)
+            for cached_name, job_name in ARTIFACTS.items():
+                src = os.path.join(entry_dir, cached_name)
+                if os.path.exists(src):
+                    _link_or_copy(src, os.path.join(result_dir, job_name(job_id)))
+            # LRU: 마지막 사용 시각 갱신
+            os.utime(os.path.join(entry_dir, META_NAME))
+            return True
+        except OSError as e:
+            # 복원 도중 다른 프로세스가 항목을 지운 경우 -> 캐시 미스로 처리
+            current_app.logger.warning(f"[{job_id}] 캐시 복원 실패 ({key[:12]}): {e}")
+            return False
+
+    def store(self, key, result_dir, job_id):
+        """작업 폴더의 결과물을 캐시에 저장하고, 용량을 넘으면 오래된 항목부터 지웁니다."""
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(os.path.join(entry_dir, META_NAME)):
+            return
+
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        size = 0
+        for cached_name, job_name in ARTIFACTS.items():
+            src = os.path.join(result_dir, job_name(job_id))
+            if os.path.exists(src):
+                _link_or_copy(src, os.path.join(tmp_dir, cached_name))
+                size += os.path.getsize(src)
+        with open(os.path.join(tmp_dir, META_NAME), 'w') as f:
+            json.dump({'size': size, 'created_at': time.time()}, f)
+
+        try:
+            os.rename(tmp_dir, entry_dir)  # 원자적으로 공개
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def attach(self, key, result_dir, job_id, cached_name):
+        """이미 저장된 캐시 항목에 나중에 만들어진 결과물(예: score.pdf)을 추가합니다."""
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, META_NAME)
+        src = os.path.join(result_dir, ARTIFACTS[cached_name](job_id))
+        dst = os.path.join(entry_dir, cached_name)
+        if not os.path.exists(meta_path) or os.path.exists(dst) or not os.path.exists(src):
+            return False
+
+        tmp = f"{dst}.tmp-{os.getpid()}-{threading.get_ident()}"
+        _link_or_copy(src, tmp)
+        os.replace(tmp, dst)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta['size'] += os.path.getsize(dst)
+        tmp_meta = f"{meta_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+        return True
+
+    def evict(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 가장 오래 쓰이지 않은 항목을 지웁니다."""
+        with self._evict_lock:
+            entries = []
+            for key in os.listdir(self.root):
+                meta_path = os.path.join(self.root, key, META_NAME)
+                try:
+                    with open(meta_path) as f:
+                        size = json.load(f)['size']
+                    entries.append((os.path.getmtime(meta_path), size, key))
+                except (OSError, ValueError, KeyError):
+                    continue
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                total -= size
+
+    def _lock_path(self, key):
+        return os.path.join(self.root, f"{key}.lock")
+
+    def try_lock(self, key):
+        """
+        같은 키를 동시에 두 작업이 계산하지 않도록 잠금 파일을 만듭니다. (프로세스 간에도 유효)
+        이미 다른 작업이 잠그고 있으면 False를 반환합니다. 잡은 잠금은 unlock()까지 주기적으로 갱신합니다.
+        """
+        if not try_lock_file(self._lock_path(key), self.lock_stale_sec):
+            return False
+        with self._held_lock:
+            self._held.add(key)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._refresh_locks, name="cache-lock-heartbeat",
+                                                   daemon=True)
+                self._heartbeat.start()
+        return True
+
+    def unlock(self, key):
+        with self._held_lock:
+            self._held.discard(key)
+        lock_path = self._lock_path(key)
+        try:
+            # 오래된 잠금으로 보고 다른 프로세스가 가져간 잠금은 지우지 않음
+            with open(lock_path) as f:
+                if f.read().strip() != _lock_owner():
+                    return
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+    def _refresh_locks(self):
+        while True:
+            time.sleep(max(self.lock_stale_sec / 4, 0.1))
+            with self._held_lock:
+                keys = list(self._held)
+            for key in keys:
+                try:
+                    os.utime(self._lock_path(key))
+                except OSError:
+                    pass
+
+
+def init_result_cache(app):
+    """RESULT_CACHE_MAX_BYTES가 0보다 크면 결과물 캐시를 만듭니다."""
+    if app.config['RESULT_CACHE_MAX_BYTES'] <= 0:
+        return None
+
+    cache = ResultCache(
+        app.config['RESULT_CACHE_FOLDER'],
+        app.config['RESULT_CACHE_MAX_BYTES'],
+        fingerprint_parts=[
+            app.config['MODEL_PATH'],
+            app.config['DEMUCS_MODEL'],
+            app.config['PIPELINE_VERSION'],
+        ],
+        lock_stale_sec=app.config['RESULT_CACHE_LOCK_STALE_SEC'],
+    )
+    app.extensions['result_cache'] = cache
+    return cache
@@ -0,0 +1,243 @@
+# backend/app/services/score.py
+"""
+분류된 드럼 이벤트 (시간, 라벨, 확률)에서 바로 퍼커션 악보(MusicXML)와 MIDI를 만듭니다.
+
+예전에는 pretty_midi로 MIDI를 쓰고 music21로 다시 읽어(converter.parse) 양자화한 뒤 MusicXML을 썼는데,
+music21의 MIDI 파싱/양자화가 순수 파이썬이라 긴 트랙에서 수 초가 걸렸습니다.
+여기서는 온셋 시각을 numpy로 한 번에 16분음표 격자에 맞추고, 마디마다 XML 문자열을 한 번씩만 만듭니다.
+
+    tick = round(시간(초) * BPM / 60 * DIVISIONS)   (DIVISIONS = 4 -> 16분음표 단위)
+"""
+
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+# 4분음표 하나를 나누는 수 (16분음표 격자)
+DIVISIONS = 4
+
+# 길이(tick) -> (음표 종류, 점 여부). 이 길이로 표현할 수 없는 간격은 큰 것부터 쪼개 쉼표로 채움
+NOTE_TYPES = {
+    16: ('whole', False), 12: ('half', True), 8: ('half', False), 6: ('quarter', True),
+    4: ('quarter', False), 3: ('eighth', True), 2: ('eighth', False), 1: ('16th', False),
+}
+_NOTE_LENGTHS = sorted(NOTE_TYPES, reverse=True)
+
+# MIDI 드럼 번호 -> (악기 이름, 표시 위치(음이름, 옥타브), 머리 모양)
+DRUM_NOTATION = {
+    36: ('Bass Drum', 'F', 4, None),
+    38: ('Snare', 'C', 5, None),
+    42: ('Closed Hi-Hat', 'G', 5, 'x'),
+}
+_DEFAULT_NOTATION = ('Percussion', 'C', 5, None)
+
+
+def split_length(length):
+    """간격(tick)을 표현 가능한 음표 길이들로 쪼갭니다. (큰 것부터)"""
+    pieces = []
+    for size in _NOTE_LENGTHS:
+        while length >= size:
+            pieces.append(size)
+            length -= size
+    return pieces
+
+
+def quantize_events(events, bpm, note_map, divisions=DIVISIONS):
+    """
+    이벤트를 격자에 맞춰 (tick 배열, tick별 악기 비트마스크, 악기 MIDI 번호 목록)으로 만듭니다.
+    같은 tick에 들어온 이벤트는 하나의 화음(비트마스크)으로 합칩니다. note_map에 없는 라벨은 버립니다.
+    """
+    pitches = sorted(set(note_map.values()))
+    known = [(t, pitches.index(note_map[label])) for t, label, _ in events if label in note_map]
+    if not known:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), pitches
+
+    times = np.fromiter((t for t, _ in known), dtype=np.float64, count=len(known))
+    instruments = np.fromiter((i for _, i in known), dtype=np.int64, count=len(known))
+    ticks = np.maximum(np.rint(times * (bpm / 60.0) * divisions).astype(np.int64), 0)
+
+    unique_ticks, inverse = np.unique(ticks, return_inverse=True)
+    masks = np.zeros(len(unique_ticks), dtype=np.int64)
+    np.bitwise_or.at(masks, inverse, np.left_shift(1, instruments))
+    return unique_ticks, masks, pitches
+
+
+class _MeasureWriter:
+    """음표/쉼표 XML 조각을 (악기 조합, 길이)별로 한 번만 만들어 재사용합니다."""
+
+    def __init__(self, pitches):
+        self.pitches = pitches
+        self._chords = {}
+        self._rests = {}
+
+    def chord(self, mask, length):
+        key = (mask, length)
+        xml = self._chords.get(key)
+        if xml is None:
+            note_type, dotted = NOTE_TYPES[length]
+            parts = []
+            for i, pitch in enumerate(self.pitches):
+                if not mask >> i & 1:
+                    continue
+                _, step, octave, notehead = DRUM_NOTATION.get(pitch, _DEFAULT_NOTATION)
+                parts.append(
+                    '<note>'
+                    + ('<chord/>' if parts else '')
+                    + f'<unpitched><display-step>{step}</display-step><display-octave>{octave}</display-octave></unpitched>'
+                    f'<duration>{length}</duration><instrument id="P1-I{pitch}"/><voice>1</voice>'
+                    f'<type>{note_type}</type>' + ('<dot/>' if dotted else '') + '<stem>up</stem>'
+                    + (f'<notehead>{notehead}</notehead>' if notehead else '')
+                    + '</note>'
+                )
+            xml = self._chords[key] = ''.join(parts)
+        return xml
+
+    def rest(self, length):
+        xml = self._rests.get(length)
+        if xml is None:
+            note_type, dotted = NOTE_TYPES[length]
+            xml = self._rests[length] = (
+                f'<note><rest/><duration>{length}</duration><voice>1</voice><type>{note_type}</type>'
+                + ('<dot/>' if dotted else '') + '</note>'
+            )
+        return xml
+
+    def rests(self, length):
+        return ''.join(self.rest(size) for size in split_length(length))
+
+
+def build_drum_musicxml(events, bpm, note_map, title=None, beats=4, beat_type=4):
+    """드럼 이벤트와 BPM으로 퍼커션 보표 하나짜리 MusicXML 문서(문자열)를 만듭니다."""
+    ticks, masks, pitches = quantize_events(events, bpm, note_map)
+    bar_length = beats * DIVISIONS * 4 // beat_type
+    num_bars = int(ticks[-1] // bar_length) + 1 if len(ticks) else 1
+    # 마디 경계마다 이벤트 배열의 위치 (마디 b의 이벤트는 ticks[bounds[b]:bounds[b + 1]])
+    bounds = np.searchsorted(ticks, np.arange(num_bars + 1) * bar_length)
+    writer = _MeasureWriter(pitches)
+
+    score_instruments = ''.join(
+        f'<score-instrument id="P1-I{pitch}"><instrument-name>{DRUM_NOTATION.get(pitch, _DEFAULT_NOTATION)[0]}'
+        f'</instrument-name></score-instrument>'
+        for pitch in pitches
+    )
+    midi_instruments = ''.join(
+        f'<midi-instrument id="P1-I{pitch}"><midi-channel>10</midi-channel>'
+        f'<midi-unpitched>{pitch + 1}</midi-unpitched></midi-instrument>'
+        for pitch in pitches
+    )
+    out = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<!DOCTYPE score-partwise PUBLIC "-//Recordare//DTD MusicXML 3.1 Partwise//EN" '
+        '"http://www.musicxml.org/dtds/partwise.dtd">\n'
+        '<score-partwise version="3.1">',
+        f'<work><work-title>{escape(title)}</work-title></work>' if title else '',
+        f'<part-list><score-part id="P1"><part-name>Drumset</part-name>{score_instruments}{midi_instruments}'
+        '</score-part></part-list><part id="P1">',
+    ]
+
+    tick_list = ticks.tolist()
+    mask_list = masks.tolist()
+    bound_list = bounds.tolist()
+    for bar in range(num_bars):
+        bar_start = bar * bar_length
+        out.append(f'<measure number="{bar + 1}">')
+        if bar == 0:
+            out.append(
+                f'<attributes><divisions>{DIVISIONS}</divisions><key><fifths>0</fifths></key>'
+                f'<time><beats>{beats}</beats><beat-type>{beat_type}</beat-type></time>'
+                '<clef><sign>percussion</sign><line>2</line></clef></attributes>'
+                '<direction placement="above"><direction-type><metronome><beat-unit>quarter</beat-unit>'
+                f'<per-minute>{bpm:g}</per-minute></metronome></direction-type><sound tempo="{bpm:g}"/></direction>'
+            )
+
+        lo, hi = bound_list[bar], bound_list[bar + 1]
+        if lo == hi:
+            out.append(f'<note><rest measure="yes"/><duration>{bar_length}</duration><voice>1</voice></note>')
+        else:
+            position = tick_list[lo] - bar_start
+            if position:
+                out.append(writer.rests(position))
+            for k in range(lo, hi):
+                next_position = tick_list[k + 1] - bar_start if k + 1 < hi else bar_length
+                pieces = split_length(next_position - position)
+                # 간격의 첫 조각은 음표, 나머지는 쉼표 (드럼은 음 길이보다 타이밍이 중요)
+                out.append(writer.chord(mask_list[k], pieces[0]))
+                out.append(''.join(writer.rest(size) for size in pieces[1:]))
+                position = next_position
+        out.append('</measure>')
+
+    out.append('</part></score-partwise>\n')
+    return ''.join(out)
+
+
+def write_drum_musicxml(path, events, bpm, note_map, title=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(build_drum_musicxml(events, bpm, note_map, title=title))
+    return path
+
+
+def write_drum_midi(path, events, bpm, note_map, velocity=100, note_length=0.1):
+    """드럼 이벤트를 MIDI 파일(10번 채널 드럼 트랙 하나)로 저장합니다."""
+    import pretty_midi  # MIDI를 쓸 때만 필요 (EventTrack만 쓰는 라우트는 가져오지 않음)
+
+    pm = pretty_midi.PrettyMIDI(initial_tempo=bpm)
+    drum_instrument = pretty_midi.Instrument(program=0, is_drum=True)
+    drum_instrument.notes = [
+        pretty_midi.Note(velocity=velocity, pitch=note_map[label], start=t, end=t + note_length)
+        for t, label, _ in events if label in note_map
+    ]
+    pm.instruments.append(drum_instrument)
+    pm.write(path)
+    return path
+
+
+def save_events(path, events, bpm, labels):
+    """
+    이벤트를 압축된 배열 파일(.npz)로 저장합니다. (/api/events 조회와 나중에 PDF를 렌더링할 때 사용)
+    시간은 정렬되어 있으므로 구간 조회는 이진 탐색으로 합니다.
+    """
+    label_index = {label: i for i, label in enumerate(labels)}
+    np.savez(
+        path,
+        times=np.array([t for t, _, _ in events], dtype=np.float64),
+        labels=np.array([label_index[label] for _, label, _ in events], dtype=np.uint8),
+        probs=np.array([p for _, _, p in events], dtype=np.float32),
+        label_names=np.array(labels),
+        bpm=np.float64(bpm),
+    )
+    return path
+
+
+class EventTrack:
+    """save_events()로 저장한 이벤트 파일."""
+
+    def __init__(self, times, labels, probs, label_names, bpm):
+        self.times = times
+        self.labels = labels
+        self.probs = probs
+        self.label_names = label_names
+        self.bpm = bpm
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['times'], data['labels'], data['probs'],
+                       [str(name) for name in data['label_names']], float(data['bpm']))
+
+    def __len__(self):
+        return len(self.times)
+
+    def events(self):
+        """[(시간, 라벨, 확률), ...] 목록."""
+        return [
+            (t, self.label_names[i], p)
+            for t, i, p in zip(self.times.tolist(), self.labels.tolist(), self.probs.tolist())
+        ]
+
+    def window(self, start=0.0, end=None, limit=None):
+        """start <= 시간 < end 인 이벤트의 (시작 위치, 끝 위치). limit개를 넘으면 잘라 냅니다."""
+        lo = int(np.searchsorted(self.times, start, side='left'))
+        hi = len(self.times) if end is None else max(int(np.searchsorted(self.times, end, side='left')), lo)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return lo, hi
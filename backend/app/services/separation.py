@@ -0,0 +1,382 @@
+# backend/app/services/separation.py
+"""
+Demucs 드럼 분리 워커.
+
+작업마다 `python -m demucs.separate`를 새로 띄우면 파이썬 기동, torch import,
+htdemucs 가중치 로드를 매번 반복하므로, 모델을 올려 둔 채로 계속 살아 있는
+워커 프로세스(`python -m app.services.separation`)를 두고 JSON 한 줄 단위로 작업을 주고받습니다.
+
+긴 녹음도 메모리가 일정하도록 트랙을 겹치는 고정 길이 청크로 나눠 분리하고,
+겹친 구간은 크로스페이드로 이어 붙여 drums.wav에 앞에서부터 바로 씁니다.
+"chunk" 메시지의 frames까지는 확정된 구간이므로 후속 단계가 분리 완료 전에 읽기 시작할 수 있습니다.
+
+    부모 -> 워커 (stdin) : {"job_id": ..., "input_path": ..., "output_path": ...,
+                            "chunk_sec": ..., "overlap_sec": ..., "max_memory_mb": ...}
+    워커 -> 부모 (stdout): {"type": "ready"}
+                           {"type": "progress", "job_id": ..., "fraction": 0.42}
+                           {"type": "chunk", "job_id": ..., "frames": ..., "total_frames": ...}
+                           {"type": "done", "job_id": ..., "output_path": ..., "elapsed": 12.3}
+                           {"type": "error", "job_id": ..., "error": "..."}
+"""
+
+import atexit
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import types
+
+# 작업 폴더에 저장되는 분리된 드럼 스템 파일 이름
+DRUM_STEM_NAME = "drums.wav"
+
+
+class SeparationTask:
+    """워커에 맡긴 분리 작업 하나의 상태. wait()로 완료를 기다립니다."""
+
+    def __init__(self, job_id, input_path, output_path, options, on_progress=None):
+        self.job_id = job_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.options = options
+        self.on_progress = on_progress
+        self.committed_frames = 0  # drums.wav 앞에서부터 확정된 프레임 수
+        self.total_frames = None
+        self.error = None
+        self.elapsed = None
+        self.cpu = None  # 워커 프로세스가 이 작업에 쓴 CPU 시간(초)
+        self.cancelled = False
+        self.process = None  # 이 작업을 실행 중인 워커 프로세스 (SeparationService.lock으로 보호)
+        self._done = threading.Event()
+
+    def finish(self, error=None, elapsed=None, cpu=None):
+        self.error = error
+        self.elapsed = elapsed
+        self.cpu = cpu
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """완료되면 True, timeout이 지나면 False를 반환합니다."""
+        return self._done.wait(timeout)
+
+    @property
+    def is_done(self):
+        return self._done.is_set()
+
+
+class _WorkerProcess:
+    """워커 프로세스 하나와, 대기열에서 작업을 꺼내 그 프로세스에 넘기는 스레드."""
+
+    def __init__(self, service, index):
+        self.service = service
+        self.index = index
+        self.process = None
+        self.thread = threading.Thread(target=self._run, name=f"separation-worker-{index}", daemon=True)
+
+    def _start_process(self):
+        command = [
+            sys.executable, '-m', 'app.services.separation',
+            '--model', self.service.model_name,
+            '--device', self.service.device,
+        ]
+        self.process = subprocess.Popen(
+            command, cwd=self.service.base_dir,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=None,
+            text=True, encoding='utf-8', bufsize=1,
+        )
+        message = self._read_message()
+        if message is None or message.get('type') != 'ready':
+            raise RuntimeError(f"분리 워커 {self.index} 시작 실패: {message}")
+        self.service.logger.info(f"분리 워커 {self.index} 준비 완료 (pid={self.process.pid})")
+
+    def _read_message(self):
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                return None
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                self.service.logger.warning(f"분리 워커 {self.index}: 알 수 없는 출력 무시: {line.strip()}")
+
+    def _run(self):
+        # 첫 작업이 들어오기 전에 미리 모델을 올려 둠
+        try:
+            self._start_process()
+        except Exception as e:
+            self.service.logger.error(f"분리 워커 {self.index} 시작 실패: {e}")
+            self.stop()
+
+        while True:
+            task = self.service.pending.get()
+            if task is None:
+                break
+
+            try:
+                if self.process is None or self.process.poll() is not None:
+                    self._start_process()
+                with self.service.lock:
+                    if task.cancelled:
+                        task.finish(error="취소됨")
+                        continue
+                    task.process = self.process
+                self._process_task(task)
+            except Exception as e:
+                if task.cancelled:
+                    # cancel()이 프로세스를 종료함: 다음 작업에서 새로 시작
+                    self.service.logger.warning(f"[{task.job_id}] 분리 취소, 워커 {self.index} 재시작")
+                    task.finish(error="취소됨")
+                else:
+                    self.service.logger.error(f"[{task.job_id}] 분리 워커 {self.index} 오류: {e}")
+                    task.finish(error=str(e))
+                self.stop()
+            finally:
+                with self.service.lock:
+                    task.process = None
+
+        self.stop()
+
+    def _process_task(self, task):
+        request = {'job_id': task.job_id, 'input_path': task.input_path, 'output_path': task.output_path,
+                   **task.options}
+        self.process.stdin.write(json.dumps(request) + '\n')
+        self.process.stdin.flush()
+
+        while True:
+            message = self._read_message()
+            if message is None:
+                raise RuntimeError("분리 워커 프로세스가 예기치 않게 종료되었습니다.")
+            if message.get('job_id') != task.job_id:
+                continue
+
+            kind = message.get('type')
+            if kind == 'progress':
+                if task.on_progress:
+                    task.on_progress(message['fraction'])
+            elif kind == 'chunk':
+                task.total_frames = message['total_frames']
+                task.committed_frames = message['frames']
+            elif kind == 'done':
+                task.finish(elapsed=message.get('elapsed'), cpu=message.get('cpu'))
+                return
+            elif kind == 'error':
+                task.finish(error=message.get('error', '알 수 없는 오류'))
+                return
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=10)
+            except Exception:
+                self.process.kill()
+        self.process = None
+
+
+class SeparationService:
+    """모델을 올려 둔 분리 워커 프로세스 풀. submit()으로 작업을 대기열에 넣습니다."""
+
+    def __init__(self, base_dir, logger, size=1, model_name='htdemucs', device='',
+                 chunk_sec=300, overlap_sec=2.0, max_memory_mb=2048):
+        self.base_dir = base_dir
+        self.logger = logger
+        self.model_name = model_name
+        self.device = device
+        self.options = {'chunk_sec': chunk_sec, 'overlap_sec': overlap_sec, 'max_memory_mb': max_memory_mb}
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.workers = [_WorkerProcess(self, i) for i in range(max(1, size))]
+
+    def start(self):
+        for worker in self.workers:
+            worker.thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, job_id, input_path, output_path, on_progress=None):
+        task = SeparationTask(job_id, input_path, output_path, self.options, on_progress)
+        self.pending.put(task)
+        return task
+
+    def cancel(self, task, timeout=10):
+        """
+        작업을 취소합니다. 대기 중이면 워커가 건너뛰고, 실행 중이면 그 워커 프로세스를 종료해
+        더 이상 출력 파일을 쓰지 않고 슬롯이 다음 작업으로 넘어가게 합니다. (프로세스는 다음 작업 때 다시 시작)
+        """
+        with self.lock:
+            task.cancelled = True
+            if task.process is not None and not task.is_done and task.process.poll() is None:
+                task.process.kill()
+        task.wait(timeout)
+
+    def running_processes(self):
+        """살아 있는 Demucs 워커 프로세스 수."""
+        return sum(1 for worker in self.workers if worker.process is not None and worker.process.poll() is None)
+
+    def shutdown(self):
+        for _ in self.workers:
+            self.pending.put(None)
+        for worker in self.workers:
+            worker.stop()
+
+
+def init_separation_service(app):
+    """SEPARATION_BACKEND가 'worker'이면 앱 시작 시 분리 워커 풀을 만듭니다."""
+    if app.config['SEPARATION_BACKEND'] != 'worker':
+        return None
+
+    service = SeparationService(
+        app.config['BASE_DIR'], app.logger,
+        size=app.config['SEPARATION_WORKERS'],
+        model_name=app.config['DEMUCS_MODEL'],
+        device=app.config['DEMUCS_DEVICE'],
+        chunk_sec=app.config['SEPARATION_CHUNK_SEC'],
+        overlap_sec=app.config['SEPARATION_OVERLAP_SEC'],
+        max_memory_mb=app.config['SEPARATION_MAX_MEMORY_MB'],
+    )
+    service.start()
+    app.extensions['separation_service'] = service
+    return service
+
+
+# --- 워커 프로세스 쪽 ---
+def plan_chunks(total_frames, sr, chunk_sec, overlap_sec, max_memory_mb, num_sources, channels):
+    """
+    메모리 상한에 맞춰 청크 길이를 정하고 [(시작, 끝), ...] 구간 목록을 반환합니다.
+    apply_model은 청크 길이에 비례해 입력 1개 + 소스별 출력/가중치 버퍼(약 3배)를 잡으므로 이를 기준으로 추정합니다.
+    """
+    bytes_per_sec = (1 + 3 * num_sources) * channels * 4 * sr
+    chunk_sec = min(chunk_sec, max_memory_mb * 1024 * 1024 / bytes_per_sec)
+    overlap = max(int(overlap_sec * sr), 0)  # 0이면 크로스페이드 없이 청크를 그대로 이어 붙임
+    chunk = max(int(chunk_sec * sr), 4 * overlap, sr)
+    step = chunk - overlap
+
+    chunks = []
+    start = 0
+    while True:
+        end = min(start + chunk, total_frames)
+        chunks.append((start, end))
+        if end >= total_frames:
+            return chunks, overlap
+        start += step
+
+
+def _mix_stats(samples, block):
+    """demucs.separate의 정규화 값(모노 믹스의 평균/표준편차)을 블록 단위로 계산합니다."""
+    import numpy as np
+
+    total, total_sq, n = 0.0, 0.0, samples.shape[0]
+    for start in range(0, n, block):
+        mono = samples[start:start + block].mean(axis=1, dtype=np.float64)
+        total += mono.sum()
+        total_sq += np.square(mono).sum()
+    mean = total / n
+    std = np.sqrt(max(total_sq - n * mean * mean, 0.0) / max(n - 1, 1))
+    return mean, std
+
+
+def _worker_main(model_name, device):
+    import numpy as np
+    import torch
+    import demucs.apply
+    from demucs.apply import apply_model
+    from demucs.audio import convert_audio
+    from demucs.pretrained import get_model
+    from app.services.audio_io import AudioHandle, FloatWavWriter
+
+    # 라이브러리가 stdout에 출력해도 프로토콜이 깨지지 않도록 stdout은 stderr로 돌리고,
+    # 원래 stdout은 메시지 전용 채널로만 사용
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    def send(message):
+        channel.write(json.dumps(message) + '\n')
+
+    device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+    model = get_model(model_name)
+    model.to(device)
+    model.eval()
+    drums_index = model.sources.index('drums')
+
+    current = {'job_id': None, 'chunk': 0, 'num_chunks': 1}
+
+    # apply_model(progress=True)의 tqdm 대신 진행률을 메시지로 보내는 반복자 사용
+    def progress_iter(iterable, **kwargs):
+        items = list(iterable)
+        for i, item in enumerate(items, 1):
+            yield item
+            fraction = (current['chunk'] + i / len(items)) / current['num_chunks']
+            send({'type': 'progress', 'job_id': current['job_id'], 'fraction': fraction})
+
+    demucs.apply.tqdm = types.SimpleNamespace(tqdm=progress_iter)
+
+    send({'type': 'ready'})
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        current['job_id'] = job_id = request['job_id']
+        started, cpu_started = time.time(), time.process_time()
+        try:
+            audio = AudioHandle.open(request['input_path'], sr=model.samplerate)
+            total = audio.num_frames
+            chunks, overlap = plan_chunks(
+                total, model.samplerate, request['chunk_sec'], request['overlap_sec'],
+                request['max_memory_mb'], len(model.sources), model.audio_channels,
+            )
+            current['num_chunks'] = len(chunks)
+
+            # 정규화는 청크별이 아니라 트랙 전체 기준 (demucs.separate와 동일)
+            mean, std = _mix_stats(audio.samples, model.samplerate * 60)
+            fade_in = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)[:, np.newaxis]
+            fade_out = 1.0 - fade_in
+
+            writer = FloatWavWriter(request['output_path'], model.samplerate, model.audio_channels)
+            tail = None
+            try:
+                for i, (start, end) in enumerate(chunks):
+                    current['chunk'] = i
+                    wav = torch.from_numpy(np.ascontiguousarray(audio.samples[start:end].T))
+                    wav = convert_audio(wav, model.samplerate, model.samplerate, model.audio_channels)
+                    wav = (wav - mean) / std
+                    with torch.no_grad():
+                        sources = apply_model(model, wav[None], device=device, shifts=1, split=True,
+                                              overlap=0.25, progress=True)[0]
+                    drums = (sources[drums_index] * std + mean).cpu().numpy().T
+                    del sources, wav
+
+                    # 이전 청크의 끝부분과 겹치는 구간은 선형 크로스페이드로 이어 붙임
+                    if tail is not None:
+                        drums[:overlap] = tail * fade_out + drums[:overlap] * fade_in
+
+                    if end < total and overlap > 0:
+                        writer.write(drums[:-overlap])
+                        tail = drums[-overlap:].copy()
+                    else:
+                        writer.write(drums)
+
+                    # 여기까지 쓴 프레임은 확정 -> 후속 단계(온셋 검출)가 바로 읽어도 됨
+                    send({'type': 'chunk', 'job_id': job_id, 'frames': writer.frames, 'total_frames': total})
+            finally:
+                writer.close()
+                audio.release()
+
+            send({'type': 'done', 'job_id': job_id, 'output_path': request['output_path'],
+                  'elapsed': time.time() - started, 'cpu': time.process_time() - cpu_started})
+        except Exception as e:
+            traceback.print_exc()
+            send({'type': 'error', 'job_id': job_id, 'error': str(e)})
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Demucs 드럼 분리 워커 (모델 상주)")
+    parser.add_argument('--model', default='htdemucs')
+    parser.add_argument('--device', default='')
+    args = parser.parse_args()
+    _worker_main(args.model, args.device)
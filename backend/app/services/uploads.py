@@ -0,0 +1,292 @@
+# backend/app/services/uploads.py
+"""
+업로드 저장.
+
+    save_upload()      : 한 번에 올라온 파일(multipart)을 저장하면서 해시 계산
+    ChunkedUploadStore : init -> append(청크, 여러 번) -> finalize 방식의 이어 올리기
+                         <UPLOAD_FOLDER>/partial/<upload_id>.part 에 바로 이어 쓰고,
+                         연결이 끊기면 현재 offset부터 다시 보내면 됩니다.
+
+파일 형식은 확장자나 파일 이름 대신 앞부분 매직 바이트로 판별합니다.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl  # 워커 프로세스 간 업로드별 잠금 (POSIX)
+except ImportError:
+    fcntl = None
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 판별에 필요한 앞부분 바이트 수
+SNIFF_BYTES = 16
+
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def sniff_audio_format(header):
+    """파일 앞부분 바이트로 오디오 컨테이너 형식(확장자)을 판별합니다. 모르면 None."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'RF64' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if header[4:8] == b'ftyp':
+        return 'm4a'
+    if header[:4] == b'\x1aE\xdf\xa3':
+        return 'webm'
+    if header[:3] == b'ID3':
+        return 'mp3'
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        # MPEG 프레임 동기 비트: layer 비트가 00이면 ADTS(AAC), 아니면 MP3
+        return 'aac' if header[1] & 0x06 == 0 else 'mp3'
+    return None
+
+
+def sniff_file_format(path):
+    with open(path, 'rb') as f:
+        return sniff_audio_format(f.read(SNIFF_BYTES))
+
+
+def _hash_file(path, size, chunk_size=UPLOAD_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def save_upload(stream, filepath, chunk_size=UPLOAD_CHUNK_SIZE):
+    """업로드 스트림을 청크 단위로 디스크에 쓰면서 SHA-256을 함께 계산하여 반환합니다."""
+    digest = hashlib.sha256()
+    with open(filepath, 'wb') as f:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+class UploadOffsetMismatch(Exception):
+    """보낸 청크의 시작 위치가 서버에 저장된 크기와 다를 때. offset은 서버 쪽 현재 크기."""
+
+    def __init__(self, offset):
+        super().__init__(f"업로드 위치가 맞지 않습니다 (서버 offset: {offset})")
+        self.offset = offset
+
+
+class UploadBusy(UploadOffsetMismatch):
+    """같은 업로드를 다른 요청(다른 워커 프로세스 포함)이 쓰거나 마무리하는 중일 때."""
+
+    def __init__(self, offset):
+        Exception.__init__(self, f"다른 요청이 이 업로드를 처리 중입니다 (서버 offset: {offset})")
+        self.offset = offset
+
+
+class UnsupportedAudioFormat(Exception):
+    pass
+
+
+class ChunkedUploadStore:
+    """
+    이어 올리기 업로드 저장소. 상태는 파일(.part/.json)로만 두므로 어느 워커 프로세스로
+    요청이 가도 이어서 받을 수 있습니다. 해시는 받는 대로 갱신하고, 해시 상태가 없는
+    프로세스(재시작/다른 워커)에서는 이미 받은 부분을 한 번 다시 읽어 이어 갑니다.
+    쓰기/마무리/정리는 업로드마다 .json 파일에 flock을 잡고 하므로 다른 워커 프로세스와 겹치지 않고,
+    이미 잡혀 있으면 기다리지 않고 UploadBusy로 알립니다. (fcntl이 없는 환경에서는 프로세스 안에서만 보호)
+    """
+
+    def __init__(self, upload_folder, ttl_sec=24 * 3600, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.upload_folder = upload_folder
+        self.partial_folder = os.path.join(upload_folder, 'partial')
+        self.ttl_sec = ttl_sec
+        self.chunk_size = chunk_size
+        self._hashers = {}  # upload_id -> (sha256, 해시한 바이트 수)
+        self._locks = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.partial_folder, exist_ok=True)
+
+    def _paths(self, upload_id):
+        # upload_id는 URL에서 오므로 create()가 만든 형식만 허용
+        if not UPLOAD_ID_RE.match(upload_id or ''):
+            raise UploadNotFound(upload_id)
+        base = os.path.join(self.partial_folder, upload_id)
+        return base + '.part', base + '.json'
+
+    def _upload_lock(self, upload_id):
+        with self._lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    @contextmanager
+    def _locked(self, upload_id):
+        """이 업로드를 이 스레드만 쓰도록 잠급니다. (같은 프로세스: threading.Lock, 다른 프로세스: flock)"""
+        part_path, meta_path = self._paths(upload_id)
+        lock = self._upload_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            raise UploadBusy(self.offset(upload_id))
+        try:
+            try:
+                fd = os.open(meta_path, os.O_RDONLY)
+            except OSError:
+                raise UploadNotFound(upload_id)
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        raise UploadBusy(self.offset(upload_id))
+                # 잠금을 얻기 전에 다른 프로세스가 마무리/정리했으면 .json이 지워져 있음
+                if not os.path.exists(meta_path):
+                    raise UploadNotFound(upload_id)
+                yield part_path, meta_path
+            finally:
+                os.close(fd)  # flock도 함께 풀림
+        finally:
+            lock.release()
+
+    def _forget(self, upload_id):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+
+    def create(self, filename=None, size=None):
+        """새 업로드를 시작하고 upload_id를 반환합니다."""
+        self.evict()
+        upload_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        with open(meta_path, 'w') as f:
+            json.dump({'filename': filename, 'size': size, 'created_at': time.time()}, f)
+        return upload_id
+
+    def offset(self, upload_id):
+        """지금까지 받은 바이트 수 (클라이언트가 이어 보낼 위치)."""
+        part_path, _ = self._paths(upload_id)
+        try:
+            return os.path.getsize(part_path)
+        except OSError:
+            raise UploadNotFound(upload_id)
+
+    def meta(self, upload_id):
+        _, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except OSError:
+            raise UploadNotFound(upload_id)
+
+    def append(self, upload_id, offset, stream):
+        """offset 위치부터 stream을 이어 쓰고 새 offset을 반환합니다."""
+        with self._locked(upload_id) as (part_path, _):
+            current = self.offset(upload_id)
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+
+            with self._lock:
+                digest, hashed = self._hashers.pop(upload_id, (None, 0))
+            if digest is None or hashed != current:
+                digest = _hash_file(part_path, current)
+
+            written = current
+            try:
+                with open(part_path, 'r+b') as f:
+                    f.seek(current)
+                    for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        written += len(chunk)
+            finally:
+                # 중간에 연결이 끊겨도 쓴 만큼은 유효하므로 해시 상태도 그만큼으로 보관
+                with self._lock:
+                    self._hashers[upload_id] = (digest, written)
+            return written
+
+    def finalize(self, upload_id, dest_dir, name, expected_size=None, expected_sha256=None):
+        """
+        업로드를 마치고 파일 형식을 판별해 dest_dir/<name>.<형식>으로 옮깁니다.
+        (최종 경로, SHA-256, 형식)을 반환합니다.
+        """
+        with self._locked(upload_id) as (part_path, meta_path):
+            size = self.offset(upload_id)
+            if expected_size is None:
+                expected_size = self.meta(upload_id).get('size')
+            if expected_size is not None and size != int(expected_size):
+                raise UploadOffsetMismatch(size)
+
+            with self._lock:
+                digest, hashed = self._hashers.pop(upload_id, (None, 0))
+            if digest is None or hashed != size:
+                digest = _hash_file(part_path, size)
+            sha256 = digest.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != sha256:
+                raise ValueError("업로드된 파일의 해시가 일치하지 않습니다.")
+
+            audio_format = sniff_file_format(part_path)
+            if audio_format is None:
+                raise UnsupportedAudioFormat("지원하지 않는 오디오 형식입니다.")
+
+            dest_path = os.path.join(dest_dir, f"{name}.{audio_format}")
+            shutil.move(part_path, dest_path)
+            os.remove(meta_path)
+        self._forget(upload_id)
+        return dest_path, sha256, audio_format
+
+    def evict(self):
+        """ttl_sec 동안 이어지지 않은 미완료 업로드를 지웁니다."""
+        cutoff = time.time() - self.ttl_sec
+        for entry in os.listdir(self.partial_folder):
+            upload_id, ext = os.path.splitext(entry)
+            if ext != '.json':
+                continue
+            try:
+                # 쓰는 중인 업로드는 건너뜀
+                with self._locked(upload_id) as (part_path, meta_path):
+                    # 마지막으로 청크를 받은 시각(.part 수정 시각) 기준
+                    last_active = os.path.getmtime(part_path if os.path.exists(part_path) else meta_path)
+                    if last_active >= cutoff:
+                        continue
+                    for path in (part_path, meta_path):
+                        if os.path.exists(path):
+                            os.remove(path)
+            except (OSError, UploadNotFound, UploadOffsetMismatch):
+                continue
+            self._forget(upload_id)
+
+        # 다른 프로세스가 마무리/정리한 업로드의 잠금/해시 상태도 버림
+        with self._lock:
+            known = set(self._locks) | set(self._hashers)
+        for upload_id in known:
+            if not os.path.exists(self._paths(upload_id)[1]):
+                self._forget(upload_id)
+
+
+def init_upload_store(app):
+    """이어 올리기 업로드 저장소를 만듭니다."""
+    store = ChunkedUploadStore(
+        app.config['UPLOAD_FOLDER'],
+        ttl_sec=app.config['UPLOAD_PARTIAL_TTL_SEC'],
+    )
+    app.extensions['upload_store'] = store
+    return store
@@ -1,37 +1,190 @@
 # backend/app/tasks.py
 import threading
+import time
+from collections import deque
 from flask import current_app
 
-# [수정] 'progress' 키 제거
-jobs = {}
+from app.services.job_store import MemoryJobStore
+from app.services.metrics import metrics
+
+# [수정] 모듈 전역 dict 대신 교체 가능한 작업 상태 저장소 사용 (create_app()에서 설정에 맞게 교체)
+# 스케줄러 스레드처럼 앱 컨텍스트 밖에서도 상태를 갱신하므로 모듈 전역으로 둠
+job_store = MemoryJobStore()
+
+# [신규] 스테이지 이름 -> 사용자에게 보여 줄 이름
+STAGE_LABELS = {
+    'separation': '드럼 분리',
+    'analysis': '분석',
+}
+
+# 캐시 잠금 대기 등으로 스테이지를 다시 실행할 때까지의 간격(초)
+RETRY_DELAY_SEC = 1.0
 
 # [수정] progress 인자 제거
 def update_job_status(job_id, status, message, results=None):
-    """작업의 상태를 업데이트합니다."""
-    if job_id not in jobs:
-        jobs[job_id] = {'status': 'pending', 'message': '대기 중'}
-
-    jobs[job_id]['status'] = status
-    jobs[job_id]['message'] = message
-        
+    """작업의 상태를 업데이트합니다. 'processing' 중의 진행 메시지는 모아서 기록합니다."""
+    fields = {'status': status, 'message': message}
     if results:
-        jobs[job_id]['results'] = results
+        fields['results'] = results
+    job_store.update(job_id, fields, buffered=(status == 'processing'))
+    if status in ('completed', 'error'):
+        metrics.inc('drum_jobs_finished_total', status=status)
+
+
+def update_job_progress(job_id, progress, message):
+    """
+    [신규] 숫자로 된 진행 상황(progress)과 사람이 읽는 메시지를 함께 기록합니다.
+    호출 빈도는 app/services/progress.py의 ProgressReporter가 제한합니다.
+    """
+    job_store.update(
+        job_id, {'status': 'processing', 'message': message, 'progress': progress}, buffered=True
+    )
+
+
+def update_job_queue(job_id, stage, position=None, depth=None, message=None):
+    """작업이 어느 스테이지에 있는지, 대기열에서 몇 번째인지 기록합니다. (position=None이면 실행 중)"""
+    fields = {'stage': stage, 'queuePosition': position, 'queueDepth': depth}
+    if message is not None:
+        fields['message'] = message
+    job_store.update(job_id, fields, buffered=True)
+
+
+class StageScheduler:
+    """
+    스테이지(분리 / 분석)마다 크기가 정해진 워커 스레드 풀과 대기열을 두고,
+    작업을 스테이지 순서대로 넘겨 가며 실행하는 스케줄러입니다.
+
+    작업마다 스레드를 만들지 않으므로 동시에 도는 Demucs/TFLite 개수가
+    설정값을 넘지 않고, 한 작업의 분석과 다른 작업의 분리가 겹쳐서 진행됩니다.
+    """
+
+    def __init__(self, app, stages, pool_sizes, retry_marker=None):
+        self.app = app
+        self.stages = stages  # 스테이지 이름 -> fn(job) -> 다음 스테이지 이름 또는 None
+        self.pool_sizes = pool_sizes
+        self.retry_marker = retry_marker
+        self._queues = {stage: deque() for stage in stages}
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        for stage in self.stages:
+            for i in range(max(1, self.pool_sizes.get(stage, 1))):
+                thread = threading.Thread(
+                    target=self._worker, args=(stage,), name=f"{stage}-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, stage, job):
+        """job을 stage의 대기열 맨 뒤에 넣습니다."""
+        with self._cond:
+            # 대기열에 들어간 시각을 함께 넣어 두었다가 꺼낼 때 대기 시간을 기록
+            self._queues[stage].append((job, time.monotonic()))
+            self._publish_positions(stage)
+            self._cond.notify_all()
+
+    def _publish_positions(self, stage):
+        # 대기열이 바뀔 때마다 남은 작업들의 순번을 갱신 (self._cond 안에서 호출)
+        queue = self._queues[stage]
+        depth = len(queue)
+        for position, (job, _) in enumerate(queue, start=1):
+            message = f"{STAGE_LABELS.get(stage, stage)} 대기 중... ({position}/{depth})"
+            update_job_queue(job.job_id, stage, position, depth, message=message)
 
+    def queue_depths(self):
+        with self._cond:
+            return {stage: len(queue) for stage, queue in self._queues.items()}
 
-def start_background_task(job_id, audio_path):
-    """백그라운드에서 오디오 처리 파이프라인을 실행합니다."""
-    from app.services.audio_processor import run_processing_pipeline
+    def _worker(self, stage):
+        queue = self._queues[stage]
+        while True:
+            with self._cond:
+                while not queue:
+                    self._cond.wait()
+                job, enqueued_at = queue.popleft()
+                self._publish_positions(stage)
+                update_job_queue(job.job_id, stage)
 
-    app = current_app._get_current_object()
+            metrics.observe('drum_queue_wait_seconds', time.monotonic() - enqueued_at, stage=stage)
+            next_stage = None
+            with self.app.app_context():
+                try:
+                    next_stage = self.stages[stage](job)
+                except Exception as e:
+                    current_app.logger.exception(f"[{job.job_id}] {stage} 스테이지 처리 중 예외 발생")
+                    # 정리(진행 보고 종료 포함)를 먼저 해서 남은 진행 보고가 'error' 상태를 덮어쓰지 않도록 함
+                    try:
+                        job.cleanup()
+                    except Exception:
+                        current_app.logger.exception(f"[{job.job_id}] 작업 정리 실패")
+                    update_job_status(job.job_id, 'error', f'처리 중 오류가 발생했습니다: {e}')
 
-    def task_with_context():
-        with app.app_context():
-            run_processing_pipeline(job_id, audio_path)
+            if next_stage is None:
+                update_job_queue(job.job_id, None)
+            elif next_stage == self.retry_marker:
+                timer = threading.Timer(RETRY_DELAY_SEC, self.submit, args=(stage, job))
+                timer.daemon = True
+                timer.start()
+            else:
+                self.submit(next_stage, job)
 
-    thread = threading.Thread(target=task_with_context)
-    thread.start()
+
+def init_job_store(app):
+    """설정된 작업 상태 저장소를 이 모듈의 상태 함수들이 사용하도록 교체합니다."""
+    global job_store
+    from app.services.job_store import init_job_store as create_job_store
+
+    job_store = create_job_store(app)
+    return job_store
+
+
+def init_scheduler(app):
+    """설정된 크기의 스테이지별 워커 풀을 시작합니다."""
+    from app.services.audio_processor import PIPELINE_STAGES, RETRY_LATER
+
+    scheduler = StageScheduler(
+        app,
+        PIPELINE_STAGES,
+        pool_sizes={
+            'separation': app.config['SEPARATION_POOL_WORKERS'],
+            'analysis': app.config['ANALYSIS_POOL_WORKERS'],
+        },
+        retry_marker=RETRY_LATER,
+    ).start()
+    app.extensions['scheduler'] = scheduler
+    return scheduler
+
+
+def start_background_task(job_id, audio_path, audio_hash=None, profile=False):
+    """
+    오디오 처리 작업을 스케줄러의 첫 스테이지 대기열에 넣습니다.
+    profile=True이거나 PROFILE_SAMPLE_RATE로 뽑히면 스테이지를 프로파일러 아래에서 실행합니다.
+    """
+    from app.services.audio_processor import PipelineJob, FIRST_STAGE
+    from app.services.profiling import should_profile
+
+    profile = should_profile(profile, current_app.config['PROFILE_SAMPLE_RATE'])
+    scheduler = current_app.extensions['scheduler']
+    scheduler.submit(FIRST_STAGE, PipelineJob(job_id, audio_path, audio_hash=audio_hash, profile=profile))
 
 
 def get_job_status(job_id):
     """특정 작업의 상태를 반환합니다."""
-    return jobs.get(job_id)
\ No newline at end of file
+    return job_store.get(job_id)
+
+
+def get_job_status_versioned(job_id):
+    """(작업 상태, version)을 반환합니다. version은 상태가 바뀔 때마다 커집니다."""
+    return job_store.get_versioned(job_id)
+
+
+def count_jobs_by_status():
+    """상태 -> 작업 수. (/metrics용)"""
+    return job_store.count_by_status()
+
+
+def wait_for_job_change(job_id, since, timeout):
+    """version이 since보다 커질 때까지 최대 timeout초 기다린 뒤 (작업 상태, version)을 반환합니다."""
+    return job_store.wait_for_change(job_id, since, timeout)
@@ -0,0 +1,5 @@
+# backend/benchmarks/__init__.py
+"""
+합성 드럼 트랙으로 파이프라인 스테이지(디코딩, 분리, BPM, 온셋, 특징 추출, 추론, MIDI, MusicXML, PDF)별
+시간을 재는 벤치마크 모음입니다. 실행 방법은 __main__.py를 참고하세요.
+"""
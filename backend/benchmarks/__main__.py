@@ -0,0 +1,158 @@
+# backend/benchmarks/__main__.py
+"""
+스테이지별 벤치마크 실행기.
+
+    python -m benchmarks                                   # 60초, 120BPM 합성 트랙, 분리는 스텁
+    python -m benchmarks --duration 300 --bpm 96 --density 0.8 --repeats 5
+    python -m benchmarks --separation demucs --format mp3  # 실제 Demucs 분리 포함
+    python -m benchmarks --compare benchmarks/results/baseline.json   # 느려진 스테이지가 있으면 종료 코드 1
+
+결과는 JSON(--output, 기본 benchmarks/results/bench-<시각>.json)으로 저장하며,
+스테이지마다 실행별 시간과 중앙값/최솟값(ms)을 담습니다.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from config import Config
+from benchmarks.synth import generate_track, write_track
+from benchmarks.stages import (
+    STAGES, OPTIONAL_STAGES, SEPARATION_MODES, BenchResources, StageTimer, run_once,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# --compare: 중앙값이 기준보다 이 비율 넘게 느려지고, 차이가 MIN_REGRESSION_MS 이상이면 회귀로 봄
+DEFAULT_THRESHOLD = 0.2
+MIN_REGRESSION_MS = 5.0
+
+
+def summarize(timer):
+    stages = {}
+    for stage in STAGES:
+        runs = timer.runs.get(stage)
+        if not runs:
+            continue
+        ms = np.array(runs) * 1000
+        stages[stage] = {
+            'runsMs': [round(float(x), 2) for x in ms],
+            'medianMs': round(float(np.median(ms)), 2),
+            'minMs': round(float(ms.min()), 2),
+            'meanMs': round(float(ms.mean()), 2),
+        }
+    return stages
+
+
+def compare(result, baseline, threshold):
+    """기준 결과와 스테이지별 중앙값을 비교해 출력하고, 회귀한 스테이지 목록을 반환합니다."""
+    regressions = []
+    print(f"\n{'stage':<11} {'base(ms)':>10} {'now(ms)':>10} {'change':>8}")
+    for stage in STAGES:
+        now = result['stages'].get(stage)
+        base = baseline.get('stages', {}).get(stage)
+        if now is None or base is None:
+            continue
+        change = now['medianMs'] / base['medianMs'] - 1 if base['medianMs'] else 0.0
+        regressed = change > threshold and now['medianMs'] - base['medianMs'] >= MIN_REGRESSION_MS
+        if regressed:
+            regressions.append(stage)
+        print(f"{stage:<11} {base['medianMs']:>10.1f} {now['medianMs']:>10.1f} {change:>+7.0%}"
+              + ("  <- 회귀" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 드럼 트랙으로 파이프라인 스테이지별 시간을 측정합니다.")
+    parser.add_argument('--duration', type=float, default=60.0, help="트랙 길이(초)")
+    parser.add_argument('--bpm', type=float, default=120.0)
+    parser.add_argument('--density', type=float, default=0.5, help="타격 밀도 (0~1)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', default='wav', help="입력 파일 형식 (wav 외에는 ffmpeg로 인코딩)")
+    parser.add_argument('--separation', choices=SEPARATION_MODES, default='stub',
+                        help="stub: 분리 없이 원본을 드럼 스템으로 사용 (CPU CI용), demucs: 실제 분리 워커")
+    parser.add_argument('--skip', nargs='*', choices=OPTIONAL_STAGES, default=[])
+    parser.add_argument('--model', default=None, help="TFLite 모델 경로 (기본: MODEL_PATH)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1, help="기록하지 않는 사전 실행 횟수")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None, help="비교할 기준 결과 JSON")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    work_root = tempfile.mkdtemp(prefix='drum-bench-')
+    resources = BenchResources(separation=args.separation, skip=args.skip, model_path=args.model)
+    try:
+        samples, truth = generate_track(args.duration, args.bpm, args.density, args.seed)
+        track_path = write_track(os.path.join(work_root, f'track.{args.format}'), samples,
+                                 ffmpeg_path=Config.FFMPEG_PATH)
+        print(f"합성 트랙: {args.duration:g}초, {args.bpm:g}BPM, 밀도 {args.density:g}, 타격 {len(truth)}개 "
+              f"({args.format}), 분리 {args.separation}")
+        for stage, reason in resources.skipped.items():
+            print(f"건너뜀: {stage} ({reason})")
+
+        for i in range(args.warmup):
+            run_once(track_path, truth, os.path.join(work_root, f'warmup-{i}'), resources, StageTimer(), args.bpm)
+
+        timer = StageTimer()
+        quality = None
+        for i in range(max(1, args.repeats)):
+            quality = run_once(track_path, truth, os.path.join(work_root, f'run-{i}'), resources, timer, args.bpm)
+            shutil.rmtree(os.path.join(work_root, f'run-{i}'), ignore_errors=True)
+    finally:
+        resources.shutdown()
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    stages = summarize(timer)
+    total_ms = sum(stage['medianMs'] for stage in stages.values())
+    result = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpuCount': os.cpu_count(),
+        },
+        'config': {
+            'duration': args.duration, 'bpm': args.bpm, 'density': args.density, 'seed': args.seed,
+            'format': args.format, 'separation': args.separation, 'repeats': args.repeats,
+            'batchSize': resources.batch_size, 'modelVariant': Config.MODEL_VARIANT,
+            'tfliteNumThreads': Config.TFLITE_NUM_THREADS, 'tfliteDelegate': Config.TFLITE_DELEGATE,
+            'inferenceBackend': Config.INFERENCE_BACKEND,
+        },
+        'track': {'hits': len(truth)},
+        'quality': quality,
+        'stages': stages,
+        'skipped': resources.skipped,
+        'totalMs': round(total_ms, 2),
+        'realtimeFactor': round(total_ms / 1000 / args.duration, 4),
+    }
+
+    print(f"\n{'stage':<11} {'median(ms)':>11} {'min(ms)':>9}")
+    for stage, summary in stages.items():
+        print(f"{stage:<11} {summary['medianMs']:>11.1f} {summary['minMs']:>9.1f}")
+    print(f"{'total':<11} {total_ms:>11.1f}   (오디오 1초당 {result['realtimeFactor'] * 1000:.1f}ms)")
+    print(f"온셋 재현율 {quality['onsetRecall']:.3f}, 정밀도 {quality['onsetPrecision']:.3f}, BPM {quality['bpm']:g}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n결과 저장: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n회귀: {', '.join(regressions)} (기준 대비 {args.threshold:.0%} 초과)")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# backend/benchmarks/backends.py
+"""
+추론 백엔드(INFERENCE_BACKENDS) 비교: 예측 일치 검사 + 로드 시간 / 메모리 / 배치 지연 시간.
+
+백엔드마다 새 파이썬 프로세스에서 모델을 로드하므로 import 시간과 메모리(RSS)가 서로 섞이지 않습니다.
+모든 백엔드에 같은 무작위 윈도우를 넣어 기준 백엔드(목록의 첫 번째)와 확률 차이가 --atol을 넘으면
+종료 코드 1로 끝납니다. 설치되지 않았거나 모델 파일이 없는 백엔드는 건너뛰고 이유를 남깁니다.
+
+    python -m benchmarks.backends                                  # 설치된 백엔드 모두 비교
+    python -m benchmarks.backends --backends tensorflow onnxruntime --batch-size 32 --runs 50
+    python -m benchmarks.backends --atol 0.05                      # 양자화 모델(MODEL_VARIANT) 비교 시
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from config import Config
+from app.services.inference import INFERENCE_BACKENDS, INPUT_SHAPE
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# float32 모델끼리는 커널 구현 차이 정도만 허용
+DEFAULT_ATOL = 1e-4
+
+
+def model_path_for(backend):
+    """설정된 MODEL_VARIANT의 모델 파일 중 backend가 읽는 형식(.tflite / .onnx)의 경로."""
+    stem, _ = os.path.splitext(Config.MODEL_PATH)
+    return stem + ('.onnx' if backend == 'onnxruntime' else '.tflite')
+
+
+def _rss_mb():
+    """현재 프로세스의 RSS(MB). /proc가 없으면 최대 RSS로 대신합니다."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def probe(backend, model_path, batch_size, num_threads, samples, runs, output_path):
+    """(자식 프로세스) 모델을 로드해 측정하고, 예측 확률을 output_path(.npy)에 저장합니다."""
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    from app.services.inference import load_tflite_model, prepare_batch_input, run_inference_batch
+
+    interpreter = load_tflite_model(model_path, num_threads=num_threads,
+                                    delegate=Config.TFLITE_DELEGATE, backend=backend)
+    batch_size = prepare_batch_input(interpreter, batch_size)
+    load_sec = time.perf_counter() - started
+
+    windows = np.random.default_rng(0).standard_normal((samples, *INPUT_SHAPE)).astype(np.float32)
+    batch = np.zeros((batch_size, *INPUT_SHAPE), dtype=np.float32)
+    probas = []
+    for start in range(0, samples, batch_size):
+        chunk = windows[start:start + batch_size]
+        batch[:len(chunk)] = chunk
+        batch[len(chunk):] = 0.0
+        probas.append(run_inference_batch(interpreter, batch)[:len(chunk)].copy())
+    np.save(output_path, np.concatenate(probas))
+
+    timings = []
+    for _ in range(runs):
+        batch_started = time.perf_counter()
+        run_inference_batch(interpreter, batch)
+        timings.append((time.perf_counter() - batch_started) * 1000)
+    return {
+        'loadSec': round(load_sec, 3),
+        'rssMb': round(_rss_mb(), 1),
+        'rssDeltaMb': round(_rss_mb() - rss_before, 1),
+        'batchSize': batch_size,
+        'batchMsP50': round(float(np.median(timings)), 2),
+        'batchMsP90': round(float(np.percentile(timings, 90)), 2),
+    }
+
+
+def run_probe(backend, args, output_path):
+    """새 프로세스에서 probe()를 실행하고 결과(dict)를 반환합니다. 실패하면 {'error': ...}."""
+    model_path = model_path_for(backend)
+    if not os.path.exists(model_path):
+        return {'error': f"모델 파일 없음 ({model_path})"}
+    command = [sys.executable, '-m', 'benchmarks.backends', '--probe', backend, '--probe-output', output_path,
+               '--batch-size', str(args.batch_size), '--threads', str(args.threads),
+               '--samples', str(args.samples), '--runs', str(args.runs)]
+    result = subprocess.run(command, cwd=BASE_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': (result.stderr.strip().splitlines() or ['알 수 없는 오류'])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추론 백엔드별 예측 일치 / 로드 시간 / 메모리 / 배치 지연 시간 비교")
+    parser.add_argument('--backends', nargs='+', choices=INFERENCE_BACKENDS, default=list(INFERENCE_BACKENDS))
+    parser.add_argument('--batch-size', type=int, default=Config.INFERENCE_BATCH_SIZE)
+    parser.add_argument('--threads', type=int, default=1, help="인터프리터 연산 스레드 수")
+    parser.add_argument('--samples', type=int, default=256, help="예측 비교에 쓸 무작위 윈도우 수")
+    parser.add_argument('--runs', type=int, default=30, help="배치 지연 시간 측정 횟수")
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL, help="기준 백엔드 대비 허용하는 확률 차이")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--probe', choices=INFERENCE_BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--probe-output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(probe(args.probe, model_path_for(args.probe), args.batch_size, args.threads,
+                               args.samples, args.runs, args.probe_output)))
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='backend-bench-')
+    results, reference, reference_backend = {}, None, None
+    failures = []
+    print(f"{'backend':<15} {'load(s)':>8} {'rss(MB)':>8} {'p50(ms)':>8} {'p90(ms)':>8} {'max diff':>9} {'agree':>6}")
+    for backend in args.backends:
+        output_path = os.path.join(work_dir, f'{backend}.npy')
+        result = run_probe(backend, args, output_path)
+        results[backend] = result
+        if 'error' in result:
+            print(f"{backend:<15} 건너뜀: {result['error']}")
+            continue
+
+        probas = np.load(output_path)
+        os.remove(output_path)
+        if reference is None:
+            reference, reference_backend = probas, backend
+        result['maxAbsDiff'] = float(np.abs(probas - reference).max())
+        result['argmaxAgreement'] = round(float(np.mean(probas.argmax(axis=1) == reference.argmax(axis=1))), 4)
+        result['reference'] = reference_backend
+        if result['maxAbsDiff'] > args.atol:
+            failures.append(f"{backend}: {reference_backend} 대비 최대 차이 {result['maxAbsDiff']:.2e} > {args.atol:g}")
+        print(f"{backend:<15} {result['loadSec']:>8.2f} {result['rssMb']:>8.0f} {result['batchMsP50']:>8.1f} "
+              f"{result['batchMsP90']:>8.1f} {result['maxAbsDiff']:>9.1e} {result['argmaxAgreement']:>6.3f}")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'modelVariant': Config.MODEL_VARIANT,
+        'batchSize': args.batch_size,
+        'threads': args.threads,
+        'samples': args.samples,
+        'atol': args.atol,
+        'backends': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"backends-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n결과 저장: {output}")
+
+    compared = sum(1 for result in results.values() if 'error' not in result)
+    if compared < 2:
+        print("비교할 수 있는 백엔드가 2개 미만이라 예측 일치 검사는 하지 않았습니다.")
+    if failures:
+        print("\n예측 불일치:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
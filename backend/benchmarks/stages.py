@@ -0,0 +1,204 @@
+# backend/benchmarks/stages.py
+"""
+파이프라인 스테이지를 Flask 앱 없이 하나씩 실행하며 시간을 잽니다.
+
+서버의 스테이지 함수(app/services/audio_processor.py)가 쓰는 것과 같은 서비스 함수를 직접 부르되,
+모델 로드/워커 기동처럼 서버 시작 시 한 번 하는 준비는 BenchResources에서 미리 해 두고 측정에서 뺍니다.
+"""
+
+import logging
+import os
+import shutil
+import time
+
+import librosa
+import numpy as np
+
+from config import Config
+from app.services.audio_io import AudioHandle
+from app.services.audio_processor import LABELS, NOTE_MAP, SR, TARGET_SHAPE
+from app.services.features import MelFeatureEngine
+from app.services.onsets import OnsetDetector
+from app.services.rendering import RenderService, resolve_musescore_path
+from app.services.score import write_drum_midi, write_drum_musicxml
+from app.services.separation import DRUM_STEM_NAME, SeparationService
+
+# 측정 순서대로의 스테이지 이름
+STAGES = ('decode', 'separation', 'bpm', 'onsets', 'features', 'inference', 'midi', 'musicxml', 'pdf')
+# --skip으로 뺄 수 있는 스테이지 (나머지는 뒤 스테이지의 입력을 만듦)
+OPTIONAL_STAGES = ('bpm', 'inference', 'midi', 'musicxml', 'pdf')
+SEPARATION_MODES = ('stub', 'demucs')
+
+# 검출한 온셋이 정답 타격과 이 시간 안이면 맞은 것으로 봄
+ONSET_TOLERANCE_SEC = 0.05
+
+logger = logging.getLogger('benchmarks')
+
+
+class StageTimer:
+    """스테이지별 소요 시간(초)을 실행마다 기록합니다."""
+
+    def __init__(self):
+        self.runs = {}
+
+    def measure(self, stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.runs.setdefault(stage, []).append(time.perf_counter() - started)
+        return result
+
+
+class BenchResources:
+    """
+    측정 전에 한 번만 준비하는 것들: TFLite 인터프리터, Demucs 분리 워커, MuseScore 렌더링 서비스.
+    준비할 수 없는 스테이지는 skipped에 이유를 남기고 건너뜁니다.
+    """
+
+    def __init__(self, separation='stub', skip=(), model_path=None):
+        self.separation_mode = separation
+        self.skipped = {stage: '--skip' for stage in skip}
+        if 'musicxml' in self.skipped:
+            self.skipped.setdefault('pdf', 'musicxml 스테이지를 건너뜀')
+        self.batch_size = Config.INFERENCE_BATCH_SIZE
+        self.interpreter = None
+        self.separation_service = None
+        self.render_service = None
+
+        if 'inference' not in self.skipped:
+            self._load_interpreter(model_path or Config.MODEL_PATH)
+        if separation == 'demucs':
+            self.separation_service = SeparationService(
+                Config.BASE_DIR, logger, size=1,
+                model_name=Config.DEMUCS_MODEL, device=Config.DEMUCS_DEVICE,
+                chunk_sec=Config.SEPARATION_CHUNK_SEC, overlap_sec=Config.SEPARATION_OVERLAP_SEC,
+                max_memory_mb=Config.SEPARATION_MAX_MEMORY_MB,
+            )
+            self.separation_service.start()
+        if 'pdf' not in self.skipped:
+            musescore_path = resolve_musescore_path(Config.MUSESCORE_PATH)
+            if musescore_path is None:
+                self.skipped['pdf'] = f"MuseScore 없음 ({Config.MUSESCORE_PATH})"
+            else:
+                self.render_service = RenderService(
+                    musescore_path, logger, size=1, batch_max=1, batch_wait=0, timeout=Config.RENDER_TIMEOUT_SEC
+                ).start()
+
+    def _load_interpreter(self, model_path):
+        if not os.path.exists(model_path):
+            self.skipped['inference'] = f"모델 파일 없음 ({model_path})"
+            return
+        from app.services.inference import load_tflite_model, prepare_batch_input, resolve_num_threads
+
+        self.interpreter = load_tflite_model(
+            model_path, num_threads=resolve_num_threads(Config.TFLITE_NUM_THREADS), delegate=Config.TFLITE_DELEGATE,
+            backend=Config.INFERENCE_BACKEND,
+        )
+        self.batch_size = prepare_batch_input(self.interpreter, Config.INFERENCE_BATCH_SIZE)
+
+    def shutdown(self):
+        if self.separation_service is not None:
+            self.separation_service.shutdown()
+        if self.render_service is not None:
+            self.render_service.shutdown()
+
+
+def _separate(resources, source, work_dir):
+    stem_path = os.path.join(work_dir, DRUM_STEM_NAME)
+    if resources.separation_service is None:
+        # 스텁: 합성 트랙은 드럼만 있으므로 디코딩한 원본을 그대로 드럼 스템으로 씀 (스템 쓰기 비용만 측정)
+        shutil.copyfile(source.path, stem_path)
+    else:
+        task = resources.separation_service.submit(os.path.basename(work_dir), source.path, stem_path)
+        if not task.wait(Config.SEPARATION_TIMEOUT_SEC):
+            resources.separation_service.cancel(task)
+            raise TimeoutError("Demucs 분리 시간 초과")
+        if task.error:
+            raise RuntimeError(f"Demucs 분리 실패: {task.error}")
+    return AudioHandle.open(stem_path, sr=SR, ffmpeg_path=Config.FFMPEG_PATH)
+
+
+def _estimate_bpm(source):
+    tempo, _ = librosa.beat.beat_track(y=source.mono(), sr=source.sr)
+    return float(np.atleast_1d(tempo)[0])
+
+
+def _extract_features(drum, onsets, batch_size):
+    engine = MelFeatureEngine(drum.mono(), drum.sr)
+    num_batches = -(-len(onsets) // batch_size)
+    batches = np.zeros((num_batches, batch_size, *TARGET_SHAPE, 1), dtype=np.float32)
+    for i in range(num_batches):
+        engine.fill(onsets[i * batch_size:(i + 1) * batch_size], batches[i])
+    return batches
+
+
+def _classify(interpreter, batches, onsets):
+    from app.services.inference import run_inference_batch
+
+    probas = np.concatenate([run_inference_batch(interpreter, batch) for batch in batches])[:len(onsets)]
+    return [(float(t), LABELS[int(p.argmax())], float(p.max())) for t, p in zip(onsets, probas)]
+
+
+def _truth_events(onsets, truth):
+    # 추론을 건너뛰면 온셋마다 가장 가까운 정답 타격의 라벨을 씀 (악보 스테이지 입력 크기를 실제와 비슷하게)
+    truth_times = np.array([t for t, _ in truth])
+    nearest = np.clip(np.searchsorted(truth_times, onsets), 0, len(truth) - 1)
+    return [(float(t), truth[i][1], 1.0) for t, i in zip(onsets, nearest.tolist())]
+
+
+def _nearest_distance(times, reference):
+    index = np.searchsorted(reference, times)
+    left = reference[np.clip(index - 1, 0, len(reference) - 1)]
+    right = reference[np.clip(index, 0, len(reference) - 1)]
+    return np.minimum(np.abs(times - left), np.abs(times - right))
+
+
+def onset_scores(onsets, truth, tolerance=ONSET_TOLERANCE_SEC):
+    """정답 타격 시각(동시 타격은 하나로 합침) 대비 온셋 검출의 재현율/정밀도."""
+    truth_times = np.array(sorted(t for t, _ in truth))
+    onsets = np.sort(np.asarray(onsets, dtype=np.float64))
+    if not len(truth_times) or not len(onsets):
+        return {'onsetRecall': 0.0, 'onsetPrecision': 0.0}
+    truth_times = truth_times[np.concatenate([[True], np.diff(truth_times) > tolerance / 2])]
+    return {
+        'onsetRecall': round(float(np.mean(_nearest_distance(truth_times, onsets) <= tolerance)), 4),
+        'onsetPrecision': round(float(np.mean(_nearest_distance(onsets, truth_times) <= tolerance)), 4),
+    }
+
+
+def run_once(track_path, truth, work_dir, resources, timer, bpm_hint=120.0):
+    """작업 폴더 하나에서 전체 스테이지를 한 번 실행합니다. 품질 지표(dict)를 반환합니다."""
+    os.makedirs(work_dir, exist_ok=True)
+    skipped = resources.skipped
+
+    source = timer.measure('decode', AudioHandle.decode, track_path, os.path.join(work_dir, 'source.wav'),
+                           sr=SR, ffmpeg_path=Config.FFMPEG_PATH,
+                           mono_in_memory_max_sec=Config.AUDIO_MONO_IN_MEMORY_MAX_SEC)
+    drum = timer.measure('separation', _separate, resources, source, work_dir)
+
+    bpm = bpm_hint
+    if 'bpm' not in skipped:
+        bpm = timer.measure('bpm', _estimate_bpm, source)
+    source.release(delete=True)
+
+    detector = OnsetDetector(drum.sr)
+    onsets = timer.measure('onsets', detector.detect, drum.read_mono, drum.num_frames)
+    batches = timer.measure('features', _extract_features, drum, onsets, resources.batch_size)
+
+    if resources.interpreter is not None:
+        events = timer.measure('inference', _classify, resources.interpreter, batches, onsets)
+    else:
+        events = _truth_events(onsets, truth)
+    del batches
+    drum.release()
+
+    if 'midi' not in skipped:
+        timer.measure('midi', write_drum_midi, os.path.join(work_dir, 'bench.mid'), events, bpm, NOTE_MAP)
+    xml_path = os.path.join(work_dir, 'bench.xml')
+    if 'musicxml' not in skipped:
+        timer.measure('musicxml', write_drum_musicxml, xml_path, events, bpm, NOTE_MAP)
+    if resources.render_service is not None:
+        timer.measure('pdf', resources.render_service.render, None, xml_path, os.path.join(work_dir, 'bench.pdf'))
+
+    quality = onset_scores(onsets, truth)
+    quality.update({'bpm': round(bpm, 2), 'onsets': len(onsets), 'events': len(events)})
+    return quality
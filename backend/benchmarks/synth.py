@@ -0,0 +1,105 @@
+# backend/benchmarks/synth.py
+"""
+합성 드럼 트랙 생성기.
+
+킥/스네어/하이햇 소리를 numpy로 만들어 16분음표 격자에 배치합니다.
+길이, 템포, 타격 밀도(density, 0~1)를 정할 수 있고, 정답 이벤트 [(시간, 라벨), ...]를 함께 반환합니다.
+같은 seed면 항상 같은 트랙이 나오므로 벤치마크 실행끼리 비교할 수 있습니다.
+"""
+
+import os
+import subprocess
+import wave
+
+import numpy as np
+
+SR = 44100
+LABELS = ("kick", "snare", "hi-hat")
+
+# 한 마디(16칸) 안의 위치별 타격 확률 (density=1 기준). 정박/백비트는 거의 항상, 나머지는 가끔
+_STEPS = np.arange(16)
+HIT_PROBABILITY = {
+    "kick": np.where(_STEPS % 8 == 0, 1.0, np.where(_STEPS % 2 == 0, 0.3, 0.08)),
+    "snare": np.where(_STEPS % 8 == 4, 1.0, np.where(_STEPS % 2 == 1, 0.1, 0.04)),
+    "hi-hat": np.where(_STEPS % 2 == 0, 1.0, 0.45),
+}
+
+
+def make_samples(sr=SR):
+    """라벨 -> 모노 float32 타격음."""
+    rng = np.random.default_rng(1234)
+
+    t = np.arange(int(0.35 * sr)) / sr
+    # 킥: 150Hz -> 50Hz로 내려가는 사인 + 빠른 감쇠
+    freq = 50 + 100 * np.exp(-t * 30)
+    kick = np.sin(2 * np.pi * np.cumsum(freq) / sr) * np.exp(-t * 9)
+
+    t = np.arange(int(0.2 * sr)) / sr
+    # 스네어: 180Hz 몸통 + 노이즈 와이어
+    snare = 0.5 * np.sin(2 * np.pi * 180 * t) * np.exp(-t * 25) + 0.6 * rng.standard_normal(len(t)) * np.exp(-t * 18)
+
+    t = np.arange(int(0.08 * sr)) / sr
+    # 하이햇: 차분으로 고역만 남긴 노이즈 + 아주 짧은 감쇠
+    noise = rng.standard_normal(len(t) + 1)
+    hihat = 0.4 * np.diff(noise) * np.exp(-t * 60)
+
+    return {
+        label: (sample / np.max(np.abs(sample))).astype(np.float32)
+        for label, sample in (("kick", kick), ("snare", snare), ("hi-hat", hihat))
+    }
+
+
+def generate_track(duration, bpm=120.0, density=0.5, seed=0, sr=SR, channels=2, humanize_ms=5.0):
+    """
+    duration초 길이의 합성 드럼 트랙을 만듭니다.
+    반환: ((프레임 수, channels) float32 샘플, 시간순 정답 이벤트 [(시간(초), 라벨), ...])
+    """
+    rng = np.random.default_rng(seed)
+    samples = make_samples(sr)
+    total = int(duration * sr)
+    mix = np.zeros(total + sr, dtype=np.float32)  # 끝에서 잘리는 꼬리를 위한 여유
+
+    step_sec = 60.0 / bpm / 4
+    num_steps = int(duration / step_sec)
+    events = []
+    for label in LABELS:
+        probability = np.minimum(HIT_PROBABILITY[label][np.arange(num_steps) % 16] * density * 2, 1.0)
+        steps = np.flatnonzero(rng.random(num_steps) < probability)
+        times = steps * step_sec + rng.normal(0.0, humanize_ms / 1000, len(steps))
+        times = np.clip(times, 0.0, duration - 0.01)
+        velocities = rng.uniform(0.6, 1.0, len(steps)).astype(np.float32)
+        sample = samples[label]
+        for t, velocity in zip(times, velocities):
+            start = int(t * sr)
+            mix[start:start + len(sample)] += velocity * sample
+            events.append((float(t), label))
+
+    mix = mix[:total]
+    peak = np.max(np.abs(mix)) if total else 0.0
+    if peak > 0:
+        mix *= 0.9 / peak
+    events.sort()
+    return np.repeat(mix[:, np.newaxis], channels, axis=1), events
+
+
+def write_track(path, samples, sr=SR, ffmpeg_path='ffmpeg'):
+    """
+    트랙을 path의 확장자 형식으로 저장합니다. (.wav는 16비트 PCM, 그 외는 ffmpeg로 인코딩)
+    업로드 파일처럼 디코딩 단계가 실제로 변환을 하도록 float32가 아닌 형식으로 씁니다.
+    """
+    wav_path = path if path.lower().endswith('.wav') else os.path.splitext(path)[0] + '.pcm16.wav'
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(wav_path, 'wb') as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+
+    if wav_path != path:
+        result = subprocess.run(
+            [ffmpeg_path, '-nostdin', '-v', 'error', '-y', '-i', wav_path, path], capture_output=True, text=True
+        )
+        os.remove(wav_path)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg 인코딩 실패: {result.stderr.strip()[:200]}")
+    return path
@@ -0,0 +1,104 @@
+# backend/check_startup.py
+"""
+워커 기동 시간과 무거운 import를 검사합니다. (배포 전 / CI에서 실행, 실패하면 종료 코드 1)
+
+검사마다 새 파이썬 프로세스를 띄워 측정하므로 이미 import된 모듈의 영향을 받지 않습니다.
+
+    status-worker : WORKER_ROLE=status로 create_app() 후 /api/result 한 번 응답
+                    -> HEAVY_MODULES를 하나도 import하지 않고 예산 안에 떠야 함
+    pipeline-import: app.routes, app.tasks, app.services.audio_processor import
+                    -> 무거운 모듈은 스테이지가 처음 실행될 때까지 import하지 않아야 함
+
+    python check_startup.py                 # 기본 예산(초)으로 검사
+    python check_startup.py --budget 1.0 --repeats 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# 처음 쓰는 스테이지 안에서만 import해야 하는 모듈 (import에만 수백 ms ~ 수 초)
+HEAVY_MODULES = ('tensorflow', 'tflite_runtime', 'onnxruntime', 'librosa', 'pretty_midi', 'music21', 'torch', 'demucs')
+
+DEFAULT_BUDGET_SEC = 2.0
+
+# 자식 프로세스에서 실행할 코드: 걸린 시간과 import된 무거운 모듈을 JSON 한 줄로 출력
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+'''
+
+CHECKS = {
+    'status-worker': '''
+from app import create_app
+app = create_app()
+response = app.test_client().get('/api/result/startup-check')
+assert response.status_code == 404, response.status_code
+''',
+    'pipeline-import': '''
+import app.routes, app.tasks, app.services.audio_processor
+''',
+}
+
+
+def run_probe(body, env):
+    """새 프로세스에서 body를 실행하고 (걸린 시간, import된 무거운 모듈 목록)을 반환합니다."""
+    code = _PROBE.format(body=body, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"검사 프로세스 실패:\n{result.stderr}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report['seconds'], report['heavy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="워커 기동 시간과 무거운 import를 검사합니다.")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SEC, help="검사별 허용 시간(초, 중앙값 기준)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--checks', nargs='*', choices=list(CHECKS), default=list(CHECKS))
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='startup-check-')
+    env = dict(
+        os.environ,
+        WORKER_ROLE='status',
+        METRICS_DIR=os.path.join(work_dir, 'metrics'),
+        JOB_STORE_PATH=os.path.join(work_dir, 'jobs.sqlite3'),
+    )
+
+    failures = []
+    print(f"{'check':<16} {'median(s)':>9} {'max(s)':>8}  무거운 import")
+    try:
+        for name in args.checks:
+            runs = [run_probe(CHECKS[name], env) for _ in range(max(1, args.repeats))]
+            seconds = [s for s, _ in runs]
+            heavy = sorted({m for _, modules in runs for m in modules})
+            median = statistics.median(seconds)
+            print(f"{name:<16} {median:>9.3f} {max(seconds):>8.3f}  {', '.join(heavy) or '-'}")
+            if heavy:
+                failures.append(f"{name}: 무거운 모듈을 import함 ({', '.join(heavy)})")
+            if median > args.budget:
+                failures.append(f"{name}: {median:.3f}초 > 예산 {args.budget:g}초")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n실패:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\n통과 (예산 {args.budget:g}초)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,140 @@
 # backend/config.py
+import json
 import os
 
+
+def _load_tuning(path):
+    """tune_inference.py가 기록한 권장 설정을 읽습니다. (없으면 빈 dict, 환경 변수가 우선)"""
+    try:
+        with open(path) as f:
+            return json.load(f).get('recommended', {})
+    except (OSError, ValueError):
+        return {}
+
+
 class Config:
     """Flask 애플리케이션의 기본 설정을 정의"""
     # 프로젝트의 기본 경로
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+    # [신규] 프로세스 역할: 'all' (업로드 처리 + 조회) 또는 'status' (결과/상태 조회 전용)
+    # 'status'는 모델/분리 워커/스케줄러를 띄우지 않아 TensorFlow·librosa를 import하지 않고 빠르게 뜸 (오토스케일링용)
+    WORKER_ROLES = ('all', 'status')
+    WORKER_ROLE = os.environ.get('WORKER_ROLE', 'all')
+
     # 파일 업로드 및 결과 저장을 위한 폴더 경로
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     RESULT_FOLDER = os.path.join(BASE_DIR, 'results')
 
+    # [수정] 사용할 모델 종류: 'float32' | 'dynamic' | 'float16' | 'int8'
+    # (modeling/scripts/convert_model_to_lite.py가 만든 양자화 모델 중 선택, 크기/속도/정확도는 변환 리포트 참고)
+    MODEL_VARIANTS = ('float32', 'dynamic', 'float16', 'int8')
+    MODEL_VARIANT = os.environ.get('MODEL_VARIANT', 'float32')
+
+    # [신규] 추론 런타임: 'tensorflow' | 'tflite_runtime' | 'onnxruntime' (app/services/inference.py 참고)
+    # onnxruntime은 modeling/scripts/export_onnx.py가 만든 .onnx 모델(float32, dynamic)을 사용
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'tensorflow')
+    ONNX_MODEL_VARIANTS = ('float32', 'dynamic')
+    _MODEL_EXT = 'onnx' if INFERENCE_BACKEND == 'onnxruntime' else 'tflite'
+
     # 모델 파일 경로:
-    MODEL_PATH = os.path.join(BASE_DIR, 'app', 'models', 'drum_cnn_final.tflite')
+    MODEL_PATH = os.path.join(
+        BASE_DIR, 'app', 'models',
+        f'drum_cnn_final.{_MODEL_EXT}' if MODEL_VARIANT == 'float32' else f'drum_cnn_final.{MODEL_VARIANT}.{_MODEL_EXT}',
+    )
+
+    # [신규] 이 호스트에서 tune_inference.py로 측정한 권장 설정 (있으면 아래 기본값 대신 사용)
+    TFLITE_TUNING_PATH = os.environ.get('TFLITE_TUNING_PATH', os.path.join(BASE_DIR, 'tflite_tuning.json'))
+    _TUNED = _load_tuning(TFLITE_TUNING_PATH)
+
+    # [신규] 온셋 분류 시 한 번의 invoke로 추론할 윈도우 개수
+    INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', _TUNED.get('INFERENCE_BATCH_SIZE', 64)))
+
+    # [신규] 워커 프로세스당 미리 만들어 둘 TFLite 인터프리터 개수 (동시 추론 상한)
+    INTERPRETER_POOL_SIZE = int(os.environ.get('INTERPRETER_POOL_SIZE', _TUNED.get('INTERPRETER_POOL_SIZE', 2)))
+
+    # [신규] 인터프리터 하나가 쓰는 연산 스레드 수 (0이면 CPU 코어 수 / INTERPRETER_POOL_SIZE)
+    TFLITE_NUM_THREADS = int(os.environ.get('TFLITE_NUM_THREADS', _TUNED.get('TFLITE_NUM_THREADS', 0)))
+    # [신규] 'xnnpack' (기본 CPU delegate 사용) 또는 'none' (내장 커널만 사용)
+    TFLITE_DELEGATE = os.environ.get('TFLITE_DELEGATE', _TUNED.get('TFLITE_DELEGATE', 'xnnpack'))
+
+    # [신규] 업로드 파일 디코딩/리샘플링에 사용할 ffmpeg 실행 파일
+    FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+    # [신규] 이 길이(초)보다 긴 트랙의 모노 신호는 메모리 대신 memmap 파일로 보관
+    AUDIO_MONO_IN_MEMORY_MAX_SEC = int(os.environ.get('AUDIO_MONO_IN_MEMORY_MAX_SEC', 600))
+
+    # [신규] 드럼 분리 방식: 'worker' (모델 상주 워커 프로세스) 또는 'subprocess' (작업마다 Demucs CLI 실행)
+    SEPARATION_BACKEND = os.environ.get('SEPARATION_BACKEND', 'worker')
+    SEPARATION_WORKERS = int(os.environ.get('SEPARATION_WORKERS', 1))
+    # 시간이 지나면 작업을 실패 처리하고 그 작업을 실행 중인 워커 프로세스를 종료 (다음 작업 때 다시 시작)
+    SEPARATION_TIMEOUT_SEC = int(os.environ.get('SEPARATION_TIMEOUT_SEC', 3600))
+    DEMUCS_MODEL = os.environ.get('DEMUCS_MODEL', 'htdemucs')
+    DEMUCS_DEVICE = os.environ.get('DEMUCS_DEVICE', '')  # 비워 두면 GPU가 있으면 cuda, 없으면 cpu
+    # [신규] 긴 녹음은 겹치는 청크로 나눠 분리 (메모리 상한을 넘지 않도록 청크 길이 자동 축소)
+    SEPARATION_CHUNK_SEC = float(os.environ.get('SEPARATION_CHUNK_SEC', 300))
+    SEPARATION_OVERLAP_SEC = float(os.environ.get('SEPARATION_OVERLAP_SEC', 2.0))
+    SEPARATION_MAX_MEMORY_MB = int(os.environ.get('SEPARATION_MAX_MEMORY_MB', 2048))
+
+    # [신규] 업로드 내용 해시 기반 결과물 캐시 (0이면 사용 안 함)
+    RESULT_CACHE_FOLDER = os.path.join(BASE_DIR, 'cache')
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 5 * 1024 ** 3))
+    # 같은 파일 처리 잠금: 잡은 프로세스가 이 간격의 1/4마다 갱신하므로, 이 시간(초) 동안 갱신되지 않았거나
+    # 잡은 프로세스가 (같은 호스트에서) 죽은 잠금은 비정상 종료로 남은 것으로 보고 다른 작업이 가져감
+    RESULT_CACHE_LOCK_STALE_SEC = int(os.environ.get('RESULT_CACHE_LOCK_STALE_SEC', 60))
+    # 처리 방식이 바뀌어 예전 캐시 결과를 쓰면 안 될 때 올리는 버전 (캐시 키에 포함)
+    PIPELINE_VERSION = '2'
+
+    # [신규] 스테이지별 작업 풀 크기 (작업마다 스레드를 만들지 않고 스테이지마다 동시 실행 수를 제한)
+    # 분리 풀은 SEPARATION_WORKERS(Demucs 워커 프로세스 수)와 맞추는 것이 좋음
+    SEPARATION_POOL_WORKERS = int(os.environ.get('SEPARATION_POOL_WORKERS', SEPARATION_WORKERS))
+    ANALYSIS_POOL_WORKERS = int(os.environ.get('ANALYSIS_POOL_WORKERS', INTERPRETER_POOL_SIZE))
+
+    # [신규] 작업 하나의 온셋 검출/분류를 나눠 실행할 분석 워커 프로세스 수 (0이면 작업 스레드에서 직렬 처리)
+    ANALYSIS_PARALLEL_WORKERS = int(os.environ.get('ANALYSIS_PARALLEL_WORKERS', 0))
+
+    # [신규] 작업 상태 저장소: 'sqlite' (여러 워커 프로세스가 공유, 재시작해도 유지) 또는 'memory'
+    JOB_STORE_BACKEND = os.environ.get('JOB_STORE_BACKEND', 'sqlite')
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join(BASE_DIR, 'jobs.sqlite3'))
+    JOB_TTL_SEC = int(os.environ.get('JOB_TTL_SEC', 7 * 24 * 3600))  # 이 시간 동안 갱신이 없으면 삭제
+    JOB_PROGRESS_FLUSH_SEC = float(os.environ.get('JOB_PROGRESS_FLUSH_SEC', 0.5))  # 진행 메시지 기록 주기
+
+    # [신규] 작업 하나의 진행 상황을 기록하는 최대 빈도 (초당 횟수). 그 사이의 갱신은 합쳐서 기록
+    PROGRESS_MAX_RATE_HZ = float(os.environ.get('PROGRESS_MAX_RATE_HZ', 2.0))
+
+    # [신규] MuseScore 렌더링 서비스
+    MUSESCORE_PATH = os.environ.get(
+        'MUSESCORE_PATH',
+        r'C:/Program Files/MuseScore 3/bin/MuseScore3.exe' if os.name == 'nt' else 'mscore3',
+    )
+    # PDF는 작업 완료 후 처음 요청될 때 렌더링 (/download/pdf/<job_id>)
+    RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 1))  # 동시에 실행하는 MuseScore 프로세스 수
+    RENDER_BATCH_MAX = int(os.environ.get('RENDER_BATCH_MAX', 8))  # MuseScore 한 번 실행에 묶는 최대 악보 수
+    RENDER_BATCH_WAIT_SEC = float(os.environ.get('RENDER_BATCH_WAIT_SEC', 0.2))  # 배치를 모으려고 기다리는 시간
+    RENDER_TIMEOUT_SEC = float(os.environ.get('RENDER_TIMEOUT_SEC', 60))  # 요청당 제한 시간 (대기열 대기 포함)
+
+    # [신규] 이어 올리기(청크) 업로드: 이 시간(초) 동안 이어지지 않은 미완료 업로드는 삭제
+    UPLOAD_PARTIAL_TTL_SEC = int(os.environ.get('UPLOAD_PARTIAL_TTL_SEC', 24 * 3600))
+
+    # [신규] 작업별 프로파일링: 업로드 시 profile=1 이거나, 이 비율(0~1)로 뽑힌 작업의 스택을 샘플링
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 10))  # 스택 샘플링 주기
+
+    # [신규] /metrics 지표: 프로세스마다 이 폴더에 <pid>.json을 기록하고, 요청을 받은 프로세스가 합쳐서 응답
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(BASE_DIR, 'metrics'))
+    METRICS_FLUSH_INTERVAL_SEC = float(os.environ.get('METRICS_FLUSH_INTERVAL_SEC', 5.0))
 
     # 폴더가 없으면 자동으로 생성
     @staticmethod
     def init_app(app):
+        if Config.MODEL_VARIANT not in Config.MODEL_VARIANTS:
+            raise ValueError(f"MODEL_VARIANT는 {Config.MODEL_VARIANTS} 중 하나여야 합니다: {Config.MODEL_VARIANT}")
+        if Config.INFERENCE_BACKEND == 'onnxruntime' and Config.MODEL_VARIANT not in Config.ONNX_MODEL_VARIANTS:
+            raise ValueError(f"onnxruntime 백엔드의 MODEL_VARIANT는 {Config.ONNX_MODEL_VARIANTS} 중 하나여야 합니다: "
+                             f"{Config.MODEL_VARIANT}")
+        if Config.SEPARATION_OVERLAP_SEC < 0:
+            raise ValueError(f"SEPARATION_OVERLAP_SEC는 0 이상이어야 합니다: {Config.SEPARATION_OVERLAP_SEC}")
+        if Config.WORKER_ROLE not in Config.WORKER_ROLES:
+            raise ValueError(f"WORKER_ROLE은 {Config.WORKER_ROLES} 중 하나여야 합니다: {Config.WORKER_ROLE}")
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(Config.RESULT_FOLDER, exist_ok=True)
         # [수정] 모델 폴더 생성 경로도 'app'을 포함하도록 변경
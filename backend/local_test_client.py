@@ -1,6 +1,5 @@
 # backend/local_test_client.py
 import requests
-import time
 import os
 import sys
 
@@ -29,27 +28,35 @@ else:
             print("서버 응답:", result)
         else:
             print(f"파일 업로드 성공! 작업 ID: {job_id}")
-            print("서버 상태를 1초마다 확인합니다...")
+            print("서버 상태가 바뀔 때마다 받아 옵니다 (long-poll)...")
 
             # 3. [수정] 절차(메시지)가 변경될 때만 출력
             result_url = f"http://127.0.0.1:5000/api/result/{job_id}"
             
             # [추가] 마지막으로 출력된 메시지를 저장할 변수
             last_message = ""
-            
+            # [신규] 마지막으로 받은 상태 버전 (서버는 이보다 새 상태가 생길 때까지 기다렸다가 응답)
+            version = 0
+
             while True:
-                result_response = requests.get(result_url)
+                result_response = requests.get(result_url, params={'since': version, 'timeout': 25}, timeout=60)
                 status_result = result_response.json()
+                version = status_result.get('version', version)
                 
                 status = status_result.get('status')
                 message = status_result.get('message', '')
 
-                # [수정] 메시지가 마지막 메시지와 다를 경우에만 새로 출력
-                if message != last_message:
-                    # 'Separating:' 또는 'MIDI 노트 변환 중:' 같은 진행도 바 메시지는 건너뜀
-                    if not message.startswith("Separating:") and not message.startswith("MIDI 노트 변환 중"):
-                        print(f"  -> {message}")  # \r (덮어쓰기) 대신 \n (새 줄)로 출력
-                        last_message = message    # 마지막 메시지 업데이트
+                # [수정] 진행률 문자열을 거르지 않고, 서버가 보내는 숫자 진행 정보(progress)로 출력
+                # 단계(stage)가 바뀌었거나 진행 정보가 없는 메시지가 바뀌었을 때만 새 줄로 출력
+                progress = status_result.get('progress') or {}
+                line_key = progress.get('stage') or message
+                if line_key != last_message and status not in ('completed', 'error'):
+                    print(f"  -> {message}")
+                    last_message = line_key
+                elif progress:
+                    eta = progress.get('eta')
+                    eta_text = f", 남은 시간 약 {eta:.0f}초" if eta is not None else ""
+                    print(f"     전체 {progress['overall'] * 100:.0f}% ({message}{eta_text})")
 
                 if status == 'completed':
                     print("\n🎉 작업 완료! 최종 결과:")
@@ -62,8 +69,6 @@ else:
                     print("\n❌ 작업 중 오류가 발생했습니다.")
                     break
 
-                time.sleep(1)  # 1초 대기 (서버 상태 확인 주기)
-
     except requests.exceptions.RequestException as e:
         print(f"\n서버 요청 중 오류가 발생했습니다: {e}")
         print("백엔드 서버(run.py)가 실행 중인지 확인해주세요.")
@@ -1,11 +1,19 @@
 import tensorflow as tf
+import argparse
+import json
 import os
 import sys
+import time
+
+import numpy as np
 
 # 프로젝트 루트 경로 설정 (train.py 로직 참고)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..', '..'))
 
+# src 폴더를 파이썬 경로에 추가 (대표 데이터셋/평가 데이터 로드용)
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+
 # 원본 모델 경로 (train.py에서 저장한 경로)
 ORIGINAL_MODEL_DIR = os.path.join(PROJECT_ROOT, "backend", "modeling", "outputs", "models")
 ORIGINAL_MODEL_NAME = "drum_cnn_final.keras"
@@ -16,37 +24,168 @@ EXPORT_MODEL_DIR = os.path.join(PROJECT_ROOT, "backend", "app", "models")
 EXPORT_MODEL_NAME = "drum_cnn_final.tflite"
 EXPORT_MODEL_PATH = os.path.join(EXPORT_MODEL_DIR, EXPORT_MODEL_NAME)
 
+# [신규] 양자화 대표 데이터셋 / 정확도 평가에 사용할 데이터와 리포트 저장 경로
+DATA_PATH = os.path.join(PROJECT_ROOT, "backend", "modeling", "data", "raw")
+REPORT_PATH = os.path.join(PROJECT_ROOT, "backend", "modeling", "outputs", "reports", "quantization_report.json")
+
+# 모델 입력 형태 (배치 차원 제외)
+INPUT_SHAPE = (128, 128, 1)
+
+# [신규] 변환할 모델 종류 -> 파일 이름 (서버는 config.py의 MODEL_VARIANT로 이 중 하나를 로드)
+#   float32 : 양자화 없음 (기존 모델)
+#   dynamic : 가중치만 int8 (dynamic-range 양자화)
+#   float16 : 가중치를 float16으로 저장
+#   int8    : 대표 데이터셋으로 활성값까지 보정한 full-integer 양자화 (입출력은 float32 유지)
+VARIANTS = ("float32", "dynamic", "float16", "int8")
+
+
+def variant_file_name(variant):
+    return EXPORT_MODEL_NAME if variant == "float32" else f"drum_cnn_final.{variant}.tflite"
+
+
+def convert_to_tflite(model, variant="float32", representative_data=None):
+    """Keras 모델을 variant 방식으로 TFLite로 변환하여 모델 바이트를 반환합니다."""
+    # [수정] 배치 차원을 None(동적)으로 둔 concrete function에서 변환하여
+    # 서버에서 resize_tensor_input으로 (N, 128, 128, 1) 배치 추론이 가능하도록 함
+    run_model = tf.function(lambda x: model(x, training=False))
+    concrete_func = run_model.get_concrete_function(
+        tf.TensorSpec([None, *INPUT_SHAPE], model.inputs[0].dtype)
+    )
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete_func], model)
+
+    # [수정] 주석 처리되어 있던 최적화 옵션을 모델 종류별로 적용
+    if variant != "float32":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        if representative_data is None:
+            raise ValueError("int8 변환에는 대표 데이터셋이 필요합니다.")
+
+        def representative_dataset():
+            for sample in representative_data:
+                yield [sample[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # 서버의 입력 준비 코드(float32 배치)를 그대로 쓰도록 입출력 타입은 바꾸지 않음
+
+    return converter.convert()
 
-def convert_to_tflite():
-    """원본 Keras 모델을 TFLite로 변환하여 app/models/ 에 저장합니다."""
+
+def predict_tflite(model_content, X, batch_size):
+    """TFLite 모델로 X 전체를 배치 단위로 추론하여 (N, 클래스 수) 확률을 반환합니다."""
+    interpreter = tf.lite.Interpreter(model_content=model_content)
+    input_index = interpreter.get_input_details()[0]['index']
+    interpreter.resize_tensor_input(input_index, [batch_size, *INPUT_SHAPE])
+    interpreter.allocate_tensors()
+    output_index = interpreter.get_output_details()[0]['index']
+
+    batch = np.zeros((batch_size, *INPUT_SHAPE), dtype=np.float32)
+    outputs = []
+    for start in range(0, len(X), batch_size):
+        chunk = X[start:start + batch_size]
+        batch[:len(chunk)] = chunk
+        batch[len(chunk):] = 0.0
+        interpreter.set_tensor(input_index, batch)
+        interpreter.invoke()
+        outputs.append(interpreter.get_tensor(output_index)[:len(chunk)].copy())
+    return np.concatenate(outputs)
+
+
+def measure_latency(model_content, batch_size, runs=20, warmup=3):
+    """배치 하나를 추론하는 CPU 지연 시간(ms)의 중앙값과 p90을 반환합니다."""
+    interpreter = tf.lite.Interpreter(model_content=model_content)
+    input_index = interpreter.get_input_details()[0]['index']
+    interpreter.resize_tensor_input(input_index, [batch_size, *INPUT_SHAPE])
+    interpreter.allocate_tensors()
+    batch = np.random.default_rng(0).standard_normal((batch_size, *INPUT_SHAPE)).astype(np.float32)
+
+    timings = []
+    for i in range(warmup + runs):
+        interpreter.set_tensor(input_index, batch)
+        started = time.perf_counter()
+        interpreter.invoke()
+        if i >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 90))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keras 드럼 분류 모델을 TFLite(양자화 포함)로 변환합니다.")
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--batch-size', type=int, default=64, help="지연 시간 측정/평가 배치 크기 (서버 INFERENCE_BATCH_SIZE)")
+    parser.add_argument('--runs', type=int, default=20, help="지연 시간 측정 반복 횟수")
+    parser.add_argument('--calibration-samples', type=int, default=200, help="int8 보정에 쓸 대표 샘플 수")
+    parser.add_argument('--skip-eval', action='store_true', help="data/raw 정확도 평가를 건너뜀")
+    args = parser.parse_args()
 
     if not os.path.exists(ORIGINAL_MODEL_PATH):
         print(f"오류: 원본 모델 파일을 찾을 수 없습니다. 경로를 확인하세요:")
         print(f"{ORIGINAL_MODEL_PATH}")
         sys.exit(1)
 
+    # 데이터를 먼저 읽음: 특징 추출 워커를 모델 로드(TensorFlow 스레드 시작) 전에 띄우기 위함
+    X, y = None, None
+    if "int8" in args.variants or not args.skip_eval:
+        from src.data_utils import load_processed_data
+
+        print(f"({DATA_PATH}) 데이터 로딩 중...")
+        X, y = load_processed_data(DATA_PATH)
+        X = X.astype(np.float32)
+
     print(f"원본 모델 로딩 중: {ORIGINAL_MODEL_PATH}")
     model = tf.keras.models.load_model(ORIGINAL_MODEL_PATH)
 
-    print("모델 변환 시작 (TensorFlow Lite)...")
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    representative_data = None
+    if "int8" in args.variants:
+        rng = np.random.default_rng(42)
+        picks = rng.choice(len(X), size=min(args.calibration_samples, len(X)), replace=False)
+        representative_data = X[picks]
 
-    # (선택) 최적화 옵션 (기본 양자화 적용)
-    # converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    # 정확도 비교 기준: 양자화하지 않은 Keras 모델의 예측
+    reference = None
+    if not args.skip_eval:
+        reference = np.argmax(model.predict(X, batch_size=args.batch_size, verbose=0), axis=1)
 
-    tflite_model = converter.convert()
-    print("모델 변환 완료.")
-
-    # 최종 저장 경로 생성
     os.makedirs(EXPORT_MODEL_DIR, exist_ok=True)
+    report = []
+    for variant in args.variants:
+        print(f"\n모델 변환 시작 (TensorFlow Lite, {variant})...")
+        model_content = convert_to_tflite(model, variant, representative_data)
+        export_path = os.path.join(EXPORT_MODEL_DIR, variant_file_name(variant))
+        with open(export_path, 'wb') as f:
+            f.write(model_content)
+
+        latency_p50, latency_p90 = measure_latency(model_content, args.batch_size, args.runs)
+        entry = {
+            'variant': variant,
+            'path': export_path,
+            'size_mb': round(len(model_content) / (1024 * 1024), 3),
+            'batch_size': args.batch_size,
+            'latency_ms_p50': round(latency_p50, 2),
+            'latency_ms_p90': round(latency_p90, 2),
+        }
+        if reference is not None:
+            predicted = np.argmax(predict_tflite(model_content, X, args.batch_size), axis=1)
+            entry['accuracy'] = round(float(np.mean(predicted == y)), 4)
+            entry['agreement_with_float'] = round(float(np.mean(predicted == reference)), 4)
+        report.append(entry)
+        print(f"저장: {export_path} ({entry['size_mb']:.2f} MB, 배치 {args.batch_size} 추론 {latency_p50:.1f}ms)")
 
-    with open(EXPORT_MODEL_PATH, 'wb') as f:
-        f.write(tflite_model)
+    # --- 요약 리포트 ---
+    print(f"\n{'variant':<8} {'size(MB)':>9} {'p50(ms)':>8} {'p90(ms)':>8} {'accuracy':>9} {'agree':>7}")
+    for entry in report:
+        print(f"{entry['variant']:<8} {entry['size_mb']:>9.2f} {entry['latency_ms_p50']:>8.1f} "
+              f"{entry['latency_ms_p90']:>8.1f} {entry.get('accuracy', float('nan')):>9.4f} "
+              f"{entry.get('agreement_with_float', float('nan')):>7.4f}")
 
-    print(f"\n성공! 경량화된 모델이 아래 경로에 저장되었습니다:")
-    print(f"{EXPORT_MODEL_PATH}")
-    print(f"파일 크기: {os.path.getsize(EXPORT_MODEL_PATH) / (1024 * 1024):.2f} MB")
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n리포트가 저장되었습니다: {REPORT_PATH}")
+    print("서버에서 사용할 모델은 MODEL_VARIANT 환경 변수로 선택합니다. (기본 float32)")
 
 
 if __name__ == "__main__":
-    convert_to_tflite()
\ No newline at end of file
+    main()
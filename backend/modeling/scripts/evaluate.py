@@ -18,30 +18,36 @@ DATA_PATH = "../data/raw"  # 평가에는 raw 데이터 경로를 사용해 재
 REPORT_OUTPUT_PATH = "../outputs/reports/"
 LABELS = ["kick", "snare", "hi-hat"]
 
-# --- 1. 모델과 테스트 데이터 로드 ---
-print("모델과 데이터를 로드합니다...")
-model = load_model(MODEL_PATH)
-X_test, y_test = load_processed_data(DATA_PATH) # 전체 데이터를 테스트용으로 사용
-
-# --- 2. 모델 예측 수행 ---
-print("모델 예측을 수행합니다...")
-y_pred_proba = model.predict(X_test)
-y_pred = np.argmax(y_pred_proba, axis=1)
-
-# --- 3. 분류 리포트 생성 ---
-print("--- 분류 리포트 ---")
-report = classification_report(y_test, y_pred, target_names=LABELS)
-print(report)
-with open(os.path.join(REPORT_OUTPUT_PATH, "classification_report.txt"), "w") as f:
-    f.write(report)
-
-# --- 4. 혼동 행렬(Confusion Matrix) 시각화 ---
-print("혼동 행렬을 생성합니다...")
-cm = confusion_matrix(y_test, y_pred)
-plt.figure(figsize=(8, 6))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=LABELS, yticklabels=LABELS)
-plt.xlabel('Predicted Label')
-plt.ylabel('True Label')
-plt.title('Confusion Matrix')
-plt.savefig(os.path.join(REPORT_OUTPUT_PATH, "confusion_matrix.png"))
-print(f"평가 결과가 '{REPORT_OUTPUT_PATH}' 폴더에 저장되었습니다.")
\ No newline at end of file
+def main():
+    # --- 1. 모델과 테스트 데이터 로드 ---
+    print("모델과 데이터를 로드합니다...")
+    # 데이터를 먼저 읽음: 특징 추출 워커를 모델 로드(TensorFlow 스레드 시작) 전에 띄우기 위함
+    X_test, y_test = load_processed_data(DATA_PATH) # 전체 데이터를 테스트용으로 사용
+    model = load_model(MODEL_PATH)
+
+    # --- 2. 모델 예측 수행 ---
+    print("모델 예측을 수행합니다...")
+    y_pred_proba = model.predict(X_test)
+    y_pred = np.argmax(y_pred_proba, axis=1)
+
+    # --- 3. 분류 리포트 생성 ---
+    print("--- 분류 리포트 ---")
+    report = classification_report(y_test, y_pred, target_names=LABELS)
+    print(report)
+    with open(os.path.join(REPORT_OUTPUT_PATH, "classification_report.txt"), "w") as f:
+        f.write(report)
+
+    # --- 4. 혼동 행렬(Confusion Matrix) 시각화 ---
+    print("혼동 행렬을 생성합니다...")
+    cm = confusion_matrix(y_test, y_pred)
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=LABELS, yticklabels=LABELS)
+    plt.xlabel('Predicted Label')
+    plt.ylabel('True Label')
+    plt.title('Confusion Matrix')
+    plt.savefig(os.path.join(REPORT_OUTPUT_PATH, "confusion_matrix.png"))
+    print(f"평가 결과가 '{REPORT_OUTPUT_PATH}' 폴더에 저장되었습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# modeling/scripts/export_onnx.py
+"""
+Keras 드럼 분류 모델을 ONNX로 내보냅니다. (서버에서 INFERENCE_BACKEND=onnxruntime으로 사용)
+
+convert_model_to_lite.py와 같은 원본 모델을 읽어 app/models/에 저장합니다.
+    float32 : drum_cnn_final.onnx          (그대로 변환)
+    dynamic : drum_cnn_final.dynamic.onnx  (ONNX Runtime dynamic 양자화, 가중치만 int8)
+
+배치 차원은 동적으로 두어 서버가 INFERENCE_BACKEND와 관계없이 같은 (N, 128, 128, 1) 배치로 추론합니다.
+변환 후 Keras 예측과의 최대 오차/일치율과 배치 지연 시간을 onnx_export_report.json에 남깁니다.
+
+    python modeling/scripts/export_onnx.py
+    python modeling/scripts/export_onnx.py --variants float32 --skip-eval
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from convert_model_to_lite import DATA_PATH, EXPORT_MODEL_DIR, INPUT_SHAPE, ORIGINAL_MODEL_PATH, PROJECT_ROOT
+
+REPORT_PATH = os.path.join(PROJECT_ROOT, "backend", "modeling", "outputs", "reports", "onnx_export_report.json")
+
+# 서버 config.py의 ONNX_MODEL_VARIANTS와 같은 목록
+VARIANTS = ("float32", "dynamic")
+DEFAULT_OPSET = 13
+
+
+def variant_file_name(variant):
+    return "drum_cnn_final.onnx" if variant == "float32" else f"drum_cnn_final.{variant}.onnx"
+
+
+def export_float32(model, output_path, opset):
+    """Keras 모델을 배치 차원이 동적인 ONNX 그래프로 변환해 저장합니다."""
+    import tf2onnx
+
+    input_signature = (tf.TensorSpec([None, *INPUT_SHAPE], tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=opset, output_path=output_path)
+
+
+def export_dynamic(float32_path, output_path):
+    """float32 ONNX 모델의 가중치를 int8로 양자화합니다. (활성값은 실행 시 동적으로 양자화)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(float32_path, output_path, weight_type=QuantType.QInt8)
+
+
+def _session(model_path):
+    import onnxruntime as ort
+
+    return ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+
+
+def predict_onnx(model_path, X, batch_size):
+    """ONNX 모델로 X 전체를 배치 단위로 추론하여 (N, 클래스 수) 확률을 반환합니다."""
+    session = _session(model_path)
+    input_name = session.get_inputs()[0].name
+    outputs = []
+    for start in range(0, len(X), batch_size):
+        outputs.append(session.run(None, {input_name: X[start:start + batch_size]})[0])
+    return np.concatenate(outputs)
+
+
+def measure_latency(model_path, batch_size, runs=20, warmup=3):
+    """배치 하나를 추론하는 CPU 지연 시간(ms)의 중앙값과 p90을 반환합니다."""
+    session = _session(model_path)
+    input_name = session.get_inputs()[0].name
+    batch = np.random.default_rng(0).standard_normal((batch_size, *INPUT_SHAPE)).astype(np.float32)
+
+    timings = []
+    for i in range(warmup + runs):
+        started = time.perf_counter()
+        session.run(None, {input_name: batch})
+        if i >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 90))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keras 드럼 분류 모델을 ONNX로 내보냅니다.")
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--opset', type=int, default=DEFAULT_OPSET)
+    parser.add_argument('--batch-size', type=int, default=64, help="지연 시간 측정/평가 배치 크기 (서버 INFERENCE_BATCH_SIZE)")
+    parser.add_argument('--runs', type=int, default=20, help="지연 시간 측정 반복 횟수")
+    parser.add_argument('--parity-samples', type=int, default=256, help="Keras와 출력 비교에 쓸 무작위 입력 수")
+    parser.add_argument('--skip-eval', action='store_true', help="data/raw 정확도 평가를 건너뜀")
+    args = parser.parse_args()
+
+    if not os.path.exists(ORIGINAL_MODEL_PATH):
+        print(f"오류: 원본 모델 파일을 찾을 수 없습니다. 경로를 확인하세요:")
+        print(f"{ORIGINAL_MODEL_PATH}")
+        sys.exit(1)
+
+    # 데이터를 먼저 읽음: 특징 추출 워커를 모델 로드(TensorFlow 스레드 시작) 전에 띄우기 위함
+    X, y, reference = None, None, None
+    if not args.skip_eval:
+        from src.data_utils import load_processed_data
+
+        print(f"({DATA_PATH}) 데이터 로딩 중...")
+        X, y = load_processed_data(DATA_PATH)
+        X = X.astype(np.float32)
+
+    print(f"원본 모델 로딩 중: {ORIGINAL_MODEL_PATH}")
+    model = tf.keras.models.load_model(ORIGINAL_MODEL_PATH)
+
+    # 출력 비교용 입력: 무작위 윈도우 (+ 평가 데이터가 있으면 실제 윈도우)
+    parity_X = np.random.default_rng(0).standard_normal((args.parity_samples, *INPUT_SHAPE)).astype(np.float32)
+    parity_reference = model.predict(parity_X, batch_size=args.batch_size, verbose=0)
+    if X is not None:
+        reference = np.argmax(model.predict(X, batch_size=args.batch_size, verbose=0), axis=1)
+
+    os.makedirs(EXPORT_MODEL_DIR, exist_ok=True)
+    float32_path = os.path.join(EXPORT_MODEL_DIR, variant_file_name("float32"))
+    report = []
+    for variant in args.variants:
+        export_path = os.path.join(EXPORT_MODEL_DIR, variant_file_name(variant))
+        print(f"\n모델 변환 시작 (ONNX, {variant})...")
+        if variant == "float32":
+            export_float32(model, export_path, args.opset)
+        else:
+            if not os.path.exists(float32_path):
+                export_float32(model, float32_path, args.opset)
+            export_dynamic(float32_path, export_path)
+
+        predicted = predict_onnx(export_path, parity_X, args.batch_size)
+        latency_p50, latency_p90 = measure_latency(export_path, args.batch_size, args.runs)
+        entry = {
+            'variant': variant,
+            'path': export_path,
+            'opset': args.opset,
+            'size_mb': round(os.path.getsize(export_path) / (1024 * 1024), 3),
+            'batch_size': args.batch_size,
+            'latency_ms_p50': round(latency_p50, 2),
+            'latency_ms_p90': round(latency_p90, 2),
+            'max_abs_diff_vs_keras': float(np.abs(predicted - parity_reference).max()),
+            'argmax_agreement_vs_keras': round(float(np.mean(
+                predicted.argmax(axis=1) == parity_reference.argmax(axis=1))), 4),
+        }
+        if reference is not None:
+            labels = np.argmax(predict_onnx(export_path, X, args.batch_size), axis=1)
+            entry['accuracy'] = round(float(np.mean(labels == y)), 4)
+            entry['agreement_with_float'] = round(float(np.mean(labels == reference)), 4)
+        report.append(entry)
+        print(f"저장: {export_path} ({entry['size_mb']:.2f} MB, 배치 {args.batch_size} 추론 {latency_p50:.1f}ms, "
+              f"Keras 대비 최대 오차 {entry['max_abs_diff_vs_keras']:.2e})")
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n리포트가 저장되었습니다: {REPORT_PATH}")
+    print("서버에서는 INFERENCE_BACKEND=onnxruntime, MODEL_VARIANT(float32 | dynamic)로 선택합니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 # modeling/src/data_utils.py
+import hashlib
+import json
+import multiprocessing
 import librosa
 import numpy as np
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 # 멜 스펙트로그램 생성을 위한 설정값
 SR = 44100
@@ -9,52 +15,250 @@ N_MELS = 128  # 스펙트로그램의 세로 해상도 (주파수 축)
 N_FFT = 2048
 HOP_LENGTH = 512
 
+# [신규] 특징 캐시 (data/features/): 파일 내용 해시 -> 멜 스펙트로그램
+# 특징 계산 방식(자르기/패딩, dB 변환 등)을 바꾸면 FEATURE_VERSION을 올려 이전 캐시를 쓰지 않도록 함
+FEATURE_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "features")
+FEATURE_VERSION = 1
 
-def audio_to_melspectrogram(filepath, target_shape=(N_MELS, N_MELS)):
-    """오디오 파일을 불러와 고정된 크기의 멜 스펙트로그램으로 변환합니다."""
-    try:
-        y, sr = librosa.load(filepath, sr=SR)
+# [신규] 특징 추출 프로세스 수 (0이면 CPU 코어 수, 1이면 현재 프로세스에서 순서대로 계산)
+FEATURE_WORKERS = int(os.environ.get('FEATURE_WORKERS', 0))
+LABELS = {"kick": 0, "snare": 1, "hi-hat": 2}  # 클래스 추가
 
-        # 1초 미만의 짧은 오디오는 패딩 처리
-        if len(y) < SR:
-            y = np.pad(y, (0, SR - len(y)))
-        else:
-            y = y[:SR]
 
-        mel_spec = librosa.feature.melspectrogram(
-            y=y, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS
-        )
-        mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
+def compute_melspectrogram(filepath, target_shape=(N_MELS, N_MELS)):
+    """오디오 파일을 불러와 고정된 크기의 멜 스펙트로그램으로 변환합니다. (실패하면 예외)"""
+    y, sr = librosa.load(filepath, sr=SR)
+
+    # 1초 미만의 짧은 오디오는 패딩 처리
+    if len(y) < SR:
+        y = np.pad(y, (0, SR - len(y)))
+    else:
+        y = y[:SR]
+
+    mel_spec = librosa.feature.melspectrogram(
+        y=y, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS
+    )
+    mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
+
+    # 이미지 크기를 (128, 128) 등으로 고정
+    if mel_spec_db.shape[1] < target_shape[1]:
+        pad_width = target_shape[1] - mel_spec_db.shape[1]
+        mel_spec_db = np.pad(mel_spec_db, pad_width=((0, 0), (0, pad_width)), mode='constant')
+    else:
+        mel_spec_db = mel_spec_db[:, :target_shape[1]]
+
+    return mel_spec_db
 
-        # 이미지 크기를 (128, 128) 등으로 고정
-        if mel_spec_db.shape[1] < target_shape[1]:
-            pad_width = target_shape[1] - mel_spec_db.shape[1]
-            mel_spec_db = np.pad(mel_spec_db, pad_width=((0, 0), (0, pad_width)), mode='constant')
-        else:
-            mel_spec_db = mel_spec_db[:, :target_shape[1]]
 
-        return mel_spec_db
+def audio_to_melspectrogram(filepath, target_shape=(N_MELS, N_MELS)):
+    """오디오 파일을 불러와 고정된 크기의 멜 스펙트로그램으로 변환합니다."""
+    try:
+        return compute_melspectrogram(filepath, target_shape)
     except Exception as e:
         print(f"파일 처리 오류 {filepath}: {e}")
         return None
 
 
-def load_processed_data(data_dir):
-    """전처리된 스펙트로그램 데이터를 불러오는 함수."""
-    X, y = [], []
-    labels = {"kick": 0, "snare": 1, "hi-hat": 2}  # 클래스 추가
+def _extract_file(filepath, target_shape):
+    # 특징 추출 워커에서 실행: 예외 대신 (스펙트로그램, 오류 메시지)를 돌려줘 한 파일의 실패가 전체를 멈추지 않도록 함
+    try:
+        return compute_melspectrogram(filepath, target_shape), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+
+def _pool_context():
+    # Linux에서는 fork: 워커가 학습 스크립트(__main__)와 TensorFlow를 다시 import하지 않음
+    # (스크립트들은 모델을 로드하기 전에 데이터를 읽으므로 fork 시점에 TensorFlow 연산 스레드는 없음)
+    # macOS는 시스템 라이브러리 때문에 fork가 안전하지 않고 Windows에는 fork가 없으므로 spawn
+    # -> 호출하는 스크립트에 if __name__ == "__main__": 가드가 필요
+    return multiprocessing.get_context('fork' if sys.platform.startswith('linux') else 'spawn')
+
+
+class _Progress:
+    """특징 추출 진행 상황을 한 줄로 갱신해 출력합니다. (최대 0.5초마다)"""
+
+    def __init__(self, total, enabled=True):
+        self.total = total
+        self.done = 0
+        self.enabled = enabled and total > 0
+        self.started = time.perf_counter()
+        self._last = 0.0
 
-    for label, num in labels.items():
+    def update(self, count=1):
+        self.done += count
+        now = time.perf_counter()
+        if self.enabled and (now - self._last >= 0.5 or self.done == self.total):
+            self._last = now
+            elapsed = now - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            sys.stdout.write(f"\r특징 추출 {self.done}/{self.total} ({rate:.1f}개/초)")
+            sys.stdout.flush()
+            if self.done == self.total:
+                sys.stdout.write("\n")
+
+
+def file_sha256(filepath):
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FeatureCache:
+    """
+    멜 스펙트로그램 디스크 캐시.
+    mel-<파라미터 해시>.npy (모든 스펙트로그램, memmap으로 읽음) + mel-<파라미터 해시>.index.json (파일 내용 해시 -> 행)
+    SR/N_MELS/N_FFT/HOP_LENGTH/target_shape/FEATURE_VERSION이 파일 이름에 반영되므로 파라미터가 바뀌면 새 캐시를 만듭니다.
+    """
+
+    def __init__(self, cache_dir, target_shape=(N_MELS, N_MELS)):
+        self.target_shape = tuple(target_shape)
+        self.params = {
+            'version': FEATURE_VERSION, 'sr': SR, 'n_mels': N_MELS, 'n_fft': N_FFT,
+            'hop_length': HOP_LENGTH, 'target_shape': list(self.target_shape),
+        }
+        key = hashlib.sha256(json.dumps(self.params, sort_keys=True).encode()).hexdigest()[:12]
+        self.array_path = os.path.join(cache_dir, f"mel-{key}.npy")
+        self.index_path = os.path.join(cache_dir, f"mel-{key}.index.json")
+        self.rows = {}
+        self.array = None
+        self._pending = {}  # 아직 저장하지 않은 (해시 -> 스펙트로그램)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            array = np.load(self.array_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return
+        # 저장 도중 중단되어 index와 배열이 맞지 않으면 처음부터 다시 만듦
+        if index.get('params') != self.params or len(array) != index.get('count'):
+            return
+        self.rows = index['rows']
+        self.array = array
+
+    def get(self, digest):
+        row = self.rows.get(digest)
+        if row is not None:
+            # 복사해서 반환 (save()가 파일을 교체할 때 열린 memmap이 남지 않도록)
+            return np.array(self.array[row])
+        return self._pending.get(digest)
+
+    def put(self, digest, spec):
+        if digest not in self.rows:
+            self._pending[digest] = spec
+
+    def save(self):
+        """새로 계산한 스펙트로그램을 기존 행 뒤에 붙여 다시 씁니다. (임시 파일 + 교체)"""
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.array_path), exist_ok=True)
+        count = len(self.rows)
+        temp_path = self.array_path + '.tmp.npy'
+        out = np.lib.format.open_memmap(
+            temp_path, mode='w+', dtype=np.float32, shape=(count + len(self._pending), *self.target_shape)
+        )
+        if count:
+            out[:count] = self.array[:count]
+        for row, (digest, spec) in enumerate(self._pending.items(), start=count):
+            out[row] = spec
+            self.rows[digest] = row
+        out.flush()
+        del out
+        self.array = None  # Windows는 열려 있는 파일을 교체할 수 없음
+        os.replace(temp_path, self.array_path)
+
+        with open(self.index_path + '.tmp', 'w') as f:
+            json.dump({'params': self.params, 'count': len(self.rows), 'rows': self.rows}, f)
+        os.replace(self.index_path + '.tmp', self.index_path)
+        self.array = np.load(self.array_path, mmap_mode='r')
+        self._pending = {}
+
+
+def list_dataset_files(data_dir):
+    """data_dir/<클래스>/ 아래 파일 목록 [(경로, 클래스 번호), ...]."""
+    files = []
+    for label, num in LABELS.items():
         class_path = os.path.join(data_dir, label)
         for filename in os.listdir(class_path):
-            filepath = os.path.join(class_path, filename)
-            spec = audio_to_melspectrogram(filepath)
-            if spec is not None:
-                X.append(spec)
-                y.append(num)
+            files.append((os.path.join(class_path, filename), num))
+    return files
+
+
+def load_processed_data(data_dir, cache_dir=FEATURE_CACHE_DIR, target_shape=(N_MELS, N_MELS),
+                        workers=None, progress=True, return_failures=False):
+    """
+    전처리된 스펙트로그램 데이터를 불러오는 함수.
+    [수정] cache_dir의 특징 캐시에 있는 파일(내용 해시 기준)은 디코딩/STFT 없이 읽고, 새 파일이나 바뀐 파일만 계산합니다.
+    cache_dir=None이면 캐시를 쓰지 않습니다.
+    [수정] 계산할 파일은 workers개 프로세스(기본 FEATURE_WORKERS)에 나눠 추출하고, 결과는 미리 할당한 배열에 바로 씁니다.
+    읽지 못한 파일은 빼고 끝에 요약을 출력하며, return_failures=True면 [(경로, 오류), ...]도 함께 반환합니다.
+    """
+    files = list_dataset_files(data_dir)
+    cache = FeatureCache(cache_dir, target_shape) if cache_dir else None
+
+    # CNN 입력 형식 [샘플수, 높이, 너비, 1]로 미리 할당
+    X = np.empty((len(files), *target_shape, 1), dtype=np.float32)
+    y = np.array([num for _, num in files], dtype=np.int64)
+    ok = np.zeros(len(files), dtype=bool)
+
+    # 1) 캐시에 있는 파일은 바로 채움
+    pending = []  # (순번, 경로, 내용 해시)
+    for i, (filepath, _) in enumerate(files):
+        digest = file_sha256(filepath) if cache is not None else None
+        spec = cache.get(digest) if cache is not None else None
+        if spec is not None:
+            X[i, ..., 0] = spec
+            ok[i] = True
+        else:
+            pending.append((i, filepath, digest))
+    reused = int(ok.sum())
+
+    # 2) 나머지는 프로세스 풀에서 추출 (입력 순서대로 결과를 받아 같은 행에 씀)
+    if workers is None:
+        workers = FEATURE_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, len(pending)))
+    paths = [filepath for _, filepath, _ in pending]
+    tracker = _Progress(len(pending), enabled=progress)
+    failures = []
+    if workers == 1:
+        results = (_extract_file(filepath, target_shape) for filepath in paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        chunksize = max(1, len(paths) // (workers * 8))
+        results = executor.map(_extract_file, paths, [target_shape] * len(paths), chunksize=chunksize)
+    try:
+        for (i, filepath, digest), (spec, error) in zip(pending, results):
+            tracker.update()
+            if spec is None:
+                failures.append((filepath, error))
+                continue
+            X[i, ..., 0] = spec
+            ok[i] = True
+            if cache is not None:
+                cache.put(digest, spec)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    # CNN 입력 형식에 맞게 채널 차원 추가 (e.g., [샘플수, 높이, 너비, 1])
-    X = np.array(X)[..., np.newaxis]
-    y = np.array(y)
+    if cache is not None:
+        cache.save()
+        print(f"특징 캐시: {reused}개 재사용, {len(pending) - len(failures)}개 새로 계산 ({cache.array_path})")
+    if pending:
+        print(f"특징 추출: {len(pending)}개, 프로세스 {workers}개, {time.perf_counter() - tracker.started:.1f}초")
+    if failures:
+        print(f"읽지 못한 파일 {len(failures)}개 (데이터셋에서 제외):")
+        for filepath, error in failures[:20]:
+            print(f"  {filepath}: {error}")
+        if len(failures) > 20:
+            print(f"  ... 외 {len(failures) - 20}개")
 
-    return X, y
\ No newline at end of file
+    if not ok.all():
+        X, y = X[ok], y[ok]
+    if return_failures:
+        return X, y, failures
+    return X, y
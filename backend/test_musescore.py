@@ -7,8 +7,10 @@ import time
 print("--- MuseScore 연동 진단 테스트 시작 (수동 변환 방식) ---")
 
 # --- 1. 경로 설정 ---
-# [유지] MuseScore 3 경로를 사용합니다.
-musescore_path = r'C:/Program Files/MuseScore 3/bin/MuseScore3.exe' 
+# [수정] MuseScore 경로는 서버와 같은 설정(MUSESCORE_PATH 환경 변수)을 사용합니다.
+from config import Config
+from app.services.rendering import resolve_musescore_path
+musescore_path = resolve_musescore_path(Config.MUSESCORE_PATH) or Config.MUSESCORE_PATH
 
 print(f"테스트할 MuseScore 경로: {musescore_path}")
 
@@ -0,0 +1,145 @@
+# backend/tune_inference.py
+"""
+이 호스트에 맞는 TFLite 추론 설정을 측정합니다.
+
+INTERPRETER_POOL_SIZE개의 인터프리터가 동시에 추론하는 상황에서 스레드 수 x 배치 크기 조합별
+처리량(초당 윈도우 수)을 재고, 가장 빠른 조합(5% 이내면 스레드가 적은 쪽)을 권장 설정으로 기록합니다.
+config.py는 이 파일(TFLITE_TUNING_PATH)이 있으면 환경 변수가 없는 항목의 기본값으로 사용합니다.
+
+    python tune_inference.py                        # 기본 범위로 측정 후 tflite_tuning.json 저장
+    python tune_inference.py --threads 1 2 4 --batch-sizes 32 64 --seconds 3
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import Config
+from app.services.inference import (
+    INPUT_SHAPE, DELEGATES, INFERENCE_BACKENDS, load_tflite_model, prepare_batch_input, run_inference_batch,
+)
+
+# 처리량이 최고값의 이 비율 안이면 스레드를 덜 쓰는 조합을 고름 (다른 작업에 코어를 남김)
+TIE_TOLERANCE = 0.95
+
+
+def measure(model_path, model_content, num_threads, batch_size, interpreters, delegate, seconds, backend='tensorflow'):
+    """
+    interpreters개 스레드가 각자 인터프리터로 seconds초 동안 추론한 처리량(윈도우/초)과 배치 지연(ms).
+    batch_size는 실제로 측정한 배치 크기입니다. (배치 차원이 고정된 모델은 요청과 달리 1일 수 있음)
+    """
+    pool = []
+    for _ in range(interpreters):
+        interpreter = load_tflite_model(model_path, model_content=model_content,
+                                        num_threads=num_threads, delegate=delegate, backend=backend)
+        actual_batch = prepare_batch_input(interpreter, batch_size)
+        batch = np.random.default_rng(0).standard_normal((actual_batch, *INPUT_SHAPE)).astype(np.float32)
+        run_inference_batch(interpreter, batch)  # 워밍업
+        pool.append((interpreter, batch))
+
+    counts = [0] * interpreters
+    latencies = [[] for _ in range(interpreters)]
+    start_barrier = threading.Barrier(interpreters)
+
+    def run(i):
+        interpreter, batch = pool[i]
+        start_barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            run_inference_batch(interpreter, batch)
+            latencies[i].append((time.perf_counter() - started) * 1000)
+            counts[i] += len(batch)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(interpreters)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [ms for per_thread in latencies for ms in per_thread]
+    return {
+        'num_threads': num_threads,
+        'batch_size': actual_batch,
+        'requested_batch_size': batch_size,
+        'windows_per_sec': round(sum(counts) / elapsed, 1),
+        'batch_latency_ms_p50': round(float(np.median(all_latencies)), 2),
+        'batch_latency_ms_p90': round(float(np.percentile(all_latencies, 90)), 2),
+    }
+
+
+def recommend(results):
+    best = max(r['windows_per_sec'] for r in results)
+    candidates = [r for r in results if r['windows_per_sec'] >= best * TIE_TOLERANCE]
+    return min(candidates, key=lambda r: (r['num_threads'], r['batch_latency_ms_p50']))
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_threads = sorted({1, 2, 4, 8, cpu_count // max(1, Config.INTERPRETER_POOL_SIZE) or 1} & set(range(1, cpu_count + 1)))
+
+    parser = argparse.ArgumentParser(description="TFLite 스레드 수 / 배치 크기 튜닝")
+    parser.add_argument('--model', default=Config.MODEL_PATH)
+    parser.add_argument('--threads', type=int, nargs='+', default=default_threads)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[16, 32, 64, 128])
+    parser.add_argument('--interpreters', type=int, default=Config.INTERPRETER_POOL_SIZE,
+                        help="동시에 추론하는 인터프리터 수 (기본: INTERPRETER_POOL_SIZE)")
+    parser.add_argument('--delegate', choices=DELEGATES, default=Config.TFLITE_DELEGATE)
+    parser.add_argument('--backend', choices=INFERENCE_BACKENDS, default=Config.INFERENCE_BACKEND)
+    parser.add_argument('--seconds', type=float, default=2.0, help="조합마다 측정할 시간(초)")
+    parser.add_argument('--output', default=Config.TFLITE_TUNING_PATH)
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model_content = f.read()
+
+    print(f"모델: {args.model}, CPU 코어 {cpu_count}개, 동시 인터프리터 {args.interpreters}개, "
+          f"delegate {args.delegate}, 백엔드 {args.backend}")
+    print(f"{'threads':>7} {'batch':>6} {'win/s':>9} {'p50(ms)':>8} {'p90(ms)':>8}")
+    results = []
+    for num_threads in args.threads:
+        measured = set()
+        for batch_size in args.batch_sizes:
+            result = measure(args.model, model_content, num_threads, batch_size, args.interpreters,
+                             args.delegate, args.seconds, backend=args.backend)
+            actual_batch = result['batch_size']
+            note = f"  (배치 {batch_size}로 재할당 실패, 배치 {actual_batch}로 측정)" if actual_batch != batch_size else ""
+            print(f"{num_threads:>7} {actual_batch:>6} {result['windows_per_sec']:>9.1f} "
+                  f"{result['batch_latency_ms_p50']:>8.1f} {result['batch_latency_ms_p90']:>8.1f}{note}")
+            # 권장값은 실제로 측정한 배치 크기로만 고름 (같은 배치로 대체된 측정은 한 번만 기록)
+            if actual_batch in measured:
+                continue
+            measured.add(actual_batch)
+            results.append(result)
+
+    best = recommend(results)
+    report = {
+        'model': args.model,
+        'cpu_count': cpu_count,
+        'delegate': args.delegate,
+        'backend': args.backend,
+        'measured_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+        'recommended': {
+            'TFLITE_NUM_THREADS': best['num_threads'],
+            'INFERENCE_BATCH_SIZE': best['batch_size'],
+            'INTERPRETER_POOL_SIZE': args.interpreters,
+            'TFLITE_DELEGATE': args.delegate,
+        },
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n권장 설정: 스레드 {best['num_threads']}개, 배치 {best['batch_size']} "
+          f"({best['windows_per_sec']:.0f} 윈도우/초)")
+    print(f"저장: {args.output} (환경 변수로 지정한 값이 우선합니다)")
+
+
+if __name__ == '__main__':
+    main()
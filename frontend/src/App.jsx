@@ -132,6 +132,7 @@ function App() {
       case 'completed':
         return (
           <ResultDisplay
+            jobId={jobId}
             results={jobResult}
             onReset={handleReset}
           />
@@ -1,12 +1,55 @@
 // frontend/src/components/ResultDisplay.jsx
 
-import React from 'react'; // React 임포트
+import React, { useEffect, useState } from 'react'; // React 임포트
 import * as api from '../services/api'; // api.js 임포트
 
-export function ResultDisplay({ results, onReset }) {
+// [신규] 미리보기에 그리는 구간(초)
+const PREVIEW_SECONDS = 16;
+
+// [신규] 분류된 타격 이벤트를 악기별 줄에 점으로 그리는 미리보기 (PDF 렌더링을 기다리지 않음)
+function EventPreview({ jobId }) {
+  const [data, setData] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    api.getJobEvents(jobId, 0, PREVIEW_SECONDS)
+      .then((result) => { if (!cancelled) setData(result); })
+      .catch(() => { if (!cancelled) setData(null); });
+    return () => { cancelled = true; };
+  }, [jobId]);
+
+  if (!data || data.times.length === 0) return null;
+
+  const width = 640;
+  const rowHeight = 24;
+  const beatSec = 60 / data.bpm;
+  const beats = Math.floor(PREVIEW_SECONDS / beatSec);
+  return (
+    <svg
+      viewBox={`0 0 ${width} ${rowHeight * data.labels.length}`}
+      style={{ width: '100%', maxWidth: `${width}px`, margin: '12px auto', display: 'block' }}
+    >
+      {Array.from({ length: beats + 1 }, (_, i) => (
+        <line key={`beat-${i}`} x1={(i * beatSec / PREVIEW_SECONDS) * width} x2={(i * beatSec / PREVIEW_SECONDS) * width}
+          y1={0} y2={rowHeight * data.labels.length} stroke={i % 4 === 0 ? '#9ca3af' : '#e5e7eb'} />
+      ))}
+      {data.labels.map((label, row) => (
+        <text key={label} x={2} y={row * rowHeight + 15} fontSize="10" fill="#6b7280">{label}</text>
+      ))}
+      {data.times.map((t, i) => (
+        <circle key={i} cx={(t / PREVIEW_SECONDS) * width} cy={data.labelIds[i] * rowHeight + rowHeight / 2}
+          r={4} fill="#3b82f6" opacity={0.4 + 0.6 * data.probs[i]} />
+      ))}
+    </svg>
+  );
+}
+
+export function ResultDisplay({ jobId, results, onReset }) {
   // App.jsx로부터 받은 results 객체에서 URL을 추출합니다.
   const midiDownloadUrl = api.getFullDownloadUrl(results.midiUrl);
   const pdfDownloadUrl = api.getFullDownloadUrl(results.pdfUrl);
+  // [신규] PDF는 서버에서 처음 요청될 때 렌더링되므로, 사용자가 열 때만 뷰어를 불러옴
+  const [showPdf, setShowPdf] = useState(false);
 
   return (
     <div className="status-container">
@@ -18,13 +61,25 @@ export function ResultDisplay({ results, onReset }) {
       {/* 데스크톱에서는 iframe 뷰어를 보여주고,
         모바일에서는 CSS(App.css)에 의해 이 뷰어가 숨겨집니다.
       */}
-      <div id="pdfViewerContainer" className="pdf-viewer-desktop-only" style={{ display: 'block' }}>
-        <iframe
-          id="pdfViewer"
-          title="PDF Viewer"
-          src={pdfDownloadUrl}
-        ></iframe>
-      </div>
+      {jobId && <EventPreview jobId={jobId} />}
+
+      {showPdf ? (
+        <div id="pdfViewerContainer" className="pdf-viewer-desktop-only" style={{ display: 'block' }}>
+          <iframe
+            id="pdfViewer"
+            title="PDF Viewer"
+            src={pdfDownloadUrl}
+          ></iframe>
+        </div>
+      ) : (
+        <button
+          className="pdf-viewer-desktop-only"
+          onClick={() => setShowPdf(true)}
+          style={{ display: 'block', margin: '10px auto' }}
+        >
+          PDF 악보 미리보기 (처음 열 때 몇 초 걸릴 수 있습니다)
+        </button>
+      )}
       {/* --- End: PDF 뷰어 --- */}
 
       <div className="controls" style={{ marginTop: '20px', gap: '12px' }}>
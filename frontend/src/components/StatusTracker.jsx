@@ -1,41 +1,36 @@
 // src/components/StatusTracker.jsx
 import * as api from '../services/api';
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect } from 'react';
 
 export function StatusTracker({ jobId, onComplete, onError }) {
   // 백엔드 tasks.py의 'message' 필드를 표시
   const [statusMessage, setStatusMessage] = useState('서버에 작업을 요청하는 중...');
-  const intervalRef = useRef(null);
+  // [신규] 서버가 보내는 숫자 진행 정보 { stage, fraction, overall, eta }
+  const [progress, setProgress] = useState(null);
 
   useEffect(() => {
     if (!jobId) return;
 
-    const checkStatus = async () => {
-      try {
-        const data = await api.getJobStatus(jobId);
-
+    // [수정] 1초 간격 폴링 대신 서버가 상태 변경을 바로 보내 주는 SSE 구독
+    const unsubscribe = api.subscribeJobStatus(
+      jobId,
+      (data) => {
         // audio_processor.py의 tqdm 메시지 등을 그대로 표시
         setStatusMessage(data.message || '상태 확인 중...');
+        if (data.progress) setProgress(data.progress);
 
         if (data.status === 'completed') {
-          clearInterval(intervalRef.current);
           onComplete(data.results); // App.js에 완료 알림
         } else if (data.status === 'error') {
-          clearInterval(intervalRef.current);
           onError(data.message || '알 수 없는 오류 발생'); // App.js에 에러 알림
         }
-        // 'pending' 또는 'processing'이면 계속 폴링
-      } catch (error) {
-        clearInterval(intervalRef.current);
-        onError(error.message);
-      }
-    };
-
-    // 1.5초마다 상태 확인
-    intervalRef.current = setInterval(checkStatus, 1000);
+        // 'pending' 또는 'processing'이면 다음 변경을 계속 기다림
+      },
+      (message) => onError(message)
+    );
 
-    // 컴포넌트 unmount 시 interval 정리
-    return () => clearInterval(intervalRef.current);
+    // 컴포넌트 unmount 시 구독 해제
+    return unsubscribe;
   }, [jobId, onComplete, onError]);
 
   return (
@@ -47,6 +42,15 @@ export function StatusTracker({ jobId, onComplete, onError }) {
       <div id="statusMessageElement" className="status-info">
         {statusMessage}
       </div>
+      {progress && (
+        <div className="status-progress">
+          <progress value={progress.overall} max={1} />
+          <span>
+            {Math.round(progress.overall * 100)}%
+            {progress.eta != null && ` · 남은 시간 약 ${Math.ceil(progress.eta)}초`}
+          </span>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
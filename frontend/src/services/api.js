@@ -5,23 +5,49 @@ import axios from 'axios';
 const API_BASE_URL = 'http://127.0.0.1:5000';
 
 /**
- * 1. 오디오 파일을 서버에 업로드하고 Job ID를 받습니다.
- * (POST /api/process)
+ * 1. 오디오 파일을 청크 단위로 서버에 업로드하고 Job ID를 받습니다.
+ * (POST /api/uploads -> PATCH /api/uploads/<id>?offset=N -> POST /api/uploads/<id>/finalize)
+ * 청크 전송이 실패하면 서버에 저장된 offset을 다시 확인하고 그 위치부터 이어 보냅니다.
  */
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+const UPLOAD_MAX_RETRIES = 5;
 
-export const uploadAudioFile = async (file) => {
-    const formData = new FormData();
-    // 'audio_file' 키는 routes.py의 request.files['audio_file']와 일치해야 함
-    formData.append('audio_file', file);
-
+export const uploadAudioFile = async (file, onProgress) => {
     try {
-        const response = await axios.post(`${API_BASE_URL}/api/process`, formData, {
-            headers: {
-                'Content-Type': 'multipart/form-data',
-            },
+        const { data } = await axios.post(`${API_BASE_URL}/api/uploads`, {
+            filename: file.name,
+            size: file.size,
+        });
+        const uploadId = data.uploadId;
+        let offset = data.offset;
+        let retries = 0;
+
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+            try {
+                const response = await axios.patch(`${API_BASE_URL}/api/uploads/${uploadId}`, chunk, {
+                    params: { offset },
+                    headers: { 'Content-Type': 'application/octet-stream' },
+                });
+                offset = response.data.offset;
+                retries = 0;
+            } catch (error) {
+                if (error.response?.status === 404 || ++retries > UPLOAD_MAX_RETRIES) {
+                    throw error;
+                }
+                // 끊긴 경우 서버가 실제로 받은 위치부터 다시 보냄
+                await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+                const status = await axios.get(`${API_BASE_URL}/api/uploads/${uploadId}`);
+                offset = status.data.offset;
+            }
+            if (onProgress) onProgress(offset / file.size);
+        }
+
+        const response = await axios.post(`${API_BASE_URL}/api/uploads/${uploadId}/finalize`, {
+            size: file.size,
         });
         // { "jobId": "..." } 반환
-        return response.data; 
+        return response.data;
     } catch (error) {
         console.error("File upload error:", error);
         throw new Error(error.response?.data?.error || '파일 업로드에 실패했습니다.');
@@ -43,6 +69,87 @@ export const getJobStatus = async (jobId) => {
     }
 };
 
+/**
+ * 2-1. 상태가 since 버전 이후로 바뀔 때까지 기다렸다가 반환합니다. (long-poll)
+ * (GET /api/result/<job_id>?since=<version>)
+ */
+export const waitJobStatus = async (jobId, since, timeout = 25) => {
+    try {
+        const response = await axios.get(`${API_BASE_URL}/api/result/${jobId}`, {
+            params: { since, timeout },
+        });
+        // { status, message, results, version } 반환
+        return response.data;
+    } catch (error) {
+        console.error("Wait status error:", error);
+        throw new Error(error.response?.data?.error || '상태 조회에 실패했습니다.');
+    }
+};
+
+/**
+ * 2-2. 작업 상태가 바뀔 때마다 onUpdate(data)를 호출합니다.
+ * (GET /api/result/<job_id>/events, Server-Sent Events)
+ * EventSource를 쓸 수 없으면 long-poll로 대신하며, 반환된 함수를 호출하면 구독을 끝냅니다.
+ */
+export const subscribeJobStatus = (jobId, onUpdate, onError) => {
+    const isFinished = (data) => data.status === 'completed' || data.status === 'error';
+
+    if (typeof window !== 'undefined' && window.EventSource) {
+        const source = new EventSource(`${API_BASE_URL}/api/result/${jobId}/events`);
+        source.addEventListener('status', (event) => {
+            const data = JSON.parse(event.data);
+            if (isFinished(data)) source.close();
+            onUpdate(data);
+        });
+        source.addEventListener('error', (event) => {
+            // 서버가 보낸 'error' 이벤트(작업 없음) 또는 다시 연결할 수 없는 경우에만 실패 처리
+            // (일시적인 연결 끊김은 EventSource가 Last-Event-ID로 자동 재연결)
+            if (event.data !== undefined || source.readyState === EventSource.CLOSED) {
+                source.close();
+                onError('해당 작업 ID를 찾을 수 없습니다.');
+            }
+        });
+        return () => source.close();
+    }
+
+    let stopped = false;
+    const poll = async () => {
+        let version = 0;
+        while (!stopped) {
+            const data = await waitJobStatus(jobId, version);
+            if (stopped) return;
+            if (data.version > version) {
+                version = data.version;
+                onUpdate(data);
+            }
+            if (isFinished(data)) return;
+        }
+    };
+    poll().catch((error) => {
+        if (!stopped) onError(error.message);
+    });
+    return () => {
+        stopped = true;
+    };
+};
+
+/**
+ * 분류된 타격 이벤트를 구간 단위로 가져옵니다. (미리보기용)
+ * (GET /api/events/<job_id>?start=&end=)
+ */
+export const getJobEvents = async (jobId, start = 0, end = undefined) => {
+    try {
+        const response = await axios.get(`${API_BASE_URL}/api/events/${jobId}`, {
+            params: { start, end },
+        });
+        // { bpm, labels, total, times, labelIds, probs, next } 반환
+        return response.data;
+    } catch (error) {
+        console.error("Get events error:", error);
+        throw new Error(error.response?.data?.error || '이벤트 조회에 실패했습니다.');
+    }
+};
+
 /**
  * 3. 완료된 작업의 MIDI 다운로드 URL을 반환합니다.
  * (GET /download/midi/<job_id>)